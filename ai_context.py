@@ -0,0 +1,88 @@
+"""
+Per-user AI context built from task history.
+
+Keeps each active user's recent titles, most frequent titles and priority mix
+in memory, updated as tasks are written, so AI suggestion requests never have
+to load the user's full task list.
+"""
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+import metrics
+
+class _UserContext:
+    """Sliding window of a user's most recent (title, priority) pairs with running counts"""
+
+    def __init__(self, window: int, entries: List[Tuple[str, str]]):
+        self.window = window
+        self.entries: Deque[Tuple[str, str]] = deque()  # newest first
+        self.title_counts: Counter = Counter()
+        self.priority_counts: Counter = Counter()
+        self.loaded_at = time.monotonic()
+        for title, priority in reversed(entries):
+            self.add(title, priority)
+
+    def add(self, title: str, priority: str):
+        if len(self.entries) >= self.window:
+            old_title, old_priority = self.entries.pop()
+            self.title_counts[old_title] -= 1
+            if self.title_counts[old_title] <= 0:
+                del self.title_counts[old_title]
+            self.priority_counts[old_priority] -= 1
+            if self.priority_counts[old_priority] <= 0:
+                del self.priority_counts[old_priority]
+        self.entries.appendleft((title, priority))
+        self.title_counts[title] += 1
+        self.priority_counts[priority] += 1
+
+class AIContextStore:
+    def __init__(self, db, window: int = 200, recent_size: int = 10, max_users: int = 1024, ttl: float = 300.0):
+        """
+        Cache of per-user AI context
+
+        Args:
+            db: SQLiteDatabase used to (re)load a user's context
+            window: Number of most recent tasks the context is computed over
+            recent_size: Number of recent titles handed to the AI
+            max_users: Users kept in memory; least recently used are dropped
+            ttl: Seconds before a context is reloaded (picks up writes made by other workers)
+        """
+        self.db = db
+        self.window = window
+        self.recent_size = recent_size
+        self.max_users = max_users
+        self.ttl = ttl
+        self._contexts: "OrderedDict[str, _UserContext]" = OrderedDict()
+
+    async def get_context(self, user_id: str) -> Dict[str, Any]:
+        """Return the AI context for a user, loading it with one LIMIT query on a miss"""
+        context = self._contexts.get(user_id)
+        hit = context is not None and time.monotonic() - context.loaded_at <= self.ttl
+        metrics.record_cache("ai_context", hit)
+        if not hit:
+            entries = await self.db.get_recent_task_summaries(user_id, self.window)
+            context = _UserContext(self.window, entries)
+            self._contexts[user_id] = context
+            while len(self._contexts) > self.max_users:
+                self._contexts.popitem(last=False)
+        self._contexts.move_to_end(user_id)
+
+        recent = [title for title, _ in list(context.entries)[: self.recent_size]]
+        frequent = [title for title, count in context.title_counts.most_common(5) if count > 1]
+        return {
+            "existing_tasks": recent,
+            "frequent_tasks": frequent,
+            "priority_mix": dict(context.priority_counts),
+            "user_id": user_id,
+        }
+
+    def record_created(self, user_id: str, title: str, priority: str):
+        """Add a newly created task to the user's context (no-op if not cached)"""
+        context = self._contexts.get(user_id)
+        if context is not None:
+            context.add(title, priority)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's context after an update or delete; it is reloaded on next use"""
+        self._contexts.pop(user_id, None)
@@ -1,50 +1,224 @@
 """
 AI Service for task name suggestions and completion
+
+Importing this module is cheap: openai, httpx and the .env file are only
+loaded when the assistant is first used (see get_ai_assistant).
 """
 import os
+import json
 import asyncio
 from typing import List, Optional, Dict, Any
-from openai import AsyncOpenAI
 import logging
-from dotenv import load_dotenv
-import httpx
+import time
+from abc import ABC, abstractmethod
 
-# Load environment variables from .env file
-load_dotenv()
+import metrics
 
 # Set up logging
 logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
+# Maximum number of tasks packed into a single batch breakdown request
+MAX_BREAKDOWN_BATCH = 8
+
+# Most tasks one batch breakdown call accepts, and batch requests in flight
+# at once per worker (calls beyond that wait for a free slot)
+MAX_BREAKDOWN_TASKS = 64
+MAX_CONCURRENT_BATCHES = 4
+
+def _clean_subtasks(lines: List[str]) -> List[str]:
+    """Strip numbering/bullets from subtask lines and apply length limits"""
+    clean_subtasks = []
+    for subtask in lines[:7]:  # Max 7 subtasks
+        if not isinstance(subtask, str):
+            continue
+        cleaned = subtask.strip().strip('- ').strip('1234567890. ').strip()
+        if cleaned and len(cleaned) <= 80:
+            clean_subtasks.append(cleaned)
+    return clean_subtasks
+
+def _parse_batch_breakdown(content: str, count: int) -> List[List[str]]:
+    """
+    Parse a batch breakdown completion into one subtask list per input task.
+
+    Accepts {"results": [{"id": 0, "subtasks": [...]}, ...]}, a bare list of
+    such objects, or a mapping of id -> subtasks. Code fences and any text
+    around the JSON are ignored; tasks missing from the reply get [].
+    """
+    results: List[List[str]] = [[] for _ in range(count)]
+    text = content.strip()
+    start = min((i for i in (text.find('{'), text.find('[')) if i != -1), default=-1)
+    end = max(text.rfind('}'), text.rfind(']'))
+    if start == -1 or end < start:
+        return results
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return results
+
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        data = data["results"]
+
+    if isinstance(data, dict):
+        items = [{"id": key, "subtasks": value} for key, value in data.items()]
+    elif isinstance(data, list):
+        items = data
+    else:
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("id", position))
+        except (TypeError, ValueError):
+            continue
+        subtasks = item.get("subtasks")
+        if 0 <= index < count and isinstance(subtasks, list):
+            results[index] = _clean_subtasks(subtasks)
+    return results
+
+class CompletionBackend(ABC):
+    """
+    Interface for the chat completion provider behind AITaskAssistant.
+    
+    Implementations take OpenAI-style messages and return the reply text.
+    `calls` counts upstream requests so benchmarks can report them.
+    """
+    
+    def __init__(self):
+        self.calls = 0
+    
+    @abstractmethod
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float = 0.7,
+        timeout: float = 10.0,
+        json_mode: bool = False
+    ) -> str:
+        """Return the completion text for the given messages"""
+    
+    async def aclose(self):
+        """Release any network resources held by the backend"""
+
+class OpenAIBackend(CompletionBackend):
+    """Completion backend using the OpenAI API (or any OpenAI-compatible server)"""
+    
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http_client = None
+        self.client = None
+    
+    def _get_client(self):
+        """Create the OpenAI client on first use"""
+        if self.client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            
+            # Create a custom HTTP client with SSL verification disabled for development
+            # In production, you should use proper SSL certificates
+            self.http_client = httpx.AsyncClient(verify=False)
+            self.client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self.http_client
+            )
+        return self.client
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float = 0.7,
+        timeout: float = 10.0,
+        json_mode: bool = False
+    ) -> str:
+        self.calls += 1
+        extra: Dict[str, Any] = {}
+        if json_mode:
+            extra["response_format"] = {"type": "json_object"}
+        response = await self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+            **extra
+        )
+        return response.choices[0].message.content or ""
+    
+    async def aclose(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        self.http_client = None
+        self.client = None
+
 class AITaskAssistant:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        backend: Optional[CompletionBackend] = None
+    ):
         """
         Initialize the AI Task Assistant
         
         Args:
             api_key: OpenAI API key (if None, will look for OPENAI_API_KEY environment variable)
             model: OpenAI model to use (default: gpt-3.5-turbo)
+            backend: Completion backend to use instead of the OpenAI client
+                (e.g. a local stand-in server for benchmarks)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = None
+        self.backend = backend
+        self._batch_slots = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
         
-        if self.api_key:
+        if self.backend is None and self.api_key:
             try:
-                # Create a custom HTTP client with SSL verification disabled for development
-                # In production, you should use proper SSL certificates
-                http_client = httpx.AsyncClient(verify=False)
-                self.client = AsyncOpenAI(
-                    api_key=self.api_key,
-                    http_client=http_client
-                )
+                # OPENAI_BASE_URL points the client at an OpenAI-compatible server
+                self.backend = OpenAIBackend(self.api_key, base_url=os.getenv("OPENAI_BASE_URL"))
             except Exception as e:
                 print(f"Failed to initialize OpenAI client: {e}")
-                self.client = None
+                self.backend = None
     
     def is_enabled(self) -> bool:
-        """Check if AI assistance is enabled (API key is available)"""
-        return self.client is not None
+        """Check if AI assistance is enabled (a completion backend is available)"""
+        return self.backend is not None
+    
+    async def _chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        timeout: float = 10.0,
+        json_mode: bool = False
+    ) -> str:
+        """Send a system/user prompt pair to the backend and return the reply text"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            content = await self.backend.complete(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=0.7,
+                timeout=timeout,
+                json_mode=json_mode
+            )
+            outcome = "success"
+            return content
+        finally:
+            metrics.AI_UPSTREAM.observe(time.perf_counter() - start, (outcome,))
     
     async def suggest_task_names(self, partial_input: str, context: Optional[Dict] = None) -> List[str]:
         """
@@ -66,6 +240,11 @@ class AITaskAssistant:
             if context:
                 if context.get("existing_tasks"):
                     context_info += f"User's recent tasks: {', '.join(context['existing_tasks'][:5])}\n"
+                if context.get("frequent_tasks"):
+                    context_info += f"User's frequently repeated tasks: {', '.join(context['frequent_tasks'][:5])}\n"
+                if context.get("priority_mix") and not context.get("priority"):
+                    usual_priority = max(context["priority_mix"], key=context["priority_mix"].get)
+                    context_info += f"Usual priority level: {usual_priority}\n"
                 if context.get("priority"):
                     context_info += f"Priority level: {context['priority']}\n"
                 if context.get("project"):
@@ -89,19 +268,10 @@ Guidelines:
 Suggest relevant task names:"""
 
             # Make API call
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7,
-                timeout=10.0
-            )
+            content = await self._chat(system_prompt, user_prompt, max_tokens=200)
             
             # Parse response
-            suggestions = response.choices[0].message.content.strip().split('\n')
+            suggestions = content.strip().split('\n')
             suggestions = [s.strip() for s in suggestions if s.strip()]
             
             # Clean and limit suggestions
@@ -146,18 +316,9 @@ Brief Description: "{brief_description}"
 
 Provide a detailed task description:"""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=100,
-                temperature=0.7,
-                timeout=10.0
-            )
+            content = await self._chat(system_prompt, user_prompt, max_tokens=100)
             
-            expanded_description = response.choices[0].message.content.strip()
+            expanded_description = content.strip()
             
             # Ensure it's not too long
             if len(expanded_description) > 250:
@@ -198,50 +359,115 @@ Description: "{description}"
 
 Break this down into subtasks:"""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=300,
-                temperature=0.7,
-                timeout=10.0
-            )
+            content = await self._chat(system_prompt, user_prompt, max_tokens=300)
             
-            subtasks = response.choices[0].message.content.strip().split('\n')
+            subtasks = content.strip().split('\n')
             subtasks = [s.strip() for s in subtasks if s.strip()]
             
-            # Clean and limit subtasks
-            clean_subtasks = []
-            for subtask in subtasks[:7]:  # Max 7 subtasks
-                cleaned = subtask.strip('- ').strip('1234567890. ').strip()
-                if cleaned and len(cleaned) <= 80:
-                    clean_subtasks.append(cleaned)
-            
-            return clean_subtasks
+            return _clean_subtasks(subtasks)
             
         except Exception as e:
             print(f"Error generating task breakdown: {e}")
             return []
+    
+    async def suggest_batch_breakdown(self, tasks: List[Dict[str, str]]) -> List[List[str]]:
+        """
+        Break down many tasks using one structured completion per batch
+        
+        At most MAX_CONCURRENT_BATCHES batch requests are in flight at once
+        across all calls; the rest queue for a slot.
+        
+        Args:
+            tasks: List of {"title": ..., "description": ...} dicts
+            
+        Returns:
+            One list of subtask suggestions per input task, in input order
+        """
+        if not self.is_enabled() or not tasks:
+            return [[] for _ in tasks]
+        
+        batches = [tasks[i:i + MAX_BREAKDOWN_BATCH] for i in range(0, len(tasks), MAX_BREAKDOWN_BATCH)]
+        batch_results = await asyncio.gather(*(self._breakdown_batch(batch) for batch in batches))
+        return [subtasks for batch in batch_results for subtasks in batch]
+    
+    async def _breakdown_batch(self, tasks: List[Dict[str, str]]) -> List[List[str]]:
+        """Run a single batch breakdown request (at most MAX_BREAKDOWN_BATCH tasks) once a slot is free"""
+        async with self._batch_slots:
+            return await self._request_batch_breakdown(tasks)
+    
+    async def _request_batch_breakdown(self, tasks: List[Dict[str, str]]) -> List[List[str]]:
+        try:
+            system_prompt = """You are a helpful AI assistant that breaks down complex tasks into smaller, manageable subtasks.
+For each task you are given, provide 3-7 specific, actionable subtasks under 50 characters each.
 
-# Global AI assistant instance
-ai_assistant = AITaskAssistant()
+Respond with JSON only, in exactly this shape:
+{"results": [{"id": <task id>, "subtasks": ["...", "..."]}]}
+Include one entry for every task id you were given."""
+
+            task_lines = "\n".join(
+                f'{i}. Title: "{task.get("title", "")}" Description: "{task.get("description") or ""}"'
+                for i, task in enumerate(tasks)
+            )
+            user_prompt = f"""Tasks (id. details):
+{task_lines}
+
+Break each task down into subtasks:"""
+
+            content = await self._chat(
+                system_prompt,
+                user_prompt,
+                max_tokens=200 + 150 * len(tasks),
+                timeout=30.0,
+                json_mode=True
+            )
+            
+            return _parse_batch_breakdown(content, len(tasks))
+            
+        except Exception as e:
+            print(f"Error generating batch task breakdown: {e}")
+            return [[] for _ in tasks]
+
+# Global AI assistant instance, created on first use
+_ai_assistant: Optional[AITaskAssistant] = None
+
+def get_ai_assistant() -> AITaskAssistant:
+    """Return the global AI assistant, creating it (and loading .env) on first call"""
+    global _ai_assistant
+    if _ai_assistant is None:
+        from dotenv import load_dotenv
+        
+        # Load environment variables from .env file
+        load_dotenv()
+        _ai_assistant = AITaskAssistant()
+    return _ai_assistant
+
+async def close_ai_assistant():
+    """Close the global AI assistant's network resources, if it was ever created"""
+    global _ai_assistant
+    if _ai_assistant is not None and _ai_assistant.backend is not None:
+        await _ai_assistant.backend.aclose()
+    _ai_assistant = None
 
 async def get_task_suggestions(partial_input: str, user_context: Optional[Dict] = None) -> List[str]:
     """
     Convenience function to get task suggestions
     """
-    return await ai_assistant.suggest_task_names(partial_input, user_context)
+    return await get_ai_assistant().suggest_task_names(partial_input, user_context)
 
 async def expand_description(task_title: str, brief_description: str = "") -> str:
     """
     Convenience function to expand task description
     """
-    return await ai_assistant.expand_task_description(task_title, brief_description)
+    return await get_ai_assistant().expand_task_description(task_title, brief_description)
 
 async def breakdown_task(task_title: str, description: str = "") -> List[str]:
     """
     Convenience function to break down a task
     """
-    return await ai_assistant.suggest_task_breakdown(task_title, description)
+    return await get_ai_assistant().suggest_task_breakdown(task_title, description)
+
+async def breakdown_tasks(tasks: List[Dict[str, str]]) -> List[List[str]]:
+    """
+    Convenience function to break down several tasks in batched requests
+    """
+    return await get_ai_assistant().suggest_batch_breakdown(tasks)
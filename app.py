@@ -1,49 +1,283 @@
-from fastapi import FastAPI, Request, Form, HTTPException, Depends, status, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, HTTPException, Depends, status, Cookie, File, UploadFile, Query, WebSocket
+from fastapi.requests import HTTPConnection
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from database import SQLiteDatabase
-from models import TaskCreate, TaskUpdate, UserCreate, UserLogin, TaskStatus, TaskPriority
-from ai_service import get_task_suggestions, expand_description, breakdown_task, ai_assistant
-from typing import Optional, Annotated
+from starlette.background import BackgroundTask
+from database import SQLiteDatabase, ARCHIVED_READ_ONLY, LIST_COLUMNS, REPORT_COLUMNS
+from query_profiler import QueryProfiler
+from sharding import ShardedSQLiteDatabase
+from task_cache import CachedTaskStorage
+from reports import summarize_tasks, summarize_trend, write_report_csv, write_tasks_csv
+from rollups import MAX_RANGE_DAYS
+from jobs import JobQueue, JobContext, JobLimitError, range_file_response
+from live import LiveUpdates, LiveLimitError, SQLiteEventBackend, TaskEvent, CREATED, UPDATED, DELETED, RELOAD
+from session_tokens import SessionSigner, is_signed_token
+from ratelimit import RateLimiter, retry_after, route_group
+from scheduler import DUE, OVERDUE, DueDateScheduler
+from archive import TaskArchiver
+from streaming import STREAM_BATCH_SIZE, TemplateStreamer, task_records
+from exports import EXPORT_BATCH_SIZE, EXPORT_COLUMNS, EXPORT_FORMATS, ExportUnavailable, columnar_stream, jsonl_stream
+from json_api import (
+    DEFAULT_PAGE_SIZE, MAX_BULK_OPERATIONS, MAX_PAGE_SIZE, APIResponse, decode_cursor, page_body, page_columns,
+    parse_fields, task_to_dict,
+)
+from models import TaskCreate, TaskUpdate, TaskFilter, TaskMove, UserCreate, UserLogin, TaskStatus, TaskPriority, BulkTaskRequest
+from ai_context import AIContextStore
+import metrics
+from ai_service import (
+    MAX_BREAKDOWN_TASKS, get_task_suggestions, expand_description, breakdown_task, breakdown_tasks, get_ai_assistant,
+    close_ai_assistant,
+)
+from typing import Optional, Annotated, List, Literal, Tuple
 from datetime import date, datetime, timedelta
+import os
 import secrets
-import csv
+import signal
+import threading
+import time
 import io
-from collections import defaultdict
+import csv
+import asyncio
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown; the AI client is created lazily on first use"""
+    app.state.ready = False
+    await warm_up()
+    await jobs.start()
+    await live.start()
+    await scheduler.start()
+    if signer is not None:
+        await signer.revocations.start()
+    if archiver is not None:
+        await archiver.start()
+    app.state.ready = True
+    drain_on_signals()
+    yield
+    app.state.ready = False
+    if archiver is not None:
+        await archiver.stop()
+    if signer is not None:
+        await signer.revocations.stop()
+    await scheduler.stop()
+    await live.stop()
+    await jobs.stop()
+    await close_ai_assistant()
+    await db.close()
+
+app = FastAPI(title="Primo Task Manager", description="A task management app with SQLite backend", lifespan=lifespan)
 
-app = FastAPI(title="Primo Task Manager", description="A task management app with SQLite backend")
+# Request latency/status/DB-time instrumentation, exposed at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Templates
-templates = Jinja2Templates(directory="templates")
+templates = metrics.instrument_templates(Jinja2Templates(directory="templates"))
+
+# The dashboard and task list are streamed while their rows are read
+# (PRIMO_STREAM_HTML=0 renders them whole before sending instead)
+STREAM_HTML = os.getenv("PRIMO_STREAM_HTML", "1") != "0"
+streamer = TemplateStreamer(templates)
+
+# Storage backend: PRIMO_DATABASE_URL selects the async SQL backend (e.g.
+# postgresql+asyncpg://...); otherwise SQLite at PRIMO_DB_PATH, which lets
+# benchmarks and tests use a scratch file. PRIMO_SHARDS > 1 spreads users'
+# tasks over that many shard files.
+DATABASE_URL = os.getenv("PRIMO_DATABASE_URL")
+DB_PATH = os.getenv("PRIMO_DB_PATH", "primo.db")
+SHARD_COUNT = int(os.getenv("PRIMO_SHARDS", "1"))
+if DATABASE_URL:
+    from sql_storage import AsyncSQLStorage
+    db = AsyncSQLStorage(DATABASE_URL)
+elif SHARD_COUNT > 1:
+    db = ShardedSQLiteDatabase(
+        DB_PATH, shard_count=SHARD_COUNT, shard_dir=os.getenv("PRIMO_SHARD_DIR"), profiler=QueryProfiler.from_env()
+    )
+else:
+    db = SQLiteDatabase(DB_PATH, profiler=QueryProfiler.from_env())
+
+# Active users' task lists are served from memory (PRIMO_TASK_CACHE_MB=0 disables);
+# other workers' writes show up within PRIMO_TASK_CACHE_CHECK_MS
+TASK_CACHE_MB = float(os.getenv("PRIMO_TASK_CACHE_MB", "64"))
+if TASK_CACHE_MB > 0:
+    db = CachedTaskStorage(
+        db, max_bytes=int(TASK_CACHE_MB * 1024 * 1024),
+        check_interval=float(os.getenv("PRIMO_TASK_CACHE_CHECK_MS", "100")) / 1000
+    )
+db = metrics.instrument_database(db)
+
+# Background jobs for exports, imports and report generation
+jobs = JobQueue(
+    os.getenv("PRIMO_JOBS_DB", "primo_jobs.db"),
+    result_dir=os.getenv("PRIMO_JOB_DIR"),
+    workers=int(os.getenv("PRIMO_JOB_WORKERS", "2"))
+)
+
+# Per-user task history used as AI suggestion context
+ai_context = AIContextStore(db)
+
+async def render_task_event(event: TaskEvent) -> Optional[str]:
+    """Row-level fragment for a live task event (None if the task is already gone)"""
+    task = None
+    if event.kind in (CREATED, UPDATED, DUE, OVERDUE):
+        task = await db.get_task(event.task_id, event.user_id)
+        if task is None:
+            return None
+    elif event.kind == RELOAD:
+        return "reload"
+    return templates.get_template("partials/task_event.html").render(
+        kind=event.kind, task=task, task_id=event.task_id, TaskStatus=TaskStatus, TaskPriority=TaskPriority
+    )
+
+# Live task updates for open dashboards; PRIMO_LIVE_EVENTS_DB relays events between workers
+LIVE_EVENTS_DB = os.getenv("PRIMO_LIVE_EVENTS_DB")
+live = LiveUpdates(
+    render_task_event,
+    backend=SQLiteEventBackend(LIVE_EVENTS_DB) if LIVE_EVENTS_DB else None,
+    max_per_user=int(os.getenv("PRIMO_LIVE_MAX_PER_USER", "5")),
+    max_connections=int(os.getenv("PRIMO_LIVE_MAX_CONNECTIONS", "1000"))
+)
 
-# SQLite database
-db = SQLiteDatabase()
+# Overdue counts and due/overdue reminders, kept current by this worker's
+# task writes (PRIMO_REMINDER_INTERVAL: seconds between date checks)
+scheduler = DueDateScheduler(db, on_reminder=live.notify, interval=float(os.getenv("PRIMO_REMINDER_INTERVAL", "60")))
+scheduler.observe(db)
 
-# Simple session management
-sessions: dict = {}
+# Completed tasks move to the archive table PRIMO_ARCHIVE_AFTER_DAYS after
+# their last update (0 keeps them in the hot table)
+archiver = TaskArchiver.from_env(db)
 
-def create_session(user_id: str) -> str:
-    """Create a new session for a user"""
-    session_id = secrets.token_urlsafe(32)
-    sessions[session_id] = user_id
-    return session_id
+async def warm_up():
+    """Open storage connections, compile templates and load in-memory state before reporting ready"""
+    started = time.perf_counter()
+    await db.warm_up()
+    for name in templates.env.list_templates(filter_func=lambda name: name.endswith(".html")):
+        templates.env.get_template(name)
+    for name in ("dashboard.html", "partials/task_list.html"):
+        streamer.env.get_template(name)
+    await scheduler.rebuild()
+    if signer is not None:
+        await signer.revocations.sync()
+    print(f"🔥 Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
 
-def get_current_user(session_id: Optional[str] = Cookie(None)):
+def drain():
+    """Shutdown has begun: report not ready and end live streams so they don't hold up draining"""
+    app.state.ready = False
+    live.close_all()
+
+def drain_on_signals():
+    """
+    Run `drain` as soon as the server receives SIGTERM/SIGINT
+    
+    Chains onto the handlers uvicorn installed, which then stop accepting
+    connections and wait for in-flight requests before lifespan shutdown.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+        
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(drain)
+            previous(signum, frame)
+        
+        signal.signal(sig, handler)
+
+def publish_task_event(request: Request, user: dict, kind: str, task_id: Optional[int] = None):
+    """Tell the user's other open dashboards about a change (the requesting tab already has it)"""
+    live.publish(user["id"], kind, task_id, origin=request.headers.get("X-Live-Client"))
+
+# Signed stateless session tokens when PRIMO_SESSION_KEYS is set (see
+# session_tokens.py); session ids from the sessions table keep working
+signer = SessionSigner.from_env(db)
+
+async def start_session(user: dict) -> str:
+    """Session token for a signed-in user: signed when configured, else a new sessions-table row"""
+    if signer is not None:
+        return signer.issue(user)
+    return await db.create_session(user["id"])
+
+async def get_current_user(session_id: Optional[str] = Cookie(None)):
     """Get current user from session"""
-    if not session_id or session_id not in sessions:
+    if not session_id:
         return None
-    
-    user_id = sessions[session_id]
-    return db.get_user_by_id(user_id)
+    if signer is not None and is_signed_token(session_id):
+        return signer.verify(session_id)
+    return await db.get_session_user(session_id)
+
+async def get_api_user(connection: HTTPConnection, user=Depends(get_current_user)):
+    """API user from an `Authorization: Bearer <token>` header (see /api/v1/auth/token) or the session cookie"""
+    scheme, _, token = connection.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return await get_current_user(token.strip())
+    return user
 
-def delete_session(session_id: str):
-    """Delete a session"""
-    if session_id in sessions:
-        del sessions[session_id]
+# Token buckets per user (or client IP) and route group (see ratelimit.py);
+# PRIMO_RATE_LIMITS overrides budgets, PRIMO_RATE_LIMIT_DB shares them between
+# workers and PRIMO_RATE_LIMIT=0 turns limiting off
+rate_limiter = RateLimiter.from_env()
+
+async def enforce_rate_limit(connection: HTTPConnection, user=Depends(get_api_user)):
+    """Spend a token for the caller on every route; 429 with Retry-After when the bucket is empty"""
+    if rate_limiter is None:
+        return
+    group = route_group(connection.scope.get("method", "GET"), connection.url.path)
+    if group is None:
+        return
+    caller = f"user:{user['id']}" if user else f"ip:{connection.client.host if connection.client else 'unknown'}"
+    wait = rate_limiter.check(group, caller)
+    if wait:
+        metrics.RATE_LIMITED.inc((group,))
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": retry_after(wait)})
+
+# Applies to every route declared below (user lookups are shared with the route's own dependency)
+app.router.dependencies.append(Depends(enforce_rate_limit))
+
+def task_filters(
+    status: Optional[TaskStatus] = None,
+    priority: Optional[TaskPriority] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    search: Optional[str] = Query(None, max_length=200),
+    archived: bool = False
+) -> Optional[TaskFilter]:
+    """Task list/export filters from the query string (None when no filter is set); archived=true adds archived tasks"""
+    filters = TaskFilter(
+        status=status, priority=priority, due_from=due_from, due_to=due_to, search=search or None, archived=archived
+    )
+    return None if filters.is_empty() else filters
+
+def write_error_status(error: str) -> int:
+    """HTTP status for a failed task write: missing (404), archived and read-only (409) or invalid (400)"""
+    if error == "Task not found":
+        return 404
+    if error == ARCHIVED_READ_ONLY:
+        return 409
+    return 400
+
+def report_range(start: Optional[date] = None, end: Optional[date] = None) -> Tuple[date, date]:
+    """Trend report date range from the query string (default: the last 30 days)"""
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+    return start, end
+
+def require_admin(request: Request):
+    """Allow admin endpoints only with the X-Admin-Token header matching PRIMO_ADMIN_TOKEN"""
+    admin_token = os.getenv("PRIMO_ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not admin_token or not secrets.compare_digest(supplied, admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request, user=Depends(get_current_user)):
@@ -65,7 +299,7 @@ async def login(request: Request, email: str = Form(...), password: str = Form(.
     
     if result["success"]:
         # Create session and redirect to dashboard
-        session_id = create_session(result["data"]["user"]["id"])
+        session_id = await start_session(result["data"]["user"])
         response = RedirectResponse(url="/dashboard", status_code=302)
         response.set_cookie(key="session_id", value=session_id, httponly=True)
         return response
@@ -104,28 +338,37 @@ async def dashboard(request: Request, user=Depends(get_current_user)):
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    tasks = await db.get_tasks(user["id"])
-    return templates.TemplateResponse("dashboard.html", {
+    context = {
         "request": request, 
         "user": user, 
-        "tasks": tasks,
+        "live_client": secrets.token_urlsafe(8),
         "TaskStatus": TaskStatus,
         "TaskPriority": TaskPriority
-    })
+    }
+    if STREAM_HTML:
+        rows = db.iter_tasks(user["id"], LIST_COLUMNS, batch_size=STREAM_BATCH_SIZE)
+        return await streamer.response("dashboard.html", context, task_records(rows, LIST_COLUMNS))
+    
+    tasks = await db.get_tasks(user["id"], columns=LIST_COLUMNS)
+    return templates.TemplateResponse("dashboard.html", {**context, "tasks": tasks})
 
 @app.get("/tasks", response_class=HTMLResponse)
-async def get_tasks_html(request: Request, user=Depends(get_current_user)):
+async def get_tasks_html(request: Request, user=Depends(get_current_user), filters=Depends(task_filters)):
     """Get tasks as HTML fragment for HTMX"""
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    tasks = await db.get_tasks(user["id"])
-    return templates.TemplateResponse("partials/task_list.html", {
+    context = {
         "request": request, 
-        "tasks": tasks,
         "TaskStatus": TaskStatus,
         "TaskPriority": TaskPriority
-    })
+    }
+    if STREAM_HTML:
+        rows = db.iter_tasks(user["id"], LIST_COLUMNS, filters, STREAM_BATCH_SIZE)
+        return await streamer.response("partials/task_list.html", context, task_records(rows, LIST_COLUMNS))
+    
+    tasks = await db.get_tasks(user["id"], columns=LIST_COLUMNS, filters=filters)
+    return templates.TemplateResponse("partials/task_list.html", {**context, "tasks": tasks})
 
 @app.post("/tasks")
 async def create_task(
@@ -158,8 +401,10 @@ async def create_task(
     result = await db.create_task(task_data, user["id"])
     
     if result["success"]:
+        ai_context.record_created(user["id"], task_data.title, task_data.priority.value)
+        publish_task_event(request, user, CREATED, result["data"]["id"])
         # Return updated task list
-        tasks = await db.get_tasks(user["id"])
+        tasks = await db.get_tasks(user["id"], columns=LIST_COLUMNS)
         return templates.TemplateResponse("partials/task_list.html", {
             "request": request, 
             "tasks": tasks,
@@ -178,6 +423,8 @@ async def edit_task_form(request: Request, task_id: int, user=Depends(get_curren
     task = await db.get_task(task_id, user["id"])
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    if task.get("archived_at") is not None:
+        raise HTTPException(status_code=409, detail=ARCHIVED_READ_ONLY)
     
     return templates.TemplateResponse("partials/task_edit_form.html", {
         "request": request, 
@@ -220,8 +467,10 @@ async def update_task(
     result = await db.update_task(task_id, task_data, user["id"])
     
     if result["success"]:
+        ai_context.invalidate(user["id"])
+        publish_task_event(request, user, UPDATED, task_id)
         # Return updated task list
-        tasks = await db.get_tasks(user["id"])
+        tasks = await db.get_tasks(user["id"], columns=LIST_COLUMNS)
         return templates.TemplateResponse("partials/task_list.html", {
             "request": request, 
             "tasks": tasks,
@@ -229,7 +478,8 @@ async def update_task(
             "TaskPriority": TaskPriority
         })
     else:
-        raise HTTPException(status_code=400, detail=result.get("error", "Failed to update task"))
+        error = result.get("error", "Failed to update task")
+        raise HTTPException(status_code=write_error_status(error), detail=error)
 
 @app.delete("/tasks/{task_id}")
 async def delete_task(request: Request, task_id: int, user=Depends(get_current_user)):
@@ -240,8 +490,11 @@ async def delete_task(request: Request, task_id: int, user=Depends(get_current_u
     result = await db.delete_task(task_id, user["id"])
     
     if result["success"]:
+        ai_context.invalidate(user["id"])
+        for deleted_id in (task_id, *result["data"].get("subtasks", ())):
+            publish_task_event(request, user, DELETED, deleted_id)
         # Return updated task list
-        tasks = await db.get_tasks(user["id"])
+        tasks = await db.get_tasks(user["id"], columns=LIST_COLUMNS)
         return templates.TemplateResponse("partials/task_list.html", {
             "request": request, 
             "tasks": tasks,
@@ -249,50 +502,25 @@ async def delete_task(request: Request, task_id: int, user=Depends(get_current_u
             "TaskPriority": TaskPriority
         })
     else:
-        raise HTTPException(status_code=400, detail=result.get("error", "Failed to delete task"))
+        error = result.get("error", "Failed to delete task")
+        raise HTTPException(status_code=write_error_status(error), detail=error)
 
 @app.get("/export/csv")
-async def export_tasks_csv(user=Depends(get_current_user)):
+async def export_tasks_csv(user=Depends(get_current_user), filters=Depends(task_filters)):
     """Export user's tasks as CSV file"""
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     # Get all tasks for the user
-    tasks = await db.get_tasks(user["id"])
+    tasks = await db.get_tasks(user["id"], filters=filters)
     
     # Create CSV content
     output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write CSV headers
-    writer.writerow([
-        'Title', 
-        'Description', 
-        'Due Date', 
-        'Priority', 
-        'Status', 
-        'Created At', 
-        'Updated At'
-    ])
-    
-    # Write task data
-    for task in tasks:
-        writer.writerow([
-            task.get('title', ''),
-            task.get('description', ''),
-            task.get('due_date', ''),
-            task.get('priority', '').title(),
-            task.get('status', '').replace('_', ' ').title(),
-            task.get('created_at', ''),
-            task.get('updated_at', '')
-        ])
-    
-    # Create response
+    write_tasks_csv(tasks, output)
     csv_content = output.getvalue()
     output.close()
     
     # Create filename with current date
-    from datetime import datetime
     filename = f"tasks_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     
     # Return CSV file as download
@@ -302,114 +530,78 @@ async def export_tasks_csv(user=Depends(get_current_user)):
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+@app.get("/export/{export_format}")
+async def export_tasks(
+    export_format: Literal["jsonl", "parquet", "arrow"],
+    user=Depends(get_current_user),
+    filters=Depends(task_filters)
+):
+    """Stream user's tasks as JSON Lines, Parquet or Arrow IPC, batch by batch from the database"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    batches = db.iter_tasks(user["id"], EXPORT_COLUMNS, filters, EXPORT_BATCH_SIZE)
+    if export_format == "jsonl":
+        body = jsonl_stream(batches)
+    else:
+        try:
+            body = columnar_stream(batches, export_format)
+        except ExportUnavailable as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"tasks_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @app.get("/reports", response_class=HTMLResponse)
-async def reports_page(request: Request, user=Depends(get_current_user)):
+async def reports_page(request: Request, user=Depends(get_current_user), date_range=Depends(report_range)):
     """Reports dashboard"""
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
     # Get all tasks for analysis
-    tasks = await db.get_tasks(user["id"])
-    
-    # Task Status Report
-    status_counts = defaultdict(int)
-    priority_counts = defaultdict(int)
-    overdue_count = 0
-    today = date.today()
-    
-    # Task Aging Analysis
-    aging_buckets = {
-        "0-7 days": 0,
-        "8-30 days": 0,
-        "31-90 days": 0,
-        "90+ days": 0
-    }
+    tasks = await db.get_tasks(user["id"], columns=REPORT_COLUMNS)
+    summary = summarize_tasks(tasks, overdue_count=await scheduler.overdue_count(user["id"]))
     
-    # Task Aging by Priority Analysis
-    aging_by_priority = {
-        "Low": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "Medium": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "High": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "Urgent": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0}
-    }
-    
-    for task in tasks:
-        # Count by status
-        status_display = task.get('status', '').replace('_', ' ').title()
-        status_counts[status_display] += 1
-        
-        # Count by priority
-        priority_display = task.get('priority', '').title()
-        priority_counts[priority_display] += 1
-        
-        # Check for overdue tasks
-        due_date_str = task.get('due_date')
-        if due_date_str and task.get('status') != 'completed':
-            try:
-                if isinstance(due_date_str, str):
-                    due_date = datetime.fromisoformat(due_date_str).date()
-                elif isinstance(due_date_str, date):
-                    due_date = due_date_str
-                else:
-                    continue
-                
-                if due_date < today:
-                    overdue_count += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-        
-        # Calculate task age
-        created_at_data = task.get('created_at', '')
-        if created_at_data:
-            try:
-                if isinstance(created_at_data, str):
-                    created_at = datetime.fromisoformat(created_at_data.replace('Z', '+00:00'))
-                elif isinstance(created_at_data, datetime):
-                    created_at = created_at_data
-                else:
-                    continue
-                    
-                age_days = (datetime.now() - created_at).days
-                
-                # Determine age bucket
-                if age_days <= 7:
-                    age_bucket = "0-7 days"
-                elif age_days <= 30:
-                    age_bucket = "8-30 days"
-                elif age_days <= 90:
-                    age_bucket = "31-90 days"
-                else:
-                    age_bucket = "90+ days"
-                
-                # Update overall aging buckets
-                aging_buckets[age_bucket] += 1
-                
-                # Update aging by priority
-                if priority_display in aging_by_priority:
-                    aging_by_priority[priority_display][age_bucket] += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-    
-    # Completion rate calculation
-    total_tasks = len(tasks)
-    completed_tasks = status_counts.get('Completed', 0)
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    # Trends come from the daily rollups, one row per day in the range
+    start, end = date_range
+    trend = summarize_trend(await db.get_daily_stats(user["id"], start, end))
     
     return templates.TemplateResponse("reports.html", {
         "request": request,
         "user": user,
-        "total_tasks": total_tasks,
-        "status_counts": dict(status_counts),
-        "priority_counts": dict(priority_counts),
-        "overdue_count": overdue_count,
-        "completion_rate": round(completion_rate, 1),
-        "aging_buckets": aging_buckets,
-        "aging_by_priority": aging_by_priority,
+        **summary,
+        "trend": trend,
+        "trend_start": start,
+        "trend_end": end,
         "tasks": tasks,
         "TaskStatus": TaskStatus,
         "TaskPriority": TaskPriority
     })
 
+@app.get("/reports/trends")
+async def report_trends(user=Depends(get_current_user), date_range=Depends(report_range)):
+    """Daily rollup rows and totals for a date range as JSON"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    start, end = date_range
+    trend = summarize_trend(await db.get_daily_stats(user["id"], start, end))
+    return JSONResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "created": trend["created"],
+        "completed": trend["completed"],
+        "open_start": trend["open_start"],
+        "open_end": trend["open_end"],
+        "overdue_end": trend["overdue_end"],
+        "days": [{**day, "day": day["day"].isoformat()} for day in trend["days"]]
+    })
+
 @app.get("/reports/export", response_class=HTMLResponse)
 async def export_reports(request: Request, user=Depends(get_current_user)):
     """Export reports as CSV"""
@@ -417,162 +609,11 @@ async def export_reports(request: Request, user=Depends(get_current_user)):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     # Get all tasks for analysis
-    tasks = await db.get_tasks(user["id"])
+    tasks = await db.get_tasks(user["id"], columns=REPORT_COLUMNS)
     
     # Create CSV content for detailed report
     output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write report headers
-    writer.writerow(['Report Type', 'Metric', 'Value'])
-    writer.writerow([])  # Empty row
-    
-    # Task Status Report
-    writer.writerow(['Task Status Report', '', ''])
-    status_counts = defaultdict(int)
-    for task in tasks:
-        status_display = task.get('status', '').replace('_', ' ').title()
-        status_counts[status_display] += 1
-    
-    for status, count in status_counts.items():
-        writer.writerow(['Status', status, count])
-    
-    writer.writerow([])  # Empty row
-    
-    # Priority Distribution
-    writer.writerow(['Priority Distribution', '', ''])
-    priority_counts = defaultdict(int)
-    for task in tasks:
-        priority_display = task.get('priority', '').title()
-        priority_counts[priority_display] += 1
-    
-    for priority, count in priority_counts.items():
-        writer.writerow(['Priority', priority, count])
-    
-    writer.writerow([])  # Empty row
-    
-    # Task Aging Report
-    writer.writerow(['Task Aging Report', '', ''])
-    aging_buckets = {
-        "0-7 days": 0,
-        "8-30 days": 0,
-        "31-90 days": 0,
-        "90+ days": 0
-    }
-    
-    # Task Aging by Priority Analysis
-    aging_by_priority = {
-        "Low": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "Medium": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "High": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0},
-        "Urgent": {"0-7 days": 0, "8-30 days": 0, "31-90 days": 0, "90+ days": 0}
-    }
-    
-    today = datetime.now()
-    for task in tasks:
-        # Calculate task age and priority
-        created_at_data = task.get('created_at', '')
-        priority_display = task.get('priority', '').title()
-        
-        if created_at_data and priority_display in aging_by_priority:
-            try:
-                if isinstance(created_at_data, str):
-                    created_at = datetime.fromisoformat(created_at_data.replace('Z', '+00:00'))
-                elif isinstance(created_at_data, datetime):
-                    created_at = created_at_data
-                else:
-                    continue
-                    
-                age_days = (today - created_at).days
-                
-                # Determine age bucket
-                if age_days <= 7:
-                    age_bucket = "0-7 days"
-                elif age_days <= 30:
-                    age_bucket = "8-30 days"
-                elif age_days <= 90:
-                    age_bucket = "31-90 days"
-                else:
-                    age_bucket = "90+ days"
-                
-                # Update aging by priority
-                aging_by_priority[priority_display][age_bucket] += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-    
-    today = datetime.now()
-    for task in tasks:
-        created_at_data = task.get('created_at', '')
-        if created_at_data:
-            try:
-                if isinstance(created_at_data, str):
-                    created_at = datetime.fromisoformat(created_at_data.replace('Z', '+00:00'))
-                elif isinstance(created_at_data, datetime):
-                    created_at = created_at_data
-                else:
-                    continue
-                    
-                age_days = (today - created_at).days
-                
-                if age_days <= 7:
-                    aging_buckets["0-7 days"] += 1
-                elif age_days <= 30:
-                    aging_buckets["8-30 days"] += 1
-                elif age_days <= 90:
-                    aging_buckets["31-90 days"] += 1
-                else:
-                    aging_buckets["90+ days"] += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-    
-    for age_range, count in aging_buckets.items():
-        writer.writerow(['Age Range', age_range, count])
-    
-    writer.writerow([])  # Empty row
-    
-    # Overdue Tasks
-    writer.writerow(['Overdue Analysis', '', ''])
-    overdue_count = 0
-    today_date = date.today()
-    
-    for task in tasks:
-        due_date_str = task.get('due_date')
-        if due_date_str and task.get('status') != 'completed':
-            try:
-                if isinstance(due_date_str, str):
-                    due_date = datetime.fromisoformat(due_date_str).date()
-                elif isinstance(due_date_str, date):
-                    due_date = due_date_str
-                else:
-                    continue
-                    
-                if due_date < today_date:
-                    overdue_count += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-    
-    writer.writerow(['Overdue Tasks', 'Count', overdue_count])
-    
-    # Completion Rate
-    total_tasks = len(tasks)
-    completed_tasks = status_counts.get('Completed', 0)
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-    writer.writerow(['Completion Rate', 'Percentage', f"{completion_rate:.1f}%"])
-    
-    writer.writerow([])  # Empty row
-    
-    # Tasks by Age Grouped by Priority Report
-    writer.writerow(['Tasks by Age Grouped by Priority', '', ''])
-    for priority, age_data in aging_by_priority.items():
-        priority_total = sum(age_data.values())
-        if priority_total > 0:
-            writer.writerow(['Priority', priority, f'Total: {priority_total}'])
-            for age_range, count in age_data.items():
-                if count > 0:
-                    writer.writerow(['', age_range, count])
-            writer.writerow([])  # Empty row after each priority
-    
-    # Create response
+    write_report_csv(summarize_tasks(tasks, overdue_count=await scheduler.overdue_count(user["id"])), output)
     csv_content = output.getvalue()
     output.close()
     
@@ -586,16 +627,404 @@ async def export_reports(request: Request, user=Depends(get_current_user)):
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+# Background jobs
+
+JOB_CHUNK_SIZE = 5000
+IMPORT_BATCH_SIZE = 500
+
+JOB_LABELS = {
+    "export_csv": "Task export",
+    "reports_export": "Report export",
+    "import_csv": "Task import",
+}
+
+@jobs.handler("export_csv")
+async def export_csv_job(job: JobContext) -> str:
+    """Stream all of a user's tasks to a CSV file in cursor chunks, reporting progress"""
+    # An id-only pass over the covering index sizes the progress bar
+    total = 0
+    async for rows in db.iter_tasks(job.user_id, ("id",), batch_size=JOB_CHUNK_SIZE):
+        total += len(rows)
+    path = job.result_file(f"tasks_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", "text/csv")
+    
+    written = 0
+    with open(path, "w", newline="") as output:
+        write_tasks_csv([], output)
+        batches = db.iter_tasks(job.user_id, EXPORT_COLUMNS, batch_size=JOB_CHUNK_SIZE)
+        async for records in task_records(batches, EXPORT_COLUMNS):
+            await asyncio.to_thread(write_tasks_csv, records, output, False)
+            written += len(records)
+            job.progress(written, max(total, written), "Writing tasks")
+    return f"Exported {written} tasks"
+
+@jobs.handler("reports_export")
+async def reports_export_job(job: JobContext) -> str:
+    """Aggregate a user's tasks and write the report CSV"""
+    tasks = await db.get_tasks(job.user_id, columns=REPORT_COLUMNS)
+    job.progress(0, 1, "Aggregating tasks")
+    overdue_count = await scheduler.overdue_count(job.user_id)
+    summary = await asyncio.to_thread(summarize_tasks, tasks, None, overdue_count)
+    path = job.result_file(f"task_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", "text/csv")
+    
+    def write():
+        with open(path, "w", newline="") as output:
+            write_report_csv(summary, output)
+    
+    await asyncio.to_thread(write)
+    return f"Report covers {summary['total_tasks']} tasks"
+
+def _task_from_csv_row(row: dict) -> TaskCreate:
+    """Build a task from a row in the task export CSV layout"""
+    return TaskCreate(
+        title=(row.get('Title') or '').strip(),
+        description=row.get('Description') or None,
+        due_date=row.get('Due Date') or None,
+        priority=(row.get('Priority') or 'medium').strip().lower(),
+        status=(row.get('Status') or 'todo').strip().lower().replace(' ', '_')
+    )
+
+@jobs.handler("import_csv")
+async def import_csv_job(job: JobContext) -> str:
+    """Create tasks from an uploaded CSV (the task export layout) in batches"""
+    def parse():
+        parsed, skipped = [], 0
+        with open(job.input_path, newline="", encoding="utf-8-sig") as source:
+            for row in csv.DictReader(source):
+                try:
+                    parsed.append(_task_from_csv_row(row))
+                except ValueError:
+                    skipped += 1
+        return parsed, skipped
+    
+    new_tasks, skipped = await asyncio.to_thread(parse)
+    imported = 0
+    for start in range(0, len(new_tasks), IMPORT_BATCH_SIZE):
+        batch = new_tasks[start:start + IMPORT_BATCH_SIZE]
+        result = await db.create_tasks(batch, job.user_id)
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Import failed"))
+        imported += len(batch)
+        job.progress(imported, len(new_tasks), "Importing tasks")
+    
+    if new_tasks:
+        ai_context.invalidate(job.user_id)
+        live.publish(job.user_id, RELOAD)
+    return f"Imported {imported} tasks" + (f", skipped {skipped} invalid rows" if skipped else "")
+
+def render_job(request: Request, job: dict, status_code: int = 200):
+    """Job progress partial; it polls itself until the job finishes"""
+    return templates.TemplateResponse("partials/job_status.html", {
+        "request": request,
+        "job": job,
+        "label": JOB_LABELS.get(job["kind"], job["kind"]),
+        "has_result": jobs.result_path(job) is not None
+    }, status_code=status_code)
+
+def submit_job(request: Request, user: dict, kind: str, input_path: Optional[str] = None):
+    try:
+        job_id = jobs.submit(user["id"], kind, input_path=input_path)
+    except JobLimitError as e:
+        if input_path:
+            os.unlink(input_path)
+        raise HTTPException(status_code=429, detail=str(e))
+    return render_job(request, jobs.get(job_id, user["id"]), status_code=202)
+
+@app.post("/jobs/export-csv", response_class=HTMLResponse)
+async def start_export_job(request: Request, user=Depends(get_current_user)):
+    """Queue a CSV export of the user's tasks"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return submit_job(request, user, "export_csv")
+
+@app.post("/jobs/reports-export", response_class=HTMLResponse)
+async def start_reports_job(request: Request, user=Depends(get_current_user)):
+    """Queue a report CSV export"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return submit_job(request, user, "reports_export")
+
+@app.post("/jobs/import-csv", response_class=HTMLResponse)
+async def start_import_job(request: Request, file: UploadFile = File(...), user=Depends(get_current_user)):
+    """Queue an import of tasks from an uploaded CSV"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    input_path = jobs.input_file(".csv")
+    with open(input_path, "wb") as destination:
+        while chunk := await file.read(1024 * 1024):
+            destination.write(chunk)
+    return submit_job(request, user, "import_csv", input_path=str(input_path))
+
+@app.get("/jobs/{job_id}", response_class=HTMLResponse)
+async def job_status(request: Request, job_id: str, user=Depends(get_current_user)):
+    """Job progress partial (polled by HTMX)"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    job = jobs.get(job_id, user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return render_job(request, job)
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(request: Request, job_id: str, user=Depends(get_current_user)):
+    """Download a finished job's result (supports Range requests)"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    job = jobs.get(job_id, user["id"])
+    path = jobs.result_path(job) if job else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Result not available")
+    return range_file_response(path, job["result_name"], job["content_type"], request.headers.get("range"))
+
+@app.get("/events")
+async def task_events(client: Optional[str] = None, user=Depends(get_current_user)):
+    """Server-sent live task updates for the dashboard (`task` fragments and `reload`)"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    try:
+        subscription = live.subscribe(user["id"], client)
+    except LiveLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    # The stream's own cleanup never runs if the client leaves before its first
+    # message, so the slot is also released once the response is over
+    return StreamingResponse(
+        live.sse_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(live.unsubscribe, subscription)
+    )
+
+@app.websocket("/ws/tasks")
+async def task_events_ws(websocket: WebSocket, client: Optional[str] = None, user=Depends(get_current_user)):
+    """Live task updates as JSON over a WebSocket (same events and limits as /events)"""
+    if not user:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    try:
+        subscription = live.subscribe(user["id"], client)
+    except LiveLimitError:
+        await websocket.close(code=1013)
+        return
+    
+    async def forward():
+        messages = live.websocket_messages(subscription)
+        try:
+            async for message in messages:
+                await websocket.send_text(message)
+            # The stream only ends when the worker shuts down
+            await websocket.close(code=1012)
+        finally:
+            await messages.aclose()
+    
+    sender = asyncio.create_task(forward())
+    try:
+        # Clients only listen; reading lets a close free the connection slot right away
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        # A sender cancelled before it started never ran the stream's cleanup
+        live.unsubscribe(subscription)
+
 @app.post("/logout")
 async def logout(request: Request, session_id: Optional[str] = Cookie(None)):
     """Logout user"""
     if session_id:
-        delete_session(session_id)
+        if signer is not None and is_signed_token(session_id):
+            await signer.revoke(session_id)
+        else:
+            await db.delete_session(session_id)
     
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie(key="session_id")
     return response
 
+# JSON API (v1) for programmatic clients
+
+@app.post("/api/v1/auth/token")
+async def api_token(credentials: UserLogin):
+    """Exchange email and password for a bearer token"""
+    result = await db.sign_in(credentials)
+    if not result["success"]:
+        raise HTTPException(status_code=401, detail=result.get("error", "Invalid email or password"))
+    
+    token = await start_session(result["data"]["user"])
+    return APIResponse({"token": token, "token_type": "bearer"})
+
+@app.get("/api/v1/tasks")
+async def api_list_tasks(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filters=Depends(task_filters),
+    user=Depends(get_api_user)
+):
+    """One page of tasks, newest first; pass next_cursor back as ?cursor= for the next page"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    try:
+        selected = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # One extra row tells whether there is a next page
+    columns = page_columns(selected)
+    rows = await db.get_task_page(user["id"], columns, filters, limit + 1, after)
+    return APIResponse(page_body(rows, columns, selected, limit))
+
+@app.get("/api/v1/tasks/{task_id}")
+async def api_get_task(task_id: int, fields: Optional[str] = None, user=Depends(get_api_user)):
+    """Get one task"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    task = await db.get_task(task_id, user["id"])
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Archived tasks are still readable; writes to them get 409
+    body = task_to_dict(task, selected)
+    body["archived"] = task.get("archived_at") is not None
+    return APIResponse(body)
+
+@app.post("/api/v1/tasks")
+async def api_create_task(request: Request, task_data: TaskCreate, user=Depends(get_api_user)):
+    """Create a task"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    result = await db.create_task(task_data, user["id"])
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result.get("error", "Failed to create task"))
+    
+    ai_context.record_created(user["id"], task_data.title, task_data.priority.value)
+    publish_task_event(request, user, CREATED, result["data"]["id"])
+    return APIResponse(task_to_dict(result["data"]), status_code=201)
+
+@app.patch("/api/v1/tasks/{task_id}")
+async def api_update_task(request: Request, task_id: int, task_data: TaskUpdate, user=Depends(get_api_user)):
+    """Update the fields given (null and missing fields are left unchanged)"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    result = await db.update_task(task_id, task_data, user["id"])
+    if not result["success"]:
+        error = result.get("error", "Failed to update task")
+        raise HTTPException(status_code=write_error_status(error), detail=error)
+    
+    ai_context.invalidate(user["id"])
+    publish_task_event(request, user, UPDATED, task_id)
+    return APIResponse(task_to_dict(result["data"]))
+
+@app.delete("/api/v1/tasks/{task_id}")
+async def api_delete_task(request: Request, task_id: int, user=Depends(get_api_user)):
+    """Delete a task"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    result = await db.delete_task(task_id, user["id"])
+    if not result["success"]:
+        error = result.get("error", "Failed to delete task")
+        raise HTTPException(status_code=write_error_status(error), detail=error)
+    
+    ai_context.invalidate(user["id"])
+    for deleted_id in (task_id, *result["data"].get("subtasks", ())):
+        publish_task_event(request, user, DELETED, deleted_id)
+    return Response(status_code=204)
+
+@app.get("/api/v1/tasks/{task_id}/subtree")
+async def api_get_subtree(task_id: int, fields: Optional[str] = None, user=Depends(get_api_user)):
+    """A task and all its subtasks (by depth), each with its subtasks' completion"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    subtree = await db.get_subtree(task_id, user["id"], page_columns(selected))
+    if not subtree:
+        raise HTTPException(status_code=404, detail="Task not found")
+    progress = await db.get_task_progress(user["id"])
+    tasks = []
+    for task in subtree:
+        body = task_to_dict(task, selected)
+        counts = progress.get(task.id)
+        body["progress"] = counts and {
+            "completed": counts[0], "total": counts[1], "percent": round(100 * counts[0] / counts[1], 1)
+        }
+        tasks.append(body)
+    return APIResponse({"data": tasks})
+
+@app.post("/api/v1/tasks/{task_id}/move")
+async def api_move_task(request: Request, task_id: int, move: TaskMove, user=Depends(get_api_user)):
+    """Move a task and its subtasks under another task (parent_id null: to the top level)"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    result = await db.move_task(task_id, move.parent_id, user["id"])
+    if not result["success"]:
+        error = result.get("error", "Failed to move task")
+        raise HTTPException(status_code=write_error_status(error), detail=error)
+    
+    publish_task_event(request, user, UPDATED, task_id)
+    return APIResponse(task_to_dict(result["data"]))
+
+@app.post("/api/v1/tasks/bulk")
+async def api_bulk_tasks(operations: BulkTaskRequest, user=Depends(get_api_user)):
+    """
+    Create, update and delete many tasks in one call
+    
+    Creates share one transaction; updates and deletes are applied one by
+    one, and the ones that fail are listed under errors.
+    """
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    if len(operations.create) + len(operations.update) + len(operations.delete) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPERATIONS} operations per request")
+    
+    created = 0
+    updated: List[int] = []
+    deleted: List[int] = []
+    errors = []
+    if operations.create:
+        result = await db.create_tasks(operations.create, user["id"])
+        if result["success"]:
+            created = result["data"]["created"]
+        else:
+            errors.append({"op": "create", "error": result.get("error", "Failed to create tasks")})
+    for change in operations.update:
+        result = await db.update_task(change.id, change, user["id"])
+        if result["success"]:
+            updated.append(change.id)
+        else:
+            errors.append({"op": "update", "id": change.id, "error": result.get("error", "Failed to update task")})
+    for task_id in operations.delete:
+        result = await db.delete_task(task_id, user["id"])
+        if result["success"]:
+            deleted.append(task_id)
+        else:
+            errors.append({"op": "delete", "id": task_id, "error": result.get("error", "Failed to delete task")})
+    
+    if created or updated or deleted:
+        ai_context.invalidate(user["id"])
+        live.publish(user["id"], RELOAD)
+    return APIResponse({"created": created, "updated": updated, "deleted": deleted, "errors": errors})
+
 # AI-Powered Task Assistance Endpoints
 
 @app.get("/ai/suggestions")
@@ -607,21 +1036,15 @@ async def get_ai_task_suggestions(
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    if not ai_assistant.is_enabled():
+    if not get_ai_assistant().is_enabled():
         return JSONResponse({"suggestions": [], "ai_enabled": False})
     
     if len(partial.strip()) < 2:
         return JSONResponse({"suggestions": [], "ai_enabled": True})
     
     try:
-        # Get user's recent tasks for context
-        recent_tasks = await db.get_tasks(user["id"])
-        recent_task_titles = [task.get("title", "") for task in recent_tasks[:10]]
-        
-        context = {
-            "existing_tasks": recent_task_titles,
-            "user_id": user["id"]
-        }
+        # User's recent/frequent tasks for context, served from memory
+        context = await ai_context.get_context(user["id"])
         
         suggestions = await get_task_suggestions(partial, context)
         
@@ -646,7 +1069,7 @@ async def expand_task_description(
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    if not ai_assistant.is_enabled():
+    if not get_ai_assistant().is_enabled():
         return JSONResponse({"expanded_description": description, "ai_enabled": False})
     
     try:
@@ -676,7 +1099,7 @@ async def breakdown_complex_task(
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    if not ai_assistant.is_enabled():
+    if not get_ai_assistant().is_enabled():
         return JSONResponse({"subtasks": [], "ai_enabled": False})
     
     try:
@@ -695,15 +1118,118 @@ async def breakdown_complex_task(
             "error": str(e)
         })
 
+@app.post("/ai/breakdown-tasks")
+async def breakdown_many_tasks(
+    request: Request,
+    task_ids: List[int] = Form(...),
+    create_subtasks: bool = Form(False),
+    user=Depends(get_current_user)
+):
+    """Break down several existing tasks with batched AI requests, optionally saving the subtasks"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    # One request is charged once against the ai rate limit, so bound what it can fan out to
+    if len(task_ids) > MAX_BREAKDOWN_TASKS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BREAKDOWN_TASKS} tasks per breakdown request")
+    
+    if not get_ai_assistant().is_enabled():
+        return JSONResponse({"results": [], "created": 0, "ai_enabled": False})
+    
+    # Drop duplicate ids while keeping the requested order
+    tasks = await db.get_tasks_by_ids(list(dict.fromkeys(task_ids)), user["id"])
+    
+    try:
+        breakdowns = await breakdown_tasks([
+            {"title": task["title"], "description": task.get("description") or ""}
+            for task in tasks
+        ])
+        
+        created = 0
+        if create_subtasks:
+            new_tasks = [
+                TaskCreate(
+                    title=subtask,
+                    description=f"Subtask of: {task['title']}",
+                    priority=task["priority"],
+                    parent_id=task["id"]
+                )
+                for task, subtasks in zip(tasks, breakdowns)
+                for subtask in subtasks
+            ]
+            if new_tasks:
+                result = await db.create_tasks(new_tasks, user["id"])
+                if not result["success"]:
+                    raise HTTPException(status_code=400, detail=result.get("error", "Failed to create subtasks"))
+                created = result["data"]["created"]
+                for new_task in new_tasks:
+                    ai_context.record_created(user["id"], new_task.title, new_task.priority.value)
+                live.publish(user["id"], RELOAD)
+        
+        return JSONResponse({
+            "results": [
+                {"task_id": task["id"], "title": task["title"], "subtasks": subtasks}
+                for task, subtasks in zip(tasks, breakdowns)
+            ],
+            "created": created,
+            "ai_enabled": True
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error breaking down tasks: {e}")
+        return JSONResponse({
+            "results": [],
+            "created": 0,
+            "ai_enabled": True,
+            "error": str(e)
+        })
+
 @app.get("/ai/status")
 async def get_ai_status():
     """Get AI service status"""
+    ai_assistant = get_ai_assistant()
     return JSONResponse({
         "ai_enabled": ai_assistant.is_enabled(),
         "model": ai_assistant.model if ai_assistant.is_enabled() else None,
         "message": "AI assistance ready" if ai_assistant.is_enabled() else "AI assistance requires OpenAI API key"
     })
 
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Liveness: the process is serving requests"""
+    return JSONResponse({"status": "ok"})
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready(request: Request):
+    """Readiness: 200 once warm-up has finished, 503 while starting or draining"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return JSONResponse({"status": "ready", "pid": os.getpid()})
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/query-stats")
+async def get_query_stats(request: Request, reset: bool = False):
+    """Per-statement SQL timings collected by the query profiler"""
+    require_admin(request)
+    if db.profiler is None:
+        raise HTTPException(status_code=404, detail="Query profiling is disabled (set PRIMO_SQL_PROFILE=1)")
+    
+    stats = db.profiler.stats()
+    violations = list(db.profiler.violations)
+    if reset:
+        db.profiler.reset()
+    return JSONResponse({
+        "slow_ms": db.profiler.slow_ms,
+        "statements": stats,
+        "full_scans": violations
+    })
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
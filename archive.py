@@ -0,0 +1,141 @@
+"""
+Archival of old completed tasks.
+
+Completed tasks stay in `tasks` until they are old, then move to
+`tasks_archive` (same ids and columns, next to `tasks` in every task file), so
+the hot table, its indexes, the task cache and every task list scan only carry
+work users still look at. Task lists, search, exports and the JSON API include
+archived rows when asked to (`?archived=true`).
+
+`TaskArchiver` runs in each worker: every `interval` seconds it moves tasks
+completed (last updated) more than `after_days` ago in batches, one short
+transaction per batch and task file, pausing between batches so task writes
+are never held up for long. Each batch bumps its owners' task versions, so
+cached task lists reload. Trend rollups and the due-date scheduler are
+unaffected (completed tasks add nothing to open or overdue counts).
+
+To work through a large backlog ahead of time:
+
+    python -m archive --db primo.db --days 365 [--shards N --shard-dir DIR]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger("primo.archive")
+
+DEFAULT_AFTER_DAYS = 365
+
+class TaskArchiver:
+    """
+    Background mover of old completed tasks into the archive.
+
+    Args:
+        db: Storage with archive_completed_tasks / get_task_table_sizes
+        after_days: Days after its last update a completed task is archived
+        interval: Seconds between archival runs
+        batch_size: Tasks moved per transaction (per task file)
+        pause: Seconds to yield between batches
+    """
+
+    def __init__(
+        self,
+        db,
+        after_days: float = DEFAULT_AFTER_DAYS,
+        interval: float = 3600.0,
+        batch_size: int = 500,
+        pause: float = 0.05
+    ):
+        self.db = db
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, db) -> Optional["TaskArchiver"]:
+        """Build an archiver from PRIMO_ARCHIVE_* environment variables, or None when archival is off"""
+        after_days = float(os.getenv("PRIMO_ARCHIVE_AFTER_DAYS", str(DEFAULT_AFTER_DAYS)))
+        if after_days <= 0:
+            return None
+        return cls(
+            db,
+            after_days=after_days,
+            interval=float(os.getenv("PRIMO_ARCHIVE_INTERVAL", "3600")),
+            batch_size=int(os.getenv("PRIMO_ARCHIVE_BATCH_SIZE", "500"))
+        )
+
+    def cutoff(self) -> datetime:
+        """Completed tasks last updated before this (naive UTC, like the stored timestamps) are archived"""
+        return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.after_days)
+
+    async def run_once(self) -> int:
+        """Archive everything past the cutoff, batch by batch; returns tasks moved"""
+        cutoff = self.cutoff()
+        total = 0
+        while True:
+            moved = await self.db.archive_completed_tasks(cutoff, self.batch_size)
+            total += moved
+            if moved:
+                metrics.TASKS_ARCHIVED.inc(amount=moved)
+            # Every file returned a short batch: nothing left past the cutoff
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        await self.record_sizes()
+        if total:
+            logger.info("Archived %d completed tasks", total)
+        return total
+
+    async def record_sizes(self):
+        """Publish hot and archive table row counts on /metrics"""
+        for table, rows in (await self.db.get_task_table_sizes()).items():
+            metrics.TASK_ROWS.set(rows, (table,))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Archiving completed tasks failed")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+def main():
+    from database import SQLiteDatabase
+    from sharding import ShardedSQLiteDatabase
+
+    parser = argparse.ArgumentParser(description="Move old completed tasks into the archive table")
+    parser.add_argument("--db", default="primo.db", help="main database file")
+    parser.add_argument("--shards", type=int, default=1, help="shard count, if tasks are sharded")
+    parser.add_argument("--shard-dir", help="directory for shard files (default: next to --db)")
+    parser.add_argument("--days", type=float, default=DEFAULT_AFTER_DAYS, help="archive tasks completed this many days ago")
+    parser.add_argument("--batch-size", type=int, default=5000, help="tasks moved per transaction")
+    args = parser.parse_args()
+
+    if args.shards > 1:
+        db = ShardedSQLiteDatabase(args.db, shard_count=args.shards, shard_dir=args.shard_dir)
+    else:
+        db = SQLiteDatabase(args.db)
+    archiver = TaskArchiver(db, after_days=args.days, batch_size=args.batch_size, pause=0)
+    moved = asyncio.run(archiver.run_once())
+    sizes = asyncio.run(db.get_task_table_sizes())
+    print(f"🗄️ Archived {moved} tasks ({sizes['tasks']} in tasks, {sizes['archive']} in the archive)")
+    db.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Benchmark and load-test tools for Primo.
+
+Run from the repository root, e.g. `python -m benchmarks.bench_ai`.
+"""
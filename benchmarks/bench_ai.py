@@ -0,0 +1,115 @@
+"""
+Deterministic benchmark for the AI endpoints.
+
+Starts the local stand-in completion server, points AITaskAssistant at it and
+drives /ai/suggestions, /ai/expand-description and /ai/breakdown-task through
+the ASGI app at a target concurrency. Reports throughput, latency percentiles
+and how many upstream completion calls each scenario made, so caching and
+concurrency changes can be measured without API credits.
+
+    python -m benchmarks.bench_ai --requests 200 --concurrency 20 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import ROOT, print_table, summarize, write_results
+from benchmarks.fake_ai_server import add_server_arguments, config_from_args, start_in_thread
+
+SCENARIOS = ["suggestions", "expand-description", "breakdown-task"]
+
+# Fixed request inputs; cycling through a small vocabulary gives repeat
+# prompts, which is what caching changes need to show an effect
+TITLES = [
+    "Prepare quarterly report", "Plan team offsite", "Fix login bug", "Write blog post",
+    "Update dependencies", "Review pull requests", "Book flights", "Call the dentist",
+]
+
+def build_request(scenario: str, index: int) -> Dict[str, Any]:
+    """Deterministic request arguments for the index-th request of a scenario"""
+    title = TITLES[index % len(TITLES)]
+    if scenario == "suggestions":
+        return {"method": "GET", "url": "/ai/suggestions", "params": {"partial": title[: 3 + index % 5]}}
+    return {
+        "method": "POST",
+        "url": f"/ai/{scenario}",
+        "data": {"title": title, "description": "" if index % 2 else "Short note"},
+    }
+
+async def run_scenario(client, scenario: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send `requests` requests for a scenario with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        kwargs = build_request(scenario, index)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(**kwargs)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code != 200 or "error" in response.json():
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    server, fake_app = start_in_thread(config_from_args(args), args.port)
+    os.environ["OPENAI_API_KEY"] = "fake-benchmark-key"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+
+    workdir = tempfile.mkdtemp(prefix="primo-bench-")
+    os.environ["PRIMO_DB_PATH"] = str(Path(workdir) / "bench.db")
+    os.environ.setdefault("PRIMO_RATE_LIMIT", "0")  # measure the app, not the limiter
+    os.chdir(ROOT)
+
+    import app as app_module
+    from ai_service import close_ai_assistant, get_ai_assistant
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        credentials = {"email": "bench@example.com", "password": "benchmark-password"}
+        await client.post("/register", data=credentials)
+        await client.post("/login", data=credentials)
+        if not client.cookies.get("session_id"):
+            raise RuntimeError("Benchmark login failed")
+
+        ai_assistant = get_ai_assistant()
+        for scenario in args.scenarios:
+            fake_app.state.stats.reset()
+            calls_before = ai_assistant.backend.calls
+            row = await run_scenario(client, scenario, args.requests, args.concurrency)
+            row["upstream_calls"] = ai_assistant.backend.calls - calls_before
+            row["server_calls"] = fake_app.state.stats.as_dict()["calls"]
+            results[scenario] = row
+
+    await close_ai_assistant()
+    server.should_exit = True
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI endpoints against a local stand-in model server")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--port", type=int, default=8100, help="port for the stand-in server")
+    parser.add_argument("--output", help="write JSON results to this file")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors", "upstream_calls"])
+    write_results(args.output, "ai", vars(args), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Throughput of the JSON task API against the HTML endpoints.
+
+Seeds (or reuses) a database, logs virtual users in through
+/api/v1/auth/token and drives API reads and writes alongside the HTML task
+list and CSV export they replace for integrations. `api_walk` pages through
+a user's whole task list; it counts as one request and reports rows/s.
+
+    python -m benchmarks.bench_api --users 20 --tasks-per-user 5000 --concurrency 10 --output api.json
+    python -m benchmarks.bench_api --db bench.db --reuse --serializer json --compare api.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.bench_app import peak_rss_mb
+from benchmarks.common import ROOT, compare_results, print_table, summarize, write_results
+from benchmarks.seed import PASSWORD, seed_database, user_email
+
+SCENARIOS = [
+    "html_task_list", "export_csv", "api_page", "api_page_fields", "api_walk",
+    "api_get", "api_create", "api_bulk_create",
+]
+
+class APIUser:
+    """A client holding a bearer token plus the ids of tasks it owns"""
+
+    def __init__(self, client, token: str, task_ids: List[int]):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.task_ids = task_ids
+
+async def request_once(scenario: str, user: APIUser, rng: random.Random) -> int:
+    """Run one scenario request (a full pagination walk for api_walk); returns rows received"""
+    client, headers = user.client, user.headers
+    if scenario == "html_task_list":
+        response = await client.get("/tasks", headers=headers)
+    elif scenario == "export_csv":
+        response = await client.get("/export/csv", headers=headers)
+    elif scenario == "api_page":
+        response = await client.get("/api/v1/tasks", params={"limit": 100}, headers=headers)
+    elif scenario == "api_page_fields":
+        response = await client.get("/api/v1/tasks", params={"limit": 100, "fields": "id,title,status"}, headers=headers)
+    elif scenario == "api_walk":
+        rows = 0
+        params: Dict[str, Any] = {"limit": 1000}
+        while True:
+            response = await client.get("/api/v1/tasks", params=params, headers=headers)
+            response.raise_for_status()
+            body = response.json()
+            rows += len(body["data"])
+            if not body["next_cursor"]:
+                return rows
+            params["cursor"] = body["next_cursor"]
+    elif scenario == "api_get":
+        response = await client.get(f"/api/v1/tasks/{rng.choice(user.task_ids)}", headers=headers)
+    elif scenario == "api_create":
+        response = await client.post("/api/v1/tasks", headers=headers,
+                                     json={"title": f"Bench task {rng.randint(1, 10**6)}", "priority": "medium"})
+    else:
+        response = await client.post("/api/v1/tasks/bulk", headers=headers,
+                                     json={"create": [{"title": f"Bulk task {i}"} for i in range(100)]})
+    response.raise_for_status()
+    return 1
+
+async def run_scenario(scenario: str, users: List[APIUser], requests: int, rng: random.Random) -> Dict[str, Any]:
+    """Send `requests` requests spread over the users, one in flight per user"""
+    latencies: List[float] = []
+    errors = 0
+    rows = 0
+    per_user = [requests // len(users) + (1 if i < requests % len(users) else 0) for i in range(len(users))]
+
+    async def drive(user: APIUser, count: int):
+        nonlocal errors, rows
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                rows += await request_once(scenario, user, rng)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(user, count) for user, count in zip(users, per_user)))
+    elapsed = time.perf_counter() - start
+
+    row = summarize(latencies, elapsed, errors)
+    if scenario == "api_walk":
+        row["rows_per_s"] = round(rows / elapsed)
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="primo-bench-")) / "bench.db")
+    if not (args.reuse and Path(db_path).exists()):
+        seed_database(db_path, args.users, args.tasks_per_user, args.seed)
+    os.environ["PRIMO_DB_PATH"] = db_path
+    os.environ.setdefault("PRIMO_RATE_LIMIT", "0")  # measure the app, not the limiter
+    os.chdir(ROOT)
+
+    import app as app_module
+    import json_api
+
+    if args.serializer == "json":
+        json_api.orjson = None
+
+    rng = random.Random(args.seed)
+    with sqlite3.connect(db_path) as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id LIMIT ?", (args.concurrency,))]
+        owned = {
+            user_id: [row[0] for row in conn.execute("SELECT id FROM tasks WHERE user_id = ? LIMIT 1000", (user_id,))]
+            for user_id in user_ids
+        }
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    clients = []
+    api_users: List[APIUser] = []
+    for index, user_id in enumerate(user_ids):
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300)
+        clients.append(client)
+        response = await client.post("/api/v1/auth/token", json={"email": user_email(index), "password": PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f"Benchmark login failed for {user_email(index)}")
+        token = response.json()["token"]
+        # The token is a session token, so it also logs the client in to the HTML routes
+        client.cookies.set("session_id", token)
+        api_users.append(APIUser(client, token, owned[user_id]))
+
+    results: Dict[str, Any] = {}
+    try:
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(scenario, api_users, args.requests, rng)
+            print(f"  {scenario}: {results[scenario]['throughput_rps']} req/s")
+    finally:
+        for client in clients:
+            await client.aclose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API vs HTML endpoint throughput")
+    parser.add_argument("--users", type=int, default=20, help="users to seed")
+    parser.add_argument("--tasks-per-user", type=int, default=5000, help="tasks to seed per user")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--serializer", choices=["auto", "json"], default="auto",
+                        help="json forces the stdlib serializer even when orjson is installed")
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists instead of reseeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["throughput_rps", "p50_ms", "p95_ms", "errors", "rows_per_s"])
+    report = write_results(args.output, "api", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report)
+
+if __name__ == "__main__":
+    main()
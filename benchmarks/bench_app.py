@@ -0,0 +1,173 @@
+"""
+End-to-end load test for the web app.
+
+Seeds (or reuses) a database with synthetic users and tasks, then drives
+login, dashboard, task CRUD, reports and CSV export through the ASGI app at
+a controlled concurrency. Reports throughput, latency percentiles and peak
+memory per scenario, and stores results as JSON so runs can be compared
+across commits.
+
+    python -m benchmarks.bench_app --users 100 --tasks-per-user 1000 --concurrency 10 --output run.json
+    python -m benchmarks.bench_app --db bench.db --reuse --compare run.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import ROOT, compare_results, print_table, summarize, write_results
+from benchmarks.seed import PASSWORD, seed_database, user_email
+
+SCENARIOS = [
+    "login", "dashboard", "task_list", "create_task", "update_task",
+    "delete_task", "reports", "reports_export", "export_csv",
+]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / 1024 / (1024 if os.uname().sysname == "Darwin" else 1), 1)
+
+class VirtualUser:
+    """A logged-in client plus the ids of tasks it owns"""
+
+    def __init__(self, client, index: int, task_ids: List[int]):
+        self.client = client
+        self.index = index
+        self.task_ids = task_ids
+
+def build_request(scenario: str, user: VirtualUser, rng: random.Random) -> Dict[str, Any]:
+    """Request arguments for one scenario request"""
+    if scenario == "login":
+        return {"method": "POST", "url": "/login",
+                "data": {"email": user_email(user.index), "password": PASSWORD}}
+    if scenario == "dashboard":
+        return {"method": "GET", "url": "/dashboard"}
+    if scenario == "task_list":
+        return {"method": "GET", "url": "/tasks"}
+    if scenario == "create_task":
+        return {"method": "POST", "url": "/tasks",
+                "data": {"title": f"Bench task {rng.randint(1, 10**6)}", "description": "load test",
+                         "due_date": "", "priority": "medium"}}
+    if scenario == "update_task":
+        task_id = rng.choice(user.task_ids)
+        return {"method": "PUT", "url": f"/tasks/{task_id}",
+                "data": {"title": f"Updated {task_id}", "description": "", "due_date": "",
+                         "priority": rng.choice(["low", "high"]), "status": rng.choice(["todo", "completed"])}}
+    if scenario == "delete_task":
+        task_id = user.task_ids.pop() if user.task_ids else 0
+        return {"method": "DELETE", "url": f"/tasks/{task_id}"}
+    if scenario == "reports":
+        return {"method": "GET", "url": "/reports"}
+    if scenario == "reports_export":
+        return {"method": "GET", "url": "/reports/export"}
+    return {"method": "GET", "url": "/export/csv"}
+
+async def run_scenario(
+    scenario: str,
+    users: List[VirtualUser],
+    requests: int,
+    rng: random.Random,
+    trace_memory: bool
+) -> Dict[str, Any]:
+    """Send `requests` requests spread over the virtual users, one in flight per user"""
+    latencies: List[float] = []
+    errors = 0
+    per_user = [requests // len(users) + (1 if i < requests % len(users) else 0) for i in range(len(users))]
+
+    async def drive(user: VirtualUser, count: int):
+        nonlocal errors
+        for _ in range(count):
+            kwargs = build_request(scenario, user, rng)
+            start = time.perf_counter()
+            response = await user.client.request(**kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(user, count) for user, count in zip(users, per_user)))
+    elapsed = time.perf_counter() - start
+
+    row = summarize(latencies, elapsed, errors)
+    if trace_memory:
+        row["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="primo-bench-")) / "bench.db")
+    if not (args.reuse and Path(db_path).exists()):
+        seed_database(db_path, args.users, args.tasks_per_user, args.seed)
+    os.environ["PRIMO_DB_PATH"] = db_path
+    os.environ.setdefault("PRIMO_RATE_LIMIT", "0")  # measure the app, not the limiter
+    os.chdir(ROOT)
+
+    import app as app_module
+
+    rng = random.Random(args.seed)
+    with sqlite3.connect(db_path) as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id LIMIT ?", (args.concurrency,))]
+        owned = {
+            user_id: [row[0] for row in conn.execute("SELECT id FROM tasks WHERE user_id = ? LIMIT 1000", (user_id,))]
+            for user_id in user_ids
+        }
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    clients = []
+    virtual_users: List[VirtualUser] = []
+    for index, user_id in enumerate(user_ids):
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300)
+        clients.append(client)
+        await client.post("/login", data={"email": user_email(index), "password": PASSWORD})
+        if not client.cookies.get("session_id"):
+            raise RuntimeError(f"Benchmark login failed for {user_email(index)}")
+        virtual_users.append(VirtualUser(client, index, owned[user_id]))
+
+    results: Dict[str, Any] = {}
+    try:
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(scenario, virtual_users, args.requests, rng, args.trace_memory)
+            print(f"  {scenario}: {results[scenario]['throughput_rps']} req/s")
+    finally:
+        for client in clients:
+            await client.aclose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test for the Primo web app")
+    parser.add_argument("--users", type=int, default=100, help="users to seed")
+    parser.add_argument("--tasks-per-user", type=int, default=1000, help="tasks to seed per user")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent logged-in clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists instead of reseeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true", help="track peak Python allocations per scenario")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors", "peak_rss_mb"])
+    report = write_results(args.output, "app", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report)
+
+if __name__ == "__main__":
+    main()
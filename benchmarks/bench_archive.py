@@ -0,0 +1,115 @@
+"""
+Task reads before and after archiving old completed tasks.
+
+Seeds (or copies) a database, times per-user reads against the full tasks
+table, archives completed tasks older than --days with TaskArchiver (timing
+each batch, i.e. how long a batch holds the write lock), then times the same
+reads against the smaller hot table and, for search, with archived rows
+included.
+
+    python -m benchmarks.bench_archive --users 200 --tasks-per-user 5000 --output archive.json
+    python -m benchmarks.bench_archive --db bench.db --compare archive.json
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import compare_results, print_table, summarize, write_results
+from benchmarks.seed import seed_database
+
+async def time_reads(db, user_ids: List[str], label: str, results: Dict[str, Any], archived: bool = False):
+    from database import LIST_COLUMNS, REPORT_COLUMNS
+    from models import TaskFilter
+
+    reads = {
+        "report": lambda user_id: db.get_tasks(user_id, columns=REPORT_COLUMNS),
+        "search": lambda user_id: db.get_tasks(
+            user_id, columns=LIST_COLUMNS, filters=TaskFilter(search="review", archived=archived)
+        ),
+    }
+    for name, read in reads.items():
+        latencies = []
+        start = time.perf_counter()
+        for user_id in user_ids:
+            began = time.perf_counter()
+            await read(user_id)
+            latencies.append(time.perf_counter() - began)
+        key = f"{name}_{label}"
+        results[key] = summarize(latencies, time.perf_counter() - start)
+        print(f"  {key}: p50 {results[key]['p50_ms']} ms")
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from archive import TaskArchiver
+    from database import SQLiteDatabase
+
+    # Archiving rewrites the file, so always work on a fresh copy
+    work_dir = Path(tempfile.mkdtemp(prefix="primo-bench-"))
+    db_path = str(work_dir / "bench.db")
+    if args.db and Path(args.db).exists():
+        shutil.copy(args.db, db_path)
+    else:
+        seed_database(db_path, args.users, args.tasks_per_user, args.seed)
+    with sqlite3.connect(db_path) as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+
+    db = SQLiteDatabase(db_path)
+    rng = random.Random(args.seed)
+    sample = [rng.choice(user_ids) for _ in range(args.requests)]
+    results: Dict[str, Any] = {}
+    await time_reads(db, sample, "full", results)
+
+    original = db.archive_completed_tasks
+    batches: List[float] = []
+
+    async def timed_batch(before, limit=500):
+        began = time.perf_counter()
+        try:
+            return await original(before, limit)
+        finally:
+            batches.append(time.perf_counter() - began)
+
+    db.archive_completed_tasks = timed_batch
+    archiver = TaskArchiver(db, after_days=args.days, batch_size=args.batch_size, pause=0)
+    start = time.perf_counter()
+    moved = await archiver.run_once()
+    elapsed = time.perf_counter() - start
+    sizes = await db.get_task_table_sizes()
+    results["archive"] = {
+        **summarize(batches, elapsed), "moved": moved, "tasks_per_s": round(moved / elapsed) if elapsed else 0,
+        "hot_rows": sizes["tasks"], "archived_rows": sizes["archive"],
+    }
+    print(f"  archived {moved} tasks in {elapsed:.1f}s ({sizes['tasks']} left in tasks)")
+
+    await time_reads(db, sample, "hot", results)
+    await time_reads(db, sample, "with_archive", results, archived=True)
+    db.pool.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Task read latency before and after archival")
+    parser.add_argument("--users", type=int, default=200, help="users to seed")
+    parser.add_argument("--tasks-per-user", type=int, default=5000, help="tasks to seed per user")
+    parser.add_argument("--requests", type=int, default=200, help="reads per mode")
+    parser.add_argument("--days", type=float, default=30, help="archive tasks completed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=500, help="tasks moved per transaction")
+    parser.add_argument("--db", help="seeded database to copy (default: seed a fresh one)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["p50_ms", "p95_ms", "total_ms", "moved", "tasks_per_s", "hot_rows", "archived_rows"])
+    report = write_results(args.output, "archive", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report, ["p50_ms", "p95_ms", "total_ms"])
+
+if __name__ == "__main__":
+    main()
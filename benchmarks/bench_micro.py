@@ -0,0 +1,161 @@
+"""
+Microbenchmarks for the database and row-conversion hot paths.
+
+Covers SQLiteDatabase methods, row materialization (tuples vs sqlite3.Row vs
+parsed dicts vs TaskRecord), report aggregation and CSV writing at several data sizes.
+Each case is timed over auto-calibrated rounds; medians are compared with
+`micro_baseline.json` and the run fails when a case regresses past the
+tolerance. The committed baseline covers all three sizes (default rounds) and
+was recorded with Python 3.11 on a single-core x86_64 Linux VM (Intel Xeon);
+re-record it with --update-baseline when the reference machine changes.
+
+    python -m benchmarks.bench_micro                       # 100 / 10k / 1M rows
+    python -m benchmarks.bench_micro --sizes 100 10000 -k get_tasks
+    python -m benchmarks.bench_micro --update-baseline
+"""
+import argparse
+import asyncio
+import io
+import json
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import write_results
+from benchmarks.seed import seed_database
+
+BASELINE_PATH = Path(__file__).with_name("micro_baseline.json")
+
+def measure(func: Callable[[], Any], rounds: int, min_round_time: float = 0.2) -> Dict[str, float]:
+    """Time `func` over several rounds, calibrating iterations per round; returns seconds per call"""
+    start = time.perf_counter()
+    func()
+    single = time.perf_counter() - start
+    iterations = max(1, int(min_round_time / single)) if single > 0 else 1000
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_call.append((time.perf_counter() - start) / iterations)
+    return {
+        "median_ms": round(statistics.median(per_call) * 1000, 4),
+        "min_ms": round(min(per_call) * 1000, 4),
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+def build_cases(db_path: str, user_id: str, size: int) -> List[Tuple[str, Callable[[], Any]]]:
+    """Benchmark cases for a database holding `size` tasks for `user_id`"""
+    from database import TASK_COLUMNS, SQLiteDatabase, TaskRecord, parse_task_row
+    from models import TaskCreate
+    from reports import summarize_tasks, write_tasks_csv
+
+    db = SQLiteDatabase(db_path)
+    loop = asyncio.new_event_loop()
+    run = loop.run_until_complete
+
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            'SELECT * FROM tasks WHERE user_id = ? ORDER BY created_at DESC', (user_id,)
+        ).fetchall()
+    parsed = [parse_task_row(row) for row in rows]
+    tuples = [tuple(row[name] for name in TASK_COLUMNS) for row in rows]
+    index = {name: position for position, name in enumerate(TASK_COLUMNS)}
+    some_id = rows[len(rows) // 2]["id"]
+    new_tasks = [TaskCreate(title=f"Micro {i}") for i in range(100)]
+
+    def fetch(row_factory):
+        def inner():
+            with sqlite3.connect(db_path) as conn:
+                conn.row_factory = row_factory
+                return conn.execute(
+                    'SELECT * FROM tasks WHERE user_id = ? ORDER BY created_at DESC', (user_id,)
+                ).fetchall()
+        return inner
+
+    def csv_write():
+        output = io.StringIO()
+        write_tasks_csv(parsed, output)
+        return output.getvalue()
+
+    return [
+        ("db.get_tasks", lambda: run(db.get_tasks(user_id))),
+        ("db.get_task", lambda: run(db.get_task(some_id, user_id))),
+        ("db.get_recent_task_summaries", lambda: run(db.get_recent_task_summaries(user_id, 10))),
+        ("db.create_tasks[100]", lambda: run(db.create_tasks(new_tasks, "micro-writer"))),
+        ("rows.fetch_tuples", fetch(None)),
+        ("rows.fetch_sqlite_row", fetch(sqlite3.Row)),
+        ("rows.parse_task_row", lambda: [parse_task_row(row) for row in rows]),
+        ("rows.task_record", lambda: [TaskRecord(values, index) for values in tuples]),
+        ("reports.summarize_tasks", lambda: summarize_tasks(parsed)),
+        # Fresh records each call so lazy date parsing is included in the timing
+        ("reports.summarize_task_records", lambda: summarize_tasks([TaskRecord(v, index) for v in tuples])),
+        ("reports.write_tasks_csv", csv_write),
+    ]
+
+def check_regressions(results: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Compare medians with the baseline; returns descriptions of regressed cases"""
+    if not BASELINE_PATH.exists():
+        print("ℹ️  No baseline recorded yet; run with --update-baseline to create one")
+        return []
+    baseline = json.loads(BASELINE_PATH.read_text())
+    regressions = []
+    for name, row in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        limit = reference * (1 + tolerance)
+        if row["median_ms"] > limit:
+            regressions.append(f"{name}: {row['median_ms']} ms > {limit:.4f} ms (baseline {reference} ms)")
+    return regressions
+
+def run(sizes: List[int], keyword: Optional[str], rounds: int) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="primo-micro-") as workdir:
+        for size in sizes:
+            db_path = str(Path(workdir) / f"micro_{size}.db")
+            user_id = seed_database(db_path, users=1, tasks_per_user=size)[0]
+            for name, func in build_cases(db_path, user_id, size):
+                case = f"{name}[n={size}]"
+                if keyword and keyword not in case:
+                    continue
+                results[case] = measure(func, rounds if size < 1_000_000 else max(1, rounds // 2))
+                print(f"  {case:<45} {results[case]['median_ms']:>12.4f} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for database and row-conversion hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("-k", dest="keyword", help="only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed regression over baseline (fraction)")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write medians to {BASELINE_PATH.name}")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.keyword, args.rounds)
+    write_results(args.output, "micro", vars(args), results)
+
+    if args.update_baseline:
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        baseline.update({name: row["median_ms"] for name, row in results.items()})
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"📄 Baseline updated: {BASELINE_PATH}")
+        return
+
+    regressions = check_regressions(results, args.tolerance)
+    for regression in regressions:
+        print(f"❌ Regressed: {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"✅ No case regressed more than {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
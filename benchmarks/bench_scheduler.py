@@ -0,0 +1,91 @@
+"""
+Cost of overdue counts: scanning a user's tasks vs the due-date scheduler.
+
+Seeds (or reuses) a database, rebuilds a DueDateScheduler from the open-due
+index, then times per-request overdue lookups both ways (`scan` reads the
+REPORT_COLUMNS projection and counts in Python, as the reports page did) and
+the daily `advance` that moves tasks into overdue and emits reminders.
+
+    python -m benchmarks.bench_scheduler --users 200 --tasks-per-user 5000 --output scheduler.json
+    python -m benchmarks.bench_scheduler --db bench.db --reuse --compare scheduler.json
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import compare_results, print_table, summarize, write_results
+from benchmarks.seed import seed_database
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from database import REPORT_COLUMNS, SQLiteDatabase
+    from reports import summarize_tasks
+    from scheduler import DueDateScheduler
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="primo-bench-")) / "bench.db")
+    if not (args.reuse and Path(db_path).exists()):
+        seed_database(db_path, args.users, args.tasks_per_user, args.seed)
+    with sqlite3.connect(db_path) as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+
+    db = SQLiteDatabase(db_path)
+    reminders: List[tuple] = []
+    scheduler = DueDateScheduler(db, on_reminder=lambda *event: reminders.append(event))
+    results: Dict[str, Any] = {}
+
+    start = time.perf_counter()
+    await scheduler.rebuild()
+    elapsed = time.perf_counter() - start
+    tracked = sum(len(state.tasks) for state in scheduler._users.values())
+    results["rebuild"] = {"total_ms": round(elapsed * 1000, 1), "tasks": tracked, "heap_entries": len(scheduler._heap)}
+    print(f"  rebuild: {tracked} open due tasks in {elapsed * 1000:.0f} ms")
+
+    rng = random.Random(args.seed)
+    sample = [rng.choice(user_ids) for _ in range(args.requests)]
+    for mode in ("scan", "scheduler"):
+        latencies = []
+        start = time.perf_counter()
+        for user_id in sample:
+            began = time.perf_counter()
+            if mode == "scan":
+                summarize_tasks(await db.get_tasks(user_id, columns=REPORT_COLUMNS))["overdue_count"]
+            else:
+                await scheduler.overdue_count(user_id)
+            latencies.append(time.perf_counter() - began)
+        results[f"overdue_{mode}"] = summarize(latencies, time.perf_counter() - start)
+        print(f"  overdue_{mode}: p50 {results[f'overdue_{mode}']['p50_ms']} ms")
+
+    for offset in (1, 7):
+        start = time.perf_counter()
+        sent = scheduler.advance(date.today() + timedelta(days=offset))
+        results[f"advance_{offset}d"] = {
+            "total_ms": round((time.perf_counter() - start) * 1000, 1), "reminders": sent,
+            "heap_entries": len(scheduler._heap),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Overdue counts by scan vs the due-date scheduler")
+    parser.add_argument("--users", type=int, default=200, help="users to seed")
+    parser.add_argument("--tasks-per-user", type=int, default=5000, help="tasks to seed per user")
+    parser.add_argument("--requests", type=int, default=200, help="overdue lookups per mode")
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists instead of reseeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["p50_ms", "p95_ms", "total_ms", "tasks", "reminders", "heap_entries"])
+    report = write_results(args.output, "scheduler", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report, ["p50_ms", "p95_ms", "total_ms"])
+
+if __name__ == "__main__":
+    main()
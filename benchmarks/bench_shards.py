@@ -0,0 +1,142 @@
+"""
+Write-throughput benchmark for per-user sharding.
+
+Runs the app the way server.py does in production: several worker
+processes, each with its own event loop, serving concurrent clients (one
+user each) that create tasks through `POST /api/v1/tasks`, each committed on
+its own. Requests go through the ASGI app in-process (httpx.ASGITransport),
+so the numbers include routing, auth and serialization but no sockets. Each
+shard count runs against a fresh database, unsharded (shards=1) and with
+ShardedSQLiteDatabase (PRIMO_SHARDS). Writers on the same file queue on its
+write lock, so throughput should scale with the shard count until the disk
+or the worker count becomes the bottleneck.
+
+    python -m benchmarks.bench_shards --workers 4 --concurrency 4 --writes 250 --shards 1 2 4 8 --output shards.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import ROOT, compare_results, print_table, summarize, write_results
+
+PASSWORD = "bench-password"
+
+def configure(db_path: str, shards: int):
+    """Point the app at the benchmark database before it is imported"""
+    os.environ["PRIMO_DB_PATH"] = db_path
+    os.environ["PRIMO_SHARDS"] = str(shards)
+    os.environ["PRIMO_RATE_LIMIT"] = "0"  # measure storage, not the limiter
+    os.environ.pop("PRIMO_DATABASE_URL", None)
+
+async def worker(args: argparse.Namespace):
+    """One app worker: log its clients in, report ready, write on "go", print latencies as JSON"""
+    import httpx
+
+    configure(args.db, args.shards[0])
+    os.chdir(ROOT)
+    import app as app_module
+    from models import UserCreate
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300)
+    headers = []
+    for index in range(args.concurrency):
+        email = f"writer-{args.worker_index}-{index}@bench.test"
+        await app_module.db.sign_up(UserCreate(email=email, password=PASSWORD))
+        response = await client.post("/api/v1/auth/token", json={"email": email, "password": PASSWORD})
+        token = response.json()["token"]
+        headers.append({"Authorization": f"Bearer {token}"})
+        # Warm up routing and this worker's pooled connections before timing
+        await client.get("/api/v1/tasks", params={"limit": 1}, headers=headers[-1])
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def write_all(user_headers: Dict[str, str], index: int):
+        nonlocal errors
+        for n in range(args.writes):
+            start = time.perf_counter()
+            response = await client.post("/api/v1/tasks", json={"title": f"Shard write {index}.{n}"}, headers=user_headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    await asyncio.gather(*(write_all(user_headers, index) for index, user_headers in enumerate(headers)))
+    await client.aclose()
+    print(json.dumps({"latencies": latencies, "errors": errors}), flush=True)
+
+def run_case(shards: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """Time `workers` app processes × `concurrency` clients × `writes` task creations"""
+    db_path = str(Path(workdir) / f"shards_{shards}" / "bench.db")
+    Path(db_path).parent.mkdir()
+    # Create the schema once so the workers don't race to initialize it
+    initialize = f"import benchmarks.bench_shards as b; b.configure({db_path!r}, {shards}); import app"
+    subprocess.run([sys.executable, "-c", initialize], cwd=ROOT, check=True, capture_output=True)
+
+    command = [
+        sys.executable, "-m", "benchmarks.bench_shards", "--worker", "--db", db_path, "--shards", str(shards),
+        "--concurrency", str(args.concurrency), "--writes", str(args.writes),
+    ]
+    workers = [
+        subprocess.Popen(command + ["--worker-index", str(index)], cwd=ROOT, stdin=subprocess.PIPE,
+                         stdout=subprocess.PIPE, text=True)
+        for index in range(args.workers)
+    ]
+    for process in workers:
+        # App startup may print its own lines before the worker is ready
+        while process.stdout.readline().strip() != "ready":
+            if process.poll() is not None:
+                raise RuntimeError(f"Benchmark worker exited with {process.returncode}")
+
+    start = time.perf_counter()
+    for process in workers:
+        process.stdin.write("go\n")
+        process.stdin.flush()
+    reports = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in workers]
+    elapsed = time.perf_counter() - start
+
+    row = summarize([latency for report in reports for latency in report["latencies"]], elapsed,
+                    sum(report["errors"] for report in reports))
+    row["writes_per_s"] = row.pop("throughput_rps")
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Task write throughput by shard count")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="shard counts (1 = unsharded)")
+    parser.add_argument("--workers", type=int, default=4, help="app worker processes, as started by server.py")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients per worker, one user each")
+    parser.add_argument("--writes", type=int, default=250, help="tasks created per client")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-index", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker(args))
+        return
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="primo-shards-") as workdir:
+        for shards in args.shards:
+            name = f"shards={shards}"
+            results[name] = run_case(shards, args, workdir)
+            print(f"  {name}: {results[name]['writes_per_s']} writes/s")
+
+    print_table(results, ["writes_per_s", "p50_ms", "p95_ms", "p99_ms", "errors"])
+    report = write_results(args.output, "shards", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report, ["writes_per_s", "p50_ms", "p95_ms", "p99_ms"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Startup-time benchmark based on `python -X importtime`.
+
+Imports the app in fresh interpreters, reports wall-clock and cumulative
+import time with the slowest imports at any nesting depth (by cumulative and
+by self time, median per module across runs), and fails when heavy
+optional modules (the OpenAI client, dotenv) are imported at startup or when
+import time regresses past the recorded baseline.
+
+    python -m benchmarks.bench_startup                     # check against the baseline
+    python -m benchmarks.bench_startup --update-baseline   # record a new baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from benchmarks.common import ROOT, write_results
+
+BASELINE_PATH = Path(__file__).with_name("startup_baseline.json")
+
+# Modules that must stay out of the startup path (they load lazily on first AI use)
+FORBIDDEN_AT_STARTUP = ["openai", "dotenv"]
+
+class ImportRow(NamedTuple):
+    """One `-X importtime` line; depth 0 is an import made directly by the script"""
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+def parse_importtime(stderr: str) -> List[ImportRow]:
+    """Parse `-X importtime` output into rows, keeping the nesting depth of each import"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, timings = line.split(":", 1)
+            self_us, cumulative_us, name = timings.split("|", 2)
+            # One space separates the column; each further pair of spaces is one nesting level
+            name = name.rstrip()[1:]
+            depth = (len(name) - len(name.lstrip(" "))) // 2
+            rows.append(ImportRow(name.strip(), depth, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+def slowest(samples: Dict[str, List[int]], count: int = 10) -> Dict[str, float]:
+    """The `count` modules with the highest median time, in milliseconds"""
+    medians = {name: statistics.median(values) for name, values in samples.items()}
+    ranked = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:count]
+    return {name: round(us / 1000, 1) for name, us in ranked}
+
+def measure_once(module: str, db_path: str) -> Tuple[float, List[ImportRow]]:
+    """Import `module` in a fresh interpreter; return (wall seconds, importtime rows)"""
+    env = dict(os.environ, PRIMO_DB_PATH=db_path)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return wall, parse_importtime(completed.stderr)
+
+def run(module: str, runs: int) -> Dict:
+    walls: List[float] = []
+    totals: List[int] = []
+    cumulative: Dict[str, List[int]] = {}
+    own: Dict[str, List[int]] = {}
+    imported = set()
+    with tempfile.TemporaryDirectory(prefix="primo-startup-") as workdir:
+        db_path = str(Path(workdir) / "startup.db")
+        for _ in range(runs):
+            wall, rows = measure_once(module, db_path)
+            walls.append(wall)
+            totals.append(sum(row.cumulative_us for row in rows if row.depth == 0))
+            for row in rows:
+                cumulative.setdefault(row.name, []).append(row.cumulative_us)
+                own.setdefault(row.name, []).append(row.self_us)
+                imported.add(row.name.split(".")[0])
+
+    # The module itself is the whole import; rank what it pulls in
+    cumulative.pop(module, None)
+    return {
+        "module": module,
+        "runs": runs,
+        "wall_ms_median": round(statistics.median(walls) * 1000, 1),
+        "import_ms_median": round(statistics.median(totals) / 1000, 1),
+        "slowest_imports_ms": slowest(cumulative),
+        "slowest_self_ms": slowest(own),
+        "forbidden_imported": sorted(m for m in FORBIDDEN_AT_STARTUP if m in imported),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure application import/startup time")
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression over baseline (fraction)")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write results to {BASELINE_PATH.name}")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    result = run(args.module, args.runs)
+    print(f"⏱️  import {args.module}: {result['import_ms_median']} ms imports, "
+          f"{result['wall_ms_median']} ms wall (median of {args.runs})")
+    print("   slowest imports (cumulative, any depth):")
+    for name, ms in result["slowest_imports_ms"].items():
+        print(f"   {ms:>8.1f} ms  {name}")
+    print("   slowest modules (self time):")
+    for name, ms in result["slowest_self_ms"].items():
+        print(f"   {ms:>8.1f} ms  {name}")
+    write_results(args.output, "startup", vars(args), result)
+
+    failed = False
+    if result["forbidden_imported"]:
+        print(f"❌ Imported at startup (should be lazy): {', '.join(result['forbidden_imported'])}")
+        failed = True
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps({
+            "module": args.module,
+            "import_ms_median": result["import_ms_median"],
+            "wall_ms_median": result["wall_ms_median"],
+            "slowest_imports_ms": result["slowest_imports_ms"],
+            "slowest_self_ms": result["slowest_self_ms"],
+        }, indent=2) + "\n")
+        print(f"📄 Baseline updated: {BASELINE_PATH}")
+    elif BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text())
+        limit = baseline["import_ms_median"] * (1 + args.tolerance)
+        if baseline.get("module") == args.module and result["import_ms_median"] > limit:
+            print(f"❌ Import time regressed: {result['import_ms_median']} ms > {limit:.1f} ms "
+                  f"(baseline {baseline['import_ms_median']} ms + {args.tolerance:.0%})")
+            failed = True
+        else:
+            print(f"✅ Within {args.tolerance:.0%} of baseline ({baseline['import_ms_median']} ms)")
+    else:
+        print("ℹ️  No baseline recorded yet; run with --update-baseline to create one")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Time-to-first-byte and memory of buffered vs streamed HTML rendering.
+
+Seeds one user with a large task list, then requests the dashboard and the
+task list fragment through the ASGI app directly (so the first body chunk
+can be timed), once with whole-page rendering and once streamed
+(PRIMO_STREAM_HTML). Reports time to first byte, total time and peak traced
+allocations per request.
+
+    python -m benchmarks.bench_stream --tasks 50000 --repeat 5 --output stream.json
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import ROOT, compare_results, percentile, print_table, write_results
+from benchmarks.seed import PASSWORD, seed_database, user_email
+
+PAGES = {"dashboard": "/dashboard", "task_list": "/tasks"}
+
+async def timed_get(app, path: str, cookie: str) -> Tuple[float, float, int]:
+    """GET through the raw ASGI interface; returns (seconds to first body byte, total seconds, body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    sent_request = False
+    first_byte = None
+    size = 0
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} returned {message['status']}")
+        if message["type"] == "http.response.body" and message.get("body"):
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            size += len(message["body"])
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return first_byte - start, time.perf_counter() - start, size
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="primo-bench-")) / "bench.db")
+    if not (args.reuse and Path(db_path).exists()):
+        seed_database(db_path, 1, args.tasks, args.seed)
+    os.environ["PRIMO_DB_PATH"] = db_path
+    os.environ.setdefault("PRIMO_RATE_LIMIT", "0")  # measure the app, not the limiter
+    os.chdir(ROOT)
+
+    import app as app_module
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench") as client:
+        await client.post("/login", data={"email": user_email(0), "password": PASSWORD})
+        session_id = client.cookies.get("session_id")
+    if not session_id:
+        raise RuntimeError(f"Benchmark login failed for {user_email(0)}")
+    cookie = f"session_id={session_id}"
+
+    results: Dict[str, Any] = {}
+    for page, path in PAGES.items():
+        for mode in ("buffered", "streamed"):
+            app_module.STREAM_HTML = mode == "streamed"
+            await timed_get(app_module.app, path, cookie)  # warm-up (template compile, cache fill)
+            first_bytes: List[float] = []
+            totals: List[float] = []
+            peak = 0
+            for _ in range(args.repeat):
+                tracemalloc.start()
+                first_byte, total, size = await timed_get(app_module.app, path, cookie)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                first_bytes.append(first_byte)
+                totals.append(total)
+            results[f"{page}_{mode}"] = {
+                "ttfb_p50_ms": round(percentile(first_bytes, 50) * 1000, 2),
+                "total_p50_ms": round(percentile(totals, 50) * 1000, 2),
+                "body_kb": round(size / 1024),
+                "peak_traced_mb": round(peak / 1024 / 1024, 1),
+            }
+            print(f"  {page} ({mode}): first byte after {results[f'{page}_{mode}']['ttfb_p50_ms']} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Buffered vs streamed HTML rendering of a large task list")
+    parser.add_argument("--tasks", type=int, default=20000, help="tasks to seed for the benchmark user")
+    parser.add_argument("--repeat", type=int, default=5, help="requests per page and mode")
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists instead of reseeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["ttfb_p50_ms", "total_p50_ms", "body_kb", "peak_traced_mb"])
+    report = write_results(args.output, "stream", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report, ["ttfb_p50_ms", "total_p50_ms", "peak_traced_mb"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Subtask trees: closure-table reads and writes vs recursive CTEs over parent_id.
+
+Seeds (or reuses) a database of flat tasks, then builds two trees for one
+user: a deep chain (--depth levels, one create_task per level) and a wide
+tree (--width children of one root, one create_tasks call). For each tree it
+times subtree reads and completion counts both through the closure table
+(`get_subtree`, `get_task_progress`) and with a recursive CTE walking
+parent_id (given its own index in the bench file), then toggling the deepest
+leaf (every ancestor's counts change), moving a subtree away and back, and
+deleting the whole tree.
+
+    python -m benchmarks.bench_subtasks --depth 100 --width 10000 --output subtasks.json
+    python -m benchmarks.bench_subtasks --db bench.db --reuse --compare subtasks.json
+"""
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import compare_results, print_table, summarize, write_results
+from benchmarks.seed import seed_database
+
+SUBTREE_CTE = '''
+    WITH RECURSIVE subtree(id, depth) AS (
+        SELECT ?, 0
+        UNION ALL SELECT t.id, s.depth + 1 FROM tasks t JOIN subtree s ON t.parent_id = s.id
+    )
+    SELECT t.id, t.title, t.status, t.parent_id, t.created_at
+    FROM subtree s JOIN tasks t ON t.id = s.id
+    ORDER BY s.depth, t.created_at, t.id
+'''
+
+PROGRESS_CTE = '''
+    WITH RECURSIVE subtree(id) AS (
+        SELECT id FROM tasks WHERE parent_id = ?
+        UNION ALL SELECT t.id FROM tasks t JOIN subtree s ON t.parent_id = s.id
+    )
+    SELECT COUNT(*), COALESCE(SUM(t.status = 'completed'), 0) FROM subtree s JOIN tasks t ON t.id = s.id
+'''
+
+async def timed(results: Dict[str, Any], key: str, repeat: int, call) -> None:
+    latencies = []
+    start = time.perf_counter()
+    for attempt in range(repeat):
+        began = time.perf_counter()
+        await call(attempt)
+        latencies.append(time.perf_counter() - began)
+    results[key] = summarize(latencies, time.perf_counter() - start)
+    print(f"  {key}: p50 {results[key]['p50_ms']} ms")
+
+async def bench_tree(db, conn: sqlite3.Connection, user_id: str, shape: str, root: int, leaf: int, mover: int,
+                     nodes: int, args: argparse.Namespace, results: Dict[str, Any]):
+    from models import TaskCreate, TaskStatus, TaskUpdate
+
+    columns = ("id", "title", "status", "parent_id", "created_at")
+    await timed(results, f"{shape}_subtree", args.requests, lambda _: db.get_subtree(root, user_id, columns))
+    await timed(results, f"{shape}_subtree_cte", args.requests, lambda _: asyncio.to_thread(
+        lambda: conn.execute(SUBTREE_CTE, (root,)).fetchall()
+    ))
+    await timed(results, f"{shape}_progress", args.requests, lambda _: db.get_task_progress(user_id))
+    await timed(results, f"{shape}_progress_cte", args.requests, lambda _: asyncio.to_thread(
+        lambda: conn.execute(PROGRESS_CTE, (root,)).fetchone()
+    ))
+    progress = (await db.get_task_progress(user_id))[root]
+    counted = conn.execute(PROGRESS_CTE, (root,)).fetchone()
+    assert progress == (counted[1], counted[0]), (progress, counted)
+
+    statuses = (TaskStatus.COMPLETED, TaskStatus.TODO)
+    await timed(results, f"{shape}_toggle_leaf", args.requests, lambda attempt: db.update_task(
+        leaf, TaskUpdate(status=statuses[attempt % 2]), user_id
+    ))
+
+    # Away from its parent and back again, alternately
+    parent = conn.execute("SELECT parent_id FROM tasks WHERE id = ?", (mover,)).fetchone()[0]
+    if parent is None:
+        parent = (await db.create_task(TaskCreate(title=f"{shape} holder"), user_id))["data"]["id"]
+        await db.move_task(mover, parent, user_id)
+    await timed(results, f"{shape}_move", args.moves, lambda attempt: db.move_task(
+        mover, None if attempt % 2 == 0 else parent, user_id
+    ))
+
+    start = time.perf_counter()
+    result = await db.delete_task(root, user_id)
+    results[f"{shape}_delete"] = {
+        "total_ms": round((time.perf_counter() - start) * 1000, 1), "nodes": 1 + len(result["data"]["subtasks"]),
+    }
+    results[f"{shape}_subtree"]["nodes"] = nodes
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from database import SQLiteDatabase
+    from models import TaskCreate, TaskStatus
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="primo-bench-")) / "bench.db")
+    if not (args.reuse and Path(db_path).exists()):
+        seed_database(db_path, args.users, args.tasks_per_user, args.seed)
+    db = SQLiteDatabase(db_path)
+    # Baseline only: the app itself never looks tasks up by parent_id
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_id)")
+    user_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+    results: Dict[str, Any] = {}
+
+    # Deep: a chain, every other level completed
+    start = time.perf_counter()
+    chain: List[int] = []
+    for level in range(args.depth):
+        task = TaskCreate(
+            title=f"level {level}", parent_id=chain[-1] if chain else None,
+            status=TaskStatus.COMPLETED if level % 2 else TaskStatus.TODO
+        )
+        chain.append((await db.create_task(task, user_id))["data"]["id"])
+    results["deep_build"] = {"total_ms": round((time.perf_counter() - start) * 1000, 1), "nodes": len(chain)}
+    await bench_tree(db, conn, user_id, "deep", chain[0], chain[-1], chain[len(chain) // 2], len(chain), args, results)
+
+    # Wide: one root, every child in one transaction
+    root = (await db.create_task(TaskCreate(title="wide root"), user_id))["data"]["id"]
+    start = time.perf_counter()
+    await db.create_tasks([
+        TaskCreate(title=f"child {n}", parent_id=root, status=TaskStatus.COMPLETED if n % 3 == 0 else TaskStatus.TODO)
+        for n in range(args.width)
+    ], user_id)
+    results["wide_build"] = {"total_ms": round((time.perf_counter() - start) * 1000, 1), "nodes": args.width + 1}
+    leaf = conn.execute("SELECT MAX(id) FROM tasks WHERE parent_id = ?", (root,)).fetchone()[0]
+    await bench_tree(db, conn, user_id, "wide", root, leaf, root, args.width + 1, args, results)
+
+    conn.close()
+    db.pool.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Subtask tree reads and writes: closure table vs recursive CTE")
+    parser.add_argument("--users", type=int, default=50, help="users to seed (flat background tasks)")
+    parser.add_argument("--tasks-per-user", type=int, default=2000, help="tasks to seed per user")
+    parser.add_argument("--depth", type=int, default=100, help="levels in the deep chain (at most MAX_SUBTASK_DEPTH + 1)")
+    parser.add_argument("--width", type=int, default=10000, help="children under the wide tree's root")
+    parser.add_argument("--requests", type=int, default=200, help="reads and leaf toggles per tree")
+    parser.add_argument("--moves", type=int, default=20, help="subtree moves per tree")
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists instead of reseeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, ["p50_ms", "p95_ms", "total_ms", "nodes"])
+    report = write_results(args.output, "subtasks", vars(args), results)
+    if args.compare:
+        compare_results(args.compare, report, ["p50_ms", "p95_ms", "total_ms"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+import json
+import math
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Summarize request latencies (seconds) collected over `elapsed` seconds"""
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+def git_revision() -> Optional[str]:
+    """Short hash of the current commit, if available"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+def write_results(path: Optional[str], name: str, config: Dict[str, Any], results: Any) -> Dict[str, Any]:
+    """Wrap results with run metadata and write them as JSON when a path is given"""
+    report = {
+        "benchmark": name,
+        "commit": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "results": results,
+    }
+    if path:
+        Path(path).write_text(json.dumps(report, indent=2, default=str))
+        print(f"📄 Results written to {path}")
+    return report
+
+def print_table(rows: Dict[str, Dict[str, Any]], columns: List[str]):
+    """Print a simple aligned table of per-scenario results"""
+    name_width = max([len("scenario")] + [len(name) for name in rows])
+    header = "scenario".ljust(name_width) + "".join(col.rjust(16) for col in columns)
+    print(header)
+    print("-" * len(header))
+    for name, row in rows.items():
+        print(name.ljust(name_width) + "".join(str(row.get(col, "")).rjust(16) for col in columns))
+
+def compare_results(previous_path: str, current: Dict[str, Any], metrics: Optional[List[str]] = None):
+    """Print per-scenario changes between a previous JSON report and the current one"""
+    previous = json.loads(Path(previous_path).read_text())
+    metrics = metrics or ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"\nCompared with {previous.get('commit') or previous_path} ({previous.get('timestamp', '?')}):")
+    for scenario, row in current["results"].items():
+        before = previous.get("results", {}).get(scenario)
+        if not isinstance(before, dict):
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = before.get(metric), row.get(metric)
+            if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+                changes.append(f"{metric} {old} → {new} ({(new - old) / old:+.0%})")
+        print(f"  {scenario}: " + "; ".join(changes))
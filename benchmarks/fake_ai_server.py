@@ -0,0 +1,232 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Speaks enough of `POST /v1/chat/completions` (including `stream=true` and
+JSON mode) for AITaskAssistant to work against it, with configurable latency
+and error rate. Replies are generated from the prompt, so runs are
+repeatable and cost nothing.
+
+    python -m benchmarks.fake_ai_server --port 8100 --latency-ms 400 --error-rate 0.02
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TASK_LINE = re.compile(r'^(\d+)\. Title: "(.*?)"', re.MULTILINE)
+QUOTED = re.compile(r'"(.*?)"')
+
+class FakeServerConfig:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        latency_dist: str = "lognormal",
+        jitter: float = 0.3,
+        error_rate: float = 0.0,
+        seed: int = 42
+    ):
+        """
+        Behaviour of the stand-in server
+
+        Args:
+            latency_ms: Mean (fixed/uniform) or median (lognormal) response latency
+            latency_dist: "fixed", "uniform" (±jitter of the mean) or "lognormal" (sigma=jitter)
+            jitter: Spread of the latency distribution
+            error_rate: Fraction of requests answered with HTTP 500
+            seed: Seed for the latency/error random generator
+        """
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+
+class FakeServerStats:
+    """Request counters shared by the server's handlers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.streamed = 0
+            self.prompt_chars = 0
+
+    def record(self, prompt_chars: int, error: bool, streamed: bool):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += prompt_chars
+            self.errors += int(error)
+            self.streamed += int(streamed)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "streamed": self.streamed,
+                "prompt_chars": self.prompt_chars,
+            }
+
+def _sample_latency(config: FakeServerConfig, rng: random.Random) -> float:
+    """Draw one response latency in seconds"""
+    mean = config.latency_ms / 1000
+    if config.latency_dist == "fixed":
+        return mean
+    if config.latency_dist == "uniform":
+        return max(0.0, rng.uniform(mean * (1 - config.jitter), mean * (1 + config.jitter)))
+    return rng.lognormvariate(0, config.jitter) * mean
+
+def _generate_reply(messages: List[Dict[str, str]], json_mode: bool) -> str:
+    """Build a plausible reply for the prompts AITaskAssistant sends"""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    quoted = QUOTED.findall(user)
+    subject = quoted[0] if quoted else "task"
+
+    if json_mode:
+        results = [
+            {"id": int(task_id), "subtasks": [f"Step {step} for {title}"[:50] for step in range(1, 5)]}
+            for task_id, title in TASK_LINE.findall(user)
+        ]
+        return json.dumps({"results": results})
+    if "subtasks" in system:
+        return "\n".join(f"Step {step} for {subject}"[:50] for step in range(1, 6))
+    if "expand task descriptions" in system:
+        return f"Complete '{subject}': list the steps, do the work and confirm the outcome."
+    return "\n".join(f"{subject.title()} {suffix}" for suffix in ("plan", "review", "follow-up", "draft"))
+
+def create_app(config: FakeServerConfig) -> FastAPI:
+    """Create the stand-in server application"""
+    app = FastAPI(title="Fake AI completion server")
+    app.state.config = config
+    app.state.stats = FakeServerStats()
+    rng = random.Random(config.seed)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        stream = bool(body.get("stream"))
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+
+        latency = _sample_latency(config, rng)
+        failed = rng.random() < config.error_rate
+        app.state.stats.record(sum(len(m.get("content", "")) for m in messages), failed, stream)
+
+        if failed:
+            await asyncio.sleep(latency)
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "server_error"}},
+                status_code=500
+            )
+
+        reply = _generate_reply(messages, json_mode)
+        completion_id = f"chatcmpl-fake-{app.state.stats.calls}"
+        created = int(time.time())
+        model = body.get("model", "fake-model")
+
+        if stream:
+            words = reply.split(" ")
+            delay = latency / max(len(words), 1)
+
+            async def events():
+                for index, word in enumerate(words):
+                    await asyncio.sleep(delay)
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if index == 0 else " " + word},
+                            "finish_reason": None
+                        }]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+    @app.get("/stats")
+    async def get_stats():
+        return JSONResponse(app.state.stats.as_dict())
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        app.state.stats.reset()
+        return JSONResponse(app.state.stats.as_dict())
+
+    return app
+
+def start_in_thread(config: FakeServerConfig, port: int):
+    """Run the server on 127.0.0.1:port in a daemon thread; returns (server, app)"""
+    import uvicorn
+
+    app = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Fake AI server failed to start on port {port}")
+        time.sleep(0.01)
+    return server, app
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Add the latency/error options shared with the AI benchmark"""
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean/median upstream latency")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.3, help="spread of the latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--seed", type=int, default=42)
+
+def config_from_args(args: argparse.Namespace) -> FakeServerConfig:
+    return FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    print(f"🤖 Fake AI server on http://{args.host}:{args.port}/v1 "
+          f"({args.latency_dist} {args.latency_ms:.0f}ms, error rate {args.error_rate:.0%})")
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
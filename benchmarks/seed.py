@@ -0,0 +1,97 @@
+"""
+Seed a benchmark database with synthetic users and tasks.
+
+    python -m benchmarks.seed --db bench.db --users 1000 --tasks-per-user 10000
+"""
+import argparse
+import hashlib
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+PASSWORD = "benchmark-password"
+PRIORITIES = ["low", "medium", "high", "urgent"]
+STATUSES = ["todo", "in_progress", "completed"]
+WORDS = [
+    "report", "meeting", "review", "invoice", "design", "deploy", "budget", "email",
+    "client", "roadmap", "release", "backup", "audit", "draft", "plan", "survey",
+]
+VERBS = ["Prepare", "Review", "Send", "Update", "Fix", "Plan", "Write", "Call", "Check", "Schedule"]
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.example"
+
+def password_hash(password: str = PASSWORD) -> str:
+    """Hash in the same format as SQLiteDatabase._hash_password (computed once and shared by all users)"""
+    salt = "0" * 32
+    return salt + hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000).hex()
+
+def seed_database(db_path: str, users: int, tasks_per_user: int, seed: int = 1, batch_size: int = 50000) -> List[str]:
+    """
+    Create the schema (via SQLiteDatabase) and insert synthetic data
+
+    Returns the list of user ids in creation order
+    """
+    from database import SQLiteDatabase
+
+    SQLiteDatabase(db_path)
+    rng = random.Random(seed)
+    now = datetime.now()
+    shared_hash = password_hash()
+    user_ids = [f"bench-user-{i:06d}" for i in range(users)]
+
+    started = time.perf_counter()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (id, email, password_hash) VALUES (?, ?, ?)",
+            [(user_id, user_email(i), shared_hash) for i, user_id in enumerate(user_ids)]
+        )
+
+        batch = []
+        for user_id in user_ids:
+            for _ in range(tasks_per_user):
+                created = now - timedelta(days=rng.random() * 365, seconds=rng.randint(0, 86399))
+                updated = created + timedelta(days=rng.random() * (now - created).days)
+                due = (created + timedelta(days=rng.randint(-5, 60))).date() if rng.random() < 0.6 else None
+                batch.append((
+                    f"{rng.choice(VERBS)} {rng.choice(WORDS)} {rng.randint(1, 500)}",
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 30))) or None,
+                    due.isoformat() if due else None,
+                    rng.choice(PRIORITIES),
+                    rng.choices(STATUSES, weights=[4, 2, 4])[0],
+                    user_id,
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                    updated.strftime("%Y-%m-%d %H:%M:%S"),
+                ))
+                if len(batch) >= batch_size:
+                    _insert_tasks(conn, batch)
+                    batch = []
+        if batch:
+            _insert_tasks(conn, batch)
+        conn.commit()
+
+    print(f"🌱 Seeded {users} users × {tasks_per_user} tasks in {time.perf_counter() - started:.1f}s")
+    return user_ids
+
+def _insert_tasks(conn: sqlite3.Connection, rows: list):
+    conn.executemany(
+        '''INSERT INTO tasks (title, description, due_date, priority, status, user_id, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        rows
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks-per-user", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    seed_database(args.db, args.users, args.tasks_per_user, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared test fixtures.
+
+Async tests run on anyio's pytest plugin (installed with FastAPI): mark them
+`pytest.mark.anyio`. App tests share one application on a scratch database
+with the SQL profiler watching `tasks`; request `no_full_scans` to fail a
+test whose queries scanned the whole table.
+"""
+import os
+import secrets
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent
+ADMIN_TOKEN = "test-admin-token"
+PASSWORD = "password123"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def profiler():
+    """Profiler recording full scans on `tasks`; fails the test if any were recorded"""
+    from query_profiler import QueryProfiler
+
+    profiler = QueryProfiler(slow_ms=1000, fail_on_scan=["tasks"])
+    yield profiler
+    profiler.assert_no_full_scans()
+
+@pytest.fixture
+def db(tmp_path, profiler):
+    """SQLiteDatabase on a scratch file, profiled: a test that scans `tasks` fails"""
+    from database import SQLiteDatabase
+
+    database = SQLiteDatabase(str(tmp_path / "primo.db"), profiler=profiler)
+    yield database
+    database.pool.close()
+
+async def make_user(db, email: str = None) -> str:
+    """Register a user directly in storage; returns the user id"""
+    from models import UserCreate
+
+    result = await db.sign_up(UserCreate(email=email or f"{secrets.token_hex(6)}@example.com", password=PASSWORD))
+    return result["data"]["user"]["id"]
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The app module, imported once against scratch files with profiling on"""
+    data = tmp_path_factory.mktemp("app")
+    os.environ.update({
+        "PRIMO_DB_PATH": str(data / "primo.db"),
+        "PRIMO_JOBS_DB": str(data / "jobs.db"),
+        "PRIMO_JOB_DIR": str(data / "jobs"),
+        "PRIMO_SQL_PROFILE": "1",
+        "PRIMO_SQL_FAIL_ON_SCAN": "tasks",
+        "PRIMO_SLOW_QUERY_MS": "1000",
+        "PRIMO_ADMIN_TOKEN": ADMIN_TOKEN,
+        # Routes hit SQL rather than the task cache (it has its own tests)
+        "PRIMO_TASK_CACHE_MB": "0",
+        "PRIMO_RATE_LIMIT": "0",
+        "PRIMO_ARCHIVE_AFTER_DAYS": "0",
+    })
+    # static/ and templates/ are resolved against the working directory
+    os.chdir(ROOT)
+    import app
+
+    return app
+
+@pytest.fixture(scope="session")
+def app_client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as client:
+        yield client
+
+@pytest.fixture
+def client(app_module, app_client):
+    """Test client signed in (session cookie) as a new user, whose id and email are `client.user_id` and `client.email`"""
+    app_client.cookies.clear()
+    email = f"{secrets.token_hex(6)}@example.com"
+    app_client.post("/register", data={"email": email, "password": PASSWORD})
+    app_client.post("/login", data={"email": email, "password": PASSWORD}, follow_redirects=False)
+    user = app_client.portal.call(app_module.db.get_session_user, app_client.cookies["session_id"])
+    app_client.user_id, app_client.email = user["id"], email
+    yield app_client
+    app_client.cookies.clear()
+
+@pytest.fixture
+def no_full_scans(app_module):
+    """Fail the test if the app scanned the whole tasks table while it ran"""
+    profiler = app_module.db.profiler
+    profiler.reset()
+    yield profiler
+    profiler.assert_no_full_scans()
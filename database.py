@@ -1,19 +1,443 @@
 import sqlite3
-import hashlib
+import sys
 import secrets
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Iterator, AsyncIterator
 from pathlib import Path
-from models import Task, TaskCreate, TaskUpdate, UserCreate, UserLogin
+from models import Task, TaskCreate, TaskUpdate, TaskFilter, TaskStatus, UserCreate, UserLogin
+from query_profiler import QueryProfiler
+from storage import Storage
+from rollups import ROLLUP_TABLE_SQL, STATE_COLUMNS, apply_delta, ensure_rollups, fill_range, read_rollups, write_delta
 
-class SQLiteDatabase:
-    def __init__(self, db_path: str = "primo.db"):
+def parse_task_row(task: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a tasks row to a dict with due_date/created_at/updated_at parsed"""
+    task_dict = dict(task)
+    # Parse due_date if it exists
+    if task_dict['due_date']:
+        task_dict['due_date'] = datetime.fromisoformat(task_dict['due_date']).date()
+    # Parse timestamps
+    task_dict['created_at'] = datetime.fromisoformat(task_dict['created_at'])
+    task_dict['updated_at'] = datetime.fromisoformat(task_dict['updated_at'])
+    return task_dict
+
+TASK_COLUMNS = (
+    "id", "title", "description", "due_date", "priority", "status", "user_id", "created_at", "updated_at", "parent_id"
+)
+TASK_SELECT = ", ".join(TASK_COLUMNS)
+
+# SQLite hands back ISO strings; drivers with native date types return objects as-is
+def _parse_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(value).date()
+
+def _parse_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+# Fields decoded on first access, and how
+_LAZY_FIELDS = {
+    "due_date": _parse_date,
+    "created_at": _parse_datetime,
+    "updated_at": _parse_datetime,
+}
+
+class TaskRecord:
+    """
+    Compact read-only task row.
+    
+    Wraps the raw row tuple; date fields are parsed the first time they are
+    read. Supports attribute access (templates), `record["field"]` and
+    `record.get("field")` (code written against task dicts).
+    """
+    __slots__ = ("_values", "_index", "_parsed")
+    
+    def __init__(self, values: tuple, index: Dict[str, int]):
+        self._values = values
+        self._index = index
+        self._parsed = None
+    
+    def __getattr__(self, name: str) -> Any:
+        position = self._index.get(name)
+        if position is None:
+            raise AttributeError(name)
+        value = self._values[position]
+        parser = _LAZY_FIELDS.get(name)
+        if parser is None or value is None:
+            return value
+        if self._parsed is None:
+            self._parsed = {}
+        elif name in self._parsed:
+            return self._parsed[name]
+        parsed = self._parsed[name] = parser(value)
+        return parsed
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._index:
+            raise KeyError(name)
+        return getattr(self, name)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name) if name in self._index else default
+    
+    def keys(self):
+        return self._index.keys()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._index}
+    
+    def __repr__(self) -> str:
+        return f"TaskRecord({dict(zip(self._index, self._values))!r})"
+
+_TASK_INDEX = {name: position for position, name in enumerate(TASK_COLUMNS)}
+# Single archived tasks (get_task falls back to the archive) also carry archived_at
+_ARCHIVED_INDEX = {**_TASK_INDEX, "archived_at": len(TASK_COLUMNS)}
+
+ARCHIVED_READ_ONLY = "Archived tasks are read-only"
+
+# Common projections; the list view skips user_id/updated_at, reports only need
+# the fields they aggregate plus what the "Recent Tasks" panel shows
+LIST_COLUMNS = ("id", "title", "description", "due_date", "priority", "status", "created_at")
+REPORT_COLUMNS = ("id", "title", "due_date", "priority", "status", "created_at")
+
+_projection_indexes: Dict[Tuple[str, ...], Dict[str, int]] = {TASK_COLUMNS: _TASK_INDEX}
+
+def _projection(columns: Optional[Sequence[str]]) -> Tuple[str, Dict[str, int]]:
+    """Validate a column projection; returns the SELECT list and the TaskRecord index"""
+    if columns is None:
+        return TASK_SELECT, _TASK_INDEX
+    columns = tuple(columns)
+    index = _projection_indexes.get(columns)
+    if index is None:
+        unknown = [name for name in columns if name not in _TASK_INDEX]
+        if unknown or not columns:
+            raise ValueError(f"Unknown task columns: {unknown}")
+        index = _projection_indexes[columns] = {name: position for position, name in enumerate(columns)}
+    return ", ".join(columns), index
+
+def _like_pattern(text: str) -> str:
+    """Substring LIKE pattern with % and _ escaped (use with ESCAPE '\\')"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _filter_clause(filters: Optional[TaskFilter]) -> Tuple[str, List[Any]]:
+    """Extra WHERE conditions (prefixed with AND) and parameters for a TaskFilter"""
+    if filters is None:
+        return "", []
+    clauses, params = [], []
+    if filters.status is not None:
+        clauses.append("status = ?")
+        params.append(filters.status.value)
+    if filters.priority is not None:
+        clauses.append("priority = ?")
+        params.append(filters.priority.value)
+    if filters.due_from is not None:
+        clauses.append("due_date >= ?")
+        params.append(filters.due_from.isoformat())
+    if filters.due_to is not None:
+        clauses.append("due_date <= ?")
+        params.append(filters.due_to.isoformat())
+    if filters.search:
+        clauses.append("title LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(filters.search))
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def _task_source(filters: Optional[TaskFilter]) -> str:
+    """FROM target for task reads: the hot table, or hot and archived rows together when filters ask for archived"""
+    if filters is None or not filters.archived:
+        return "tasks"
+    # WHERE conditions on the outer query are pushed into both halves, so each still reads its index
+    return f"(SELECT {TASK_SELECT} FROM tasks UNION ALL SELECT {TASK_SELECT} FROM tasks_archive)"
+
+TASKS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        due_date DATE,
+        priority TEXT NOT NULL DEFAULT 'medium',
+        status TEXT NOT NULL DEFAULT 'todo',
+        user_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        parent_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+'''
+
+# Completed tasks moved out of `tasks` (see archive.py); same ids and columns
+ARCHIVE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS tasks_archive (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT,
+        due_date DATE,
+        priority TEXT NOT NULL DEFAULT 'medium',
+        status TEXT NOT NULL DEFAULT 'todo',
+        user_id TEXT NOT NULL,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        parent_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+'''
+
+def create_task_schema(conn: sqlite3.Connection):
+    """Create the tasks table and its indexes (shared by the main file and shard files)"""
+    # WAL lets long streaming reads (exports) run without blocking task writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(TASKS_TABLE_SQL)
+    
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id)
+    ''')
+    
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)
+    ''')
+    
+    # Covers the report and AI-context projections ordered by created_at,
+    # so those reads never touch the table rows
+    conn.execute('DROP INDEX IF EXISTS idx_tasks_user_created')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_created_cover
+        ON tasks(user_id, created_at, status, priority, due_date, title)
+    ''')
+    
+    # Only open tasks with a due date: what the due-date scheduler rebuilds
+    # its reminder heap from (see scheduler.py)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON tasks(user_id, due_date)
+        WHERE status != 'completed' AND due_date IS NOT NULL
+    ''')
+    
+    # Only completed tasks, by last update: what the archiver picks batches from
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed_updated ON tasks(updated_at)
+        WHERE status = 'completed'
+    ''')
+    
+    conn.execute(ARCHIVE_TABLE_SQL)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_archive_user_created ON tasks_archive(user_id, created_at)
+    ''')
+    
+    # Files created before subtasks existed get the parent link added
+    for table in ("tasks", "tasks_archive"):
+        if "parent_id" not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN parent_id INTEGER")
+    
+    # Subtask hierarchy as a closure table: one row per (ancestor, descendant)
+    # pair at any depth, so subtrees and ancestor chains are single index
+    # range reads. Top-level tasks without subtasks have no rows at all.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_tree (
+            user_id TEXT NOT NULL,
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_task_tree_descendant ON task_tree(descendant_id, depth)
+    ''')
+    
+    # Descendant counts of every task that has subtasks, kept current by each
+    # write so completion percentages are never computed by walking the tree
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_progress (
+            task_id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            completed INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_task_progress_user ON task_progress(user_id)
+    ''')
+    
+    # Bumped in the same transaction as every task write so task caches in
+    # other workers can tell their copy is stale
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    
+    # Per-user daily aggregates for trend reports (see rollups.py)
+    conn.execute(ROLLUP_TABLE_SQL)
+
+def _task_row(task_data: TaskCreate, user_id: str) -> tuple:
+    """INSERT parameters (title, description, due_date, priority, status, user_id, parent_id) for a TaskCreate"""
+    return (
+        task_data.title,
+        task_data.description,
+        task_data.due_date.isoformat() if task_data.due_date else None,
+        task_data.priority.value,
+        task_data.status.value,
+        user_id,
+        task_data.parent_id
+    )
+
+def _task_state(task_data) -> Dict[str, Any]:
+    """Rollup-relevant fields of a TaskCreate"""
+    return {"due_date": task_data.due_date, "priority": task_data.priority.value, "status": task_data.status.value}
+
+def bump_task_version(conn: sqlite3.Connection, user_id: str):
+    """Increment a user's task version (call inside the writing transaction)"""
+    conn.execute(
+        '''INSERT INTO task_versions (user_id, version) VALUES (?, 1)
+           ON CONFLICT(user_id) DO UPDATE SET version = version + 1''',
+        (user_id,)
+    )
+
+# A task's id and its descendants' (parameters: task id twice); a rowid IN
+# list, so deletes and counts seek straight to the subtree's rows
+SUBTREE_IDS = 'IN (SELECT descendant_id FROM task_tree WHERE ancestor_id = ? UNION ALL SELECT ?)'
+
+# Deepest subtask nesting (a chain of d tasks keeps d * (d - 1) / 2 closure rows)
+MAX_SUBTASK_DEPTH = 100
+
+def subtask_depth(conn: sqlite3.Connection, user_id: str, parent_id: int) -> int:
+    """Depth of a new child of parent_id (1 under a top-level task); raises ValueError for a missing parent or too deep a tree"""
+    row = conn.execute(
+        'SELECT (SELECT COUNT(*) FROM task_tree WHERE descendant_id = t.id) FROM tasks t WHERE t.id = ? AND t.user_id = ?',
+        (parent_id, user_id)
+    ).fetchone()
+    if row is None:
+        raise ValueError("Parent task not found")
+    if row[0] + 1 > MAX_SUBTASK_DEPTH:
+        raise ValueError(f"Subtasks can be nested at most {MAX_SUBTASK_DEPTH} levels deep")
+    return row[0] + 1
+
+def add_progress(conn: sqlite3.Connection, user_id: str, task_id: int, total: int, completed: int):
+    """Add to the descendant counts of every ancestor of task_id, dropping ancestors left without descendants"""
+    conn.execute(
+        '''INSERT INTO task_progress (task_id, user_id, total, completed)
+           SELECT ancestor_id, ?, ?, ? FROM task_tree WHERE descendant_id = ?
+           ON CONFLICT(task_id) DO UPDATE SET
+               total = total + excluded.total, completed = completed + excluded.completed''',
+        (user_id, total, completed, task_id)
+    )
+    if total < 0:
+        conn.execute(
+            '''DELETE FROM task_progress
+               WHERE total <= 0 AND task_id IN (SELECT ancestor_id FROM task_tree WHERE descendant_id = ?)''',
+            (task_id,)
+        )
+
+def link_subtask(conn: sqlite3.Connection, user_id: str, task_id: int, parent_id: int, completed: bool):
+    """Closure rows and ancestor counts for a new task under parent_id (call inside the writing transaction)"""
+    conn.execute(
+        '''INSERT INTO task_tree (user_id, ancestor_id, descendant_id, depth)
+           SELECT user_id, ancestor_id, ?, depth + 1 FROM task_tree WHERE descendant_id = ?
+           UNION ALL SELECT ?, ?, ?, 1''',
+        (task_id, parent_id, user_id, parent_id, task_id)
+    )
+    add_progress(conn, user_id, task_id, 1, int(completed))
+
+class ConnectionPool:
+    """
+    Reuses SQLite connections, keeping up to `max_idle` idle connections per
+    database file. Connections are handed to one caller at a time, so they
+    may move between threads. `factory` is the sqlite3 connection class
+    (QueryProfiler.connection_factory() when profiling).
+    """
+    
+    def __init__(self, max_idle: int = 8, factory: type = sqlite3.Connection):
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle: Dict[str, List[sqlite3.Connection]] = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def connection(self, db_path: str) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; the block runs as one transaction (committed on success)"""
+        with self._lock:
+            idle = self._idle.get(db_path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, factory=self.factory)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.row_factory = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                idle = self._idle.setdefault(db_path, [])
+                if len(idle) < self.max_idle:
+                    idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+    
+    def idle_count(self, db_path: Optional[str] = None) -> int:
+        """Idle connections held for one file (or all files)"""
+        with self._lock:
+            if db_path is not None:
+                return len(self._idle.get(db_path, []))
+            return sum(len(idle) for idle in self._idle.values())
+    
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+class SQLiteDatabase(Storage):
+    def __init__(
+        self,
+        db_path: str = "primo.db",
+        profiler: Optional[QueryProfiler] = None,
+        pool: Optional[ConnectionPool] = None
+    ):
         self.db_path = db_path
+        self.profiler = profiler
+        self.pool = pool or ConnectionPool(factory=profiler.connection_factory() if profiler else sqlite3.Connection)
         self.init_database()
     
+    def _connect(self, db_path: Optional[str] = None):
+        """
+        Borrow a pooled connection to `db_path` (the main file by default).
+        
+        With a profiler attached, the pool's connections are profiling ones
+        and the statements are timed under the calling method's name.
+        """
+        db_path = db_path or self.db_path
+        if self.profiler is None:
+            return self.pool.connection(db_path)
+        return self._profiled(db_path, sys._getframe(1).f_code.co_name)
+    
+    @contextmanager
+    def _profiled(self, db_path: str, method: str) -> Iterator[sqlite3.Connection]:
+        with self.pool.connection(db_path) as conn:
+            conn.method = method
+            yield conn
+    
+    def _task_db_path(self, user_id: str) -> str:
+        """File holding a user's tasks; everything lives in one file unless sharded"""
+        return self.db_path
+    
     def init_database(self):
         """Initialize the database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS users (
                     id TEXT PRIMARY KEY,
@@ -24,49 +448,29 @@ class SQLiteDatabase:
             ''')
             
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    due_date DATE,
-                    priority TEXT NOT NULL DEFAULT 'medium',
-                    status TEXT NOT NULL DEFAULT 'todo',
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
                     user_id TEXT NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
                 )
             ''')
             
+            # Signed session tokens revoked before they expire (see session_tokens.py)
             conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id)
+                CREATE TABLE IF NOT EXISTS revoked_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    token_id TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
             ''')
             
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)
-            ''')
+            create_task_schema(conn)
             
             conn.commit()
         
         print("✅ SQLite database initialized successfully")
     
-    def _hash_password(self, password: str) -> str:
-        """Hash a password with salt"""
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return salt + password_hash.hex()
-    
-    def _verify_password(self, password: str, password_hash: str) -> bool:
-        """Verify a password against its hash"""
-        salt = password_hash[:32]  # First 32 chars are salt
-        stored_hash = password_hash[32:]  # Rest is the hash
-        password_hash_check = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return password_hash_check.hex() == stored_hash
-    
-    def _generate_user_id(self) -> str:
-        """Generate a unique user ID"""
-        return secrets.token_urlsafe(16)
-    
     # User Authentication Methods
     async def sign_up(self, user_data: UserCreate) -> Dict[str, Any]:
         """Register a new user"""
@@ -74,7 +478,7 @@ class SQLiteDatabase:
             user_id = self._generate_user_id()
             password_hash = self._hash_password(user_data.password)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.execute(
                     'INSERT INTO users (id, email, password_hash) VALUES (?, ?, ?)',
                     (user_id, user_data.email, password_hash)
@@ -99,7 +503,7 @@ class SQLiteDatabase:
     async def sign_in(self, user_data: UserLogin) -> Dict[str, Any]:
         """Sign in an existing user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.execute(
                     'SELECT * FROM users WHERE email = ?',
@@ -126,10 +530,10 @@ class SQLiteDatabase:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.execute(
                     'SELECT id, email, created_at FROM users WHERE id = ?',
@@ -144,24 +548,81 @@ class SQLiteDatabase:
             print(f"Error getting user: {e}")
             return None
     
+    # Session Methods
+    async def create_session(self, user_id: str) -> str:
+        """Create a new session for a user"""
+        session_id = secrets.token_urlsafe(32)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO sessions (id, user_id) VALUES (?, ?)',
+                (session_id, user_id)
+            )
+            conn.commit()
+        return session_id
+    
+    async def get_session_user(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the user owning a session"""
+        try:
+            with self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.execute(
+                    '''SELECT users.id, users.email, users.created_at
+                       FROM sessions JOIN users ON users.id = sessions.user_id
+                       WHERE sessions.id = ?''',
+                    (session_id,)
+                )
+                user = cursor.fetchone()
+                
+                if user:
+                    return dict(user)
+                return None
+        except Exception as e:
+            print(f"Error getting session: {e}")
+            return None
+    
+    async def delete_session(self, session_id: str):
+        """Delete a session"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            conn.commit()
+    
+    async def revoke_session_token(self, token_id: str, expires_at: float):
+        """Record a revoked signed token, dropping revocations whose tokens have expired"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM revoked_sessions WHERE expires_at <= ?', (time.time(),))
+            conn.execute(
+                'INSERT INTO revoked_sessions (token_id, expires_at) VALUES (?, ?)',
+                (token_id, expires_at)
+            )
+            conn.commit()
+    
+    async def get_revoked_session_tokens(self, after_id: int = 0) -> List[Tuple[int, str, float]]:
+        """Unexpired revocations recorded after `after_id`, as (id, token_id, expires_at)"""
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT id, token_id, expires_at FROM revoked_sessions WHERE id > ? AND expires_at > ? ORDER BY id',
+                (after_id, time.time())
+            ).fetchall()
+    
     # Task Management Methods
     async def create_task(self, task_data: TaskCreate, user_id: str) -> Dict[str, Any]:
         """Create a new task"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                today = date.today()
+                if task_data.parent_id is not None:
+                    subtask_depth(conn, user_id, task_data.parent_id)
+                ensure_rollups(conn, user_id, today)
                 cursor = conn.execute(
-                    '''INSERT INTO tasks (title, description, due_date, priority, status, user_id) 
-                       VALUES (?, ?, ?, ?, ?, ?)''',
-                    (
-                        task_data.title,
-                        task_data.description,
-                        task_data.due_date.isoformat() if task_data.due_date else None,
-                        task_data.priority.value,
-                        task_data.status.value,
-                        user_id
-                    )
+                    '''INSERT INTO tasks (title, description, due_date, priority, status, user_id, parent_id) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    _task_row(task_data, user_id)
                 )
                 task_id = cursor.lastrowid
+                if task_data.parent_id is not None:
+                    link_subtask(conn, user_id, task_id, task_data.parent_id, task_data.status == TaskStatus.COMPLETED)
+                apply_delta(conn, user_id, today, write_delta(None, _task_state(task_data), today))
+                bump_task_version(conn, user_id)
                 conn.commit()
                 
                 # Return the created task
@@ -176,57 +637,176 @@ class SQLiteDatabase:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def get_tasks(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all tasks for a user"""
+    async def create_tasks(self, tasks: List[TaskCreate], user_id: str) -> Dict[str, Any]:
+        """Create several tasks in a single transaction"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect(self._task_db_path(user_id)) as conn:
+                today = date.today()
+                ensure_rollups(conn, user_id, today)
+                insert = '''INSERT INTO tasks (title, description, due_date, priority, status, user_id, parent_id) 
+                            VALUES (?, ?, ?, ?, ?, ?, ?)'''
+                if any(task_data.parent_id is not None for task_data in tasks):
+                    # Subtasks need their ids for the closure rows (and may hang under each other's parents)
+                    for task_data in tasks:
+                        if task_data.parent_id is None:
+                            conn.execute(insert, _task_row(task_data, user_id))
+                            continue
+                        subtask_depth(conn, user_id, task_data.parent_id)
+                        task_id = conn.execute(insert, _task_row(task_data, user_id)).lastrowid
+                        link_subtask(conn, user_id, task_id, task_data.parent_id, task_data.status == TaskStatus.COMPLETED)
+                else:
+                    conn.executemany(insert, [_task_row(task_data, user_id) for task_data in tasks])
+                delta = Counter()
+                for task_data in tasks:
+                    delta.update(write_delta(None, _task_state(task_data), today))
+                apply_delta(conn, user_id, today, delta)
+                bump_task_version(conn, user_id)
+                conn.commit()
+                
+                return {"success": True, "data": {"created": len(tasks)}}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def get_tasks(
+        self,
+        user_id: str,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[TaskFilter] = None
+    ) -> List[TaskRecord]:
+        """
+        Get all tasks for a user, newest first (dates are parsed lazily on access)
+        
+        Args:
+            user_id: Owner of the tasks
+            columns: Columns to read (e.g. LIST_COLUMNS, REPORT_COLUMNS); all columns if None
+            filters: Optional status/priority/due date/title filters
+        """
+        select, index = _projection(columns)
+        where, params = _filter_clause(filters)
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
                 cursor = conn.execute(
-                    'SELECT * FROM tasks WHERE user_id = ? ORDER BY created_at DESC',
-                    (user_id,)
+                    f'SELECT {select} FROM {_task_source(filters)} WHERE user_id = ?{where} ORDER BY created_at DESC',
+                    (user_id, *params)
                 )
-                tasks = cursor.fetchall()
-                
-                # Convert to list of dictionaries and parse dates
-                task_list = []
-                for task in tasks:
-                    task_dict = dict(task)
-                    # Parse due_date if it exists
-                    if task_dict['due_date']:
-                        task_dict['due_date'] = datetime.fromisoformat(task_dict['due_date']).date()
-                    # Parse timestamps
-                    task_dict['created_at'] = datetime.fromisoformat(task_dict['created_at'])
-                    task_dict['updated_at'] = datetime.fromisoformat(task_dict['updated_at'])
-                    task_list.append(task_dict)
-                
-                return task_list
+                return [TaskRecord(row, index) for row in cursor.fetchall()]
         except Exception as e:
             print(f"Error getting tasks: {e}")
             return []
     
-    async def get_task(self, task_id: int, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific task"""
+    async def iter_tasks(
+        self,
+        user_id: str,
+        columns: Sequence[str] = TASK_COLUMNS,
+        filters: Optional[TaskFilter] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[tuple]]:
+        """
+        Stream a user's tasks newest first as batches of raw row tuples
+        
+        Rows come straight off the cursor in `columns` order, so exports never
+        hold the whole result in memory.
+        """
+        select, _ = _projection(columns)
+        where, params = _filter_clause(filters)
+        with self._connect(self._task_db_path(user_id)) as conn:
+            cursor = conn.execute(
+                f'SELECT {select} FROM {_task_source(filters)} WHERE user_id = ?{where} ORDER BY created_at DESC',
+                (user_id, *params)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+    
+    async def get_task_page(
+        self,
+        user_id: str,
+        columns: Sequence[str],
+        filters: Optional[TaskFilter] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None
+    ) -> List[tuple]:
+        """
+        One page of a user's tasks as raw row tuples, newest first
+        
+        Keyset pagination on (created_at, id): `after` is the created_at and id
+        of the previous page's last row, so each page is an index range read
+        however deep into the list it is.
+        """
+        select, _ = _projection(columns)
+        where, params = _filter_clause(filters)
+        if after is not None:
+            where += " AND created_at <= ? AND (created_at < ? OR id < ?)"
+            params += [after[0], after[0], after[1]]
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                cursor = conn.execute(
+                    f'SELECT {select} FROM {_task_source(filters)} WHERE user_id = ?{where} '
+                    f'ORDER BY created_at DESC, id DESC LIMIT ?',
+                    (user_id, *params, limit)
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting task page: {e}")
+            return []
+    
+    async def get_recent_task_summaries(self, user_id: str, limit: int) -> List[Tuple[str, str]]:
+        """Get (title, priority) of a user's most recent tasks, newest first"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect(self._task_db_path(user_id)) as conn:
                 cursor = conn.execute(
-                    'SELECT * FROM tasks WHERE id = ? AND user_id = ?',
+                    'SELECT title, priority FROM tasks WHERE user_id = ? ORDER BY created_at DESC LIMIT ?',
+                    (user_id, limit)
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting recent tasks: {e}")
+            return []
+    
+    async def get_task(self, task_id: int, user_id: str) -> Optional[TaskRecord]:
+        """Get a specific task; archived tasks come back read-only, with archived_at set"""
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                cursor = conn.execute(
+                    f'SELECT {TASK_SELECT} FROM tasks WHERE id = ? AND user_id = ?',
                     (task_id, user_id)
                 )
                 task = cursor.fetchone()
                 
                 if task:
-                    task_dict = dict(task)
-                    if task_dict['due_date']:
-                        task_dict['due_date'] = datetime.fromisoformat(task_dict['due_date']).date()
-                    task_dict['created_at'] = datetime.fromisoformat(task_dict['created_at'])
-                    task_dict['updated_at'] = datetime.fromisoformat(task_dict['updated_at'])
-                    return task_dict
+                    return TaskRecord(task, _TASK_INDEX)
+                task = conn.execute(
+                    f'SELECT {TASK_SELECT}, archived_at FROM tasks_archive WHERE id = ? AND user_id = ?',
+                    (task_id, user_id)
+                ).fetchone()
+                if task:
+                    return TaskRecord(task, _ARCHIVED_INDEX)
                 return None
         except Exception as e:
             print(f"Error getting task: {e}")
             return None
     
+    async def get_tasks_by_ids(self, task_ids: List[int], user_id: str) -> List[Dict[str, Any]]:
+        """Get several specific tasks in one query, in the order requested"""
+        if not task_ids:
+            return []
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                conn.row_factory = sqlite3.Row
+                placeholders = ", ".join("?" for _ in task_ids)
+                cursor = conn.execute(
+                    f'SELECT * FROM tasks WHERE user_id = ? AND id IN ({placeholders})',
+                    (user_id, *task_ids)
+                )
+                found = {row['id']: dict(row) for row in cursor.fetchall()}
+                
+                return [found[task_id] for task_id in task_ids if task_id in found]
+        except Exception as e:
+            print(f"Error getting tasks: {e}")
+            return []
+    
     async def update_task(self, task_id: int, task_data: TaskUpdate, user_id: str) -> Dict[str, Any]:
         """Update a task"""
         try:
@@ -259,11 +839,23 @@ class SQLiteDatabase:
             
             values.extend([task_id, user_id])
             
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
+            state_select = f'SELECT {", ".join(STATE_COLUMNS)} FROM tasks WHERE id = ? AND user_id = ?'
+            with self._connect(self._task_db_path(user_id)) as conn:
+                today = date.today()
+                ensure_rollups(conn, user_id, today)
+                old = conn.execute(state_select, (task_id, user_id)).fetchone()
+                cursor = conn.execute(
                     f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = ? AND user_id = ?",
                     values
                 )
+                if cursor.rowcount > 0:
+                    new = conn.execute(state_select, (task_id, user_id)).fetchone()
+                    old_state, new_state = dict(zip(STATE_COLUMNS, old)), dict(zip(STATE_COLUMNS, new))
+                    apply_delta(conn, user_id, today, write_delta(old_state, new_state, today))
+                    done = (new_state["status"] == "completed") - (old_state["status"] == "completed")
+                    if done:
+                        add_progress(conn, user_id, task_id, 0, done)
+                    bump_task_version(conn, user_id)
                 conn.commit()
                 
                 # Return the updated task
@@ -277,31 +869,255 @@ class SQLiteDatabase:
                 if task:
                     return {"success": True, "data": dict(task)}
                 else:
-                    return {"success": False, "error": "Task not found"}
+                    return {"success": False, "error": self._missing_task_error(conn, task_id, user_id)}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _missing_task_error(self, conn: sqlite3.Connection, task_id: int, user_id: str) -> str:
+        """Why a write found no task: it was archived, or it does not exist"""
+        archived = conn.execute(
+            'SELECT 1 FROM tasks_archive WHERE id = ? AND user_id = ?', (task_id, user_id)
+        ).fetchone()
+        return ARCHIVED_READ_ONLY if archived else "Task not found"
+    
     async def delete_task(self, task_id: int, user_id: str) -> Dict[str, Any]:
-        """Delete a task"""
+        """Delete a task and its whole subtree in one transaction; data lists the deleted subtask ids"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    'DELETE FROM tasks WHERE id = ? AND user_id = ?',
-                    (task_id, user_id)
-                )
+            with self._connect(self._task_db_path(user_id)) as conn:
+                today = date.today()
+                ensure_rollups(conn, user_id, today)
+                deleted = conn.execute(
+                    f'''DELETE FROM tasks WHERE id {SUBTREE_IDS} AND user_id = ?
+                        RETURNING id, {", ".join(STATE_COLUMNS)}''',
+                    (task_id, task_id, user_id)
+                ).fetchall()
+                if deleted:
+                    delta = Counter()
+                    for row in deleted:
+                        delta.update(write_delta(dict(zip(STATE_COLUMNS, row[1:])), None, today))
+                    apply_delta(conn, user_id, today, delta)
+                    # Ancestors above the subtree lose it from their counts, then the subtree's own rows go
+                    completed = sum(1 for row in deleted if row[-1] == "completed")
+                    add_progress(conn, user_id, task_id, -len(deleted), -completed)
+                    conn.execute(f'DELETE FROM task_progress WHERE task_id {SUBTREE_IDS}', (task_id, task_id))
+                    conn.execute(f'DELETE FROM task_tree WHERE descendant_id {SUBTREE_IDS}', (task_id, task_id))
+                    bump_task_version(conn, user_id)
                 conn.commit()
                 
-                if cursor.rowcount > 0:
-                    return {"success": True, "data": {"deleted": task_id}}
+                if deleted:
+                    subtasks = [row[0] for row in deleted if row[0] != task_id]
+                    return {"success": True, "data": {"deleted": task_id, "subtasks": subtasks}}
                 else:
+                    return {"success": False, "error": self._missing_task_error(conn, task_id, user_id)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def move_task(self, task_id: int, parent_id: Optional[int], user_id: str) -> Dict[str, Any]:
+        """
+        Move a task and its subtree under another task (None: to the top level) in one transaction
+        
+        Closure rows linking the subtree to its old ancestors are replaced by
+        rows for the new ones, and both ancestor chains' counts are adjusted
+        by the subtree's size.
+        """
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                row = conn.execute(
+                    f'''SELECT COUNT(*), COALESCE(SUM(status = 'completed'), 0),
+                               (SELECT MAX(depth) FROM task_tree WHERE ancestor_id = ?)
+                        FROM tasks WHERE id {SUBTREE_IDS} AND user_id = ?''',
+                    (task_id, task_id, task_id, user_id)
+                ).fetchone()
+                size, completed, height = row[0], row[1], row[2] or 0
+                if not size:
                     return {"success": False, "error": "Task not found"}
+                if parent_id is not None:
+                    inside = parent_id == task_id or conn.execute(
+                        'SELECT 1 FROM task_tree WHERE ancestor_id = ? AND descendant_id = ?',
+                        (task_id, parent_id)
+                    ).fetchone()
+                    if inside:
+                        return {"success": False, "error": "A task can't be moved under its own subtree"}
+                    if subtask_depth(conn, user_id, parent_id) + height > MAX_SUBTASK_DEPTH:
+                        raise ValueError(f"Subtasks can be nested at most {MAX_SUBTASK_DEPTH} levels deep")
+                
+                add_progress(conn, user_id, task_id, -size, -completed)
+                conn.execute(
+                    f'''DELETE FROM task_tree
+                        WHERE descendant_id {SUBTREE_IDS}
+                          AND ancestor_id IN (SELECT ancestor_id FROM task_tree WHERE descendant_id = ?)''',
+                    (task_id, task_id, task_id)
+                )
+                if parent_id is not None:
+                    # Every new ancestor (the parent and its ancestors) above every subtree member
+                    conn.execute(
+                        '''INSERT INTO task_tree (user_id, ancestor_id, descendant_id, depth)
+                           SELECT ?, above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+                           FROM (SELECT ancestor_id, depth FROM task_tree WHERE descendant_id = ? UNION ALL SELECT ?, 0) AS above
+                           CROSS JOIN (SELECT descendant_id, depth FROM task_tree WHERE ancestor_id = ? UNION ALL SELECT ?, 0) AS below''',
+                        (user_id, parent_id, parent_id, task_id, task_id)
+                    )
+                    add_progress(conn, user_id, task_id, size, completed)
+                conn.execute('UPDATE tasks SET parent_id = ? WHERE id = ?', (parent_id, task_id))
+                bump_task_version(conn, user_id)
+                conn.commit()
+                
+                conn.row_factory = sqlite3.Row
+                task = conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
+                return {"success": True, "data": dict(task)}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def get_subtree(self, task_id: int, user_id: str, columns: Optional[Sequence[str]] = None) -> List[TaskRecord]:
+        """
+        A task and all its descendants, by depth then creation (empty if the task doesn't exist)
+        
+        One closure-table range read plus primary-key lookups, however deep
+        the tree is; parent_id links the rows back into a tree.
+        """
+        select, index = _projection(columns)
+        select = ", ".join(f"t.{name}" for name in select.split(", "))
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                cursor = conn.execute(
+                    f'''SELECT {select} FROM (
+                            SELECT ? AS task_id, 0 AS depth
+                            UNION ALL SELECT descendant_id, depth FROM task_tree WHERE ancestor_id = ?
+                        ) AS subtree JOIN tasks t ON t.id = subtree.task_id
+                        WHERE t.user_id = ?
+                        ORDER BY subtree.depth, t.created_at, t.id''',
+                    (task_id, task_id, user_id)
+                )
+                return [TaskRecord(row, index) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting subtree: {e}")
+            return []
+    
+    async def get_task_progress(self, user_id: str) -> Dict[int, Tuple[int, int]]:
+        """(completed, total) descendant counts for each of the user's tasks that has subtasks"""
+        with self._connect(self._task_db_path(user_id)) as conn:
+            rows = conn.execute(
+                'SELECT task_id, completed, total FROM task_progress WHERE user_id = ?',
+                (user_id,)
+            ).fetchall()
+        return {task_id: (completed, total) for task_id, completed, total in rows}
+    
+    async def get_task_version(self, user_id: str) -> int:
+        """Current version of a user's tasks (0 if never written)"""
+        with self._connect(self._task_db_path(user_id)) as conn:
+            row = conn.execute(
+                'SELECT version FROM task_versions WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+        return row[0] if row else 0
+    
+    async def iter_open_due_tasks(
+        self,
+        user_id: Optional[str] = None,
+        batch_size: int = 5000
+    ) -> AsyncIterator[List[Tuple[str, int, Any, int]]]:
+        """
+        Batches of (user_id, task id, due_date, task version) for open tasks with a due date
+        
+        Reads idx_tasks_open_due only. Without a user_id, covers every user in
+        every task file.
+        """
+        paths = [self._task_db_path(user_id)] if user_id else self.task_db_paths()
+        where = ' AND t.user_id = ?' if user_id else ''
+        for path in paths:
+            with self._connect(path) as conn:
+                cursor = conn.execute(
+                    f'''SELECT t.user_id, t.id, t.due_date, COALESCE(v.version, 0)
+                        FROM tasks t INDEXED BY idx_tasks_open_due
+                        LEFT JOIN task_versions v ON v.user_id = t.user_id
+                        WHERE t.status != 'completed' AND t.due_date IS NOT NULL{where}''',
+                    (user_id,) if user_id else ()
+                )
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+    
+    async def archive_completed_tasks(self, before: datetime, limit: int = 500) -> int:
+        """
+        Move up to `limit` completed tasks last updated before `before` into tasks_archive, per task file
+        
+        Each file's batch is one short transaction (the INSERT takes the write
+        lock first, so concurrent movers never pick the same rows) that also
+        bumps the owners' task versions. Rollups are unaffected: completed
+        tasks add nothing to the open/overdue counts. Tasks in a subtask
+        hierarchy stay, so trees are never split between the tables.
+        
+        Returns:
+            Number of tasks moved
+        """
+        cutoff = before.strftime("%Y-%m-%d %H:%M:%S")
+        moved = 0
+        for path in self.task_db_paths():
+            with self._connect(path) as conn:
+                rows = conn.execute(
+                    f'''INSERT INTO tasks_archive ({TASK_SELECT})
+                        SELECT {TASK_SELECT} FROM tasks INDEXED BY idx_tasks_completed_updated
+                        WHERE status = 'completed' AND updated_at < ?
+                          AND parent_id IS NULL AND id NOT IN (SELECT task_id FROM task_progress)
+                        ORDER BY updated_at LIMIT ?
+                        RETURNING id, user_id''',
+                    (cutoff, limit)
+                ).fetchall()
+                # In rowid order: neighbouring rows share pages
+                task_ids = sorted(task_id for task_id, _ in rows)
+                conn.executemany('DELETE FROM tasks WHERE id = ?', [(task_id,) for task_id in task_ids])
+                for user_id in {user_id for _, user_id in rows}:
+                    bump_task_version(conn, user_id)
+                conn.commit()
+            moved += len(rows)
+        return moved
+    
+    async def get_task_table_sizes(self) -> Dict[str, int]:
+        """Rows in the hot tasks table and in the archive, across every task file"""
+        sizes = {"tasks": 0, "archive": 0}
+        for path in self.task_db_paths():
+            with self._connect(path) as conn:
+                sizes["tasks"] += conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+                sizes["archive"] += conn.execute('SELECT COUNT(*) FROM tasks_archive').fetchone()[0]
+        return sizes
+    
+    async def get_daily_stats(self, user_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Daily rollup rows for a date range, oldest first (one per day, up to today)
+        
+        Days before the user's first rollup row come back as zeros.
+        """
+        today = date.today()
+        try:
+            with self._connect(self._task_db_path(user_id)) as conn:
+                ensure_rollups(conn, user_id, today)
+                conn.commit()
+                rows = read_rollups(conn, user_id, start, end)
+            return fill_range(rows, start, min(end, today))
+        except Exception as e:
+            print(f"Error getting daily stats: {e}")
+            return []
+    
+    def task_db_paths(self) -> List[str]:
+        """Every file holding tasks"""
+        return [self.db_path]
+    
+    async def warm_up(self):
+        """Put a pooled connection with the schema loaded in place for every database file"""
+        for path in dict.fromkeys([self.db_path, *self.task_db_paths()]):
+            with self._connect(path) as conn:
+                conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+    
+    async def close(self):
+        """Close pooled connections"""
+        self.pool.close()
+    
     def test_connection(self):
         """Test the database connection"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.execute('SELECT 1')
                 result = cursor.fetchone()
                 print("✅ Successfully connected to SQLite database!")
@@ -0,0 +1,130 @@
+"""
+Streaming task exports: JSON Lines, Parquet and Arrow IPC.
+
+Rows come from `Storage.iter_tasks` in cursor batches and are encoded as they
+arrive, so an export never holds more than one batch in memory. Parquet and
+Arrow need the optional pyarrow package (`pip install pyarrow`); without it
+those formats raise ExportUnavailable.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from database import _parse_date, _parse_datetime
+
+EXPORT_COLUMNS = ("id", "title", "description", "due_date", "priority", "status", "created_at", "updated_at")
+
+# Rows per database batch; each columnar batch becomes one Parquet row group / Arrow record batch
+EXPORT_BATCH_SIZE = 5000
+
+# format -> (media type, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+class ExportUnavailable(RuntimeError):
+    """The requested format needs an optional dependency that isn't installed"""
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+async def jsonl_stream(
+    batches: AsyncIterator[List[tuple]],
+    columns: Sequence[str] = EXPORT_COLUMNS
+) -> AsyncIterator[bytes]:
+    """Encode row batches as JSON Lines, one chunk per batch"""
+    dumps = json.JSONEncoder(default=_json_default, ensure_ascii=False).encode
+    async for rows in batches:
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows).encode()
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportUnavailable("Parquet and Arrow exports require pyarrow (pip install pyarrow)")
+    return pyarrow
+
+class _ChunkSink:
+    """Write-only file object that buffers what a writer emits until drained"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _task_schema(pa):
+    labels = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([
+        ("id", pa.int64()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        ("due_date", pa.date32()),
+        ("priority", labels),
+        ("status", labels),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+def _record_batch(pa, schema, rows: List[tuple]):
+    """Transpose EXPORT_COLUMNS rows into typed columns (SQLite hands back dates as ISO strings)"""
+    ids, titles, descriptions, due_dates, priorities, statuses, created, updated = zip(*rows)
+    return pa.record_batch([
+        pa.array(ids, pa.int64()),
+        pa.array(titles, pa.string()),
+        pa.array(descriptions, pa.string()),
+        pa.array([_parse_date(value) if value else None for value in due_dates], pa.date32()),
+        pa.array(priorities, schema.field("priority").type),
+        pa.array(statuses, schema.field("status").type),
+        pa.array([_parse_datetime(value) if value else None for value in created], pa.timestamp("us")),
+        pa.array([_parse_datetime(value) if value else None for value in updated], pa.timestamp("us")),
+    ], schema=schema)
+
+def columnar_stream(batches: AsyncIterator[List[tuple]], export_format: str) -> AsyncIterator[bytes]:
+    """
+    Encode EXPORT_COLUMNS row batches as Parquet or an Arrow IPC stream
+
+    Raises ExportUnavailable up front (before any bytes are sent) when pyarrow is missing.
+    """
+    pa = _require_pyarrow()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+
+    async def stream() -> AsyncIterator[bytes]:
+        schema = _task_schema(pa)
+        sink = _ChunkSink()
+        output = pa.PythonFile(sink, mode="w")
+        if export_format == "parquet":
+            writer = pq.ParquetWriter(output, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(output, schema)
+        async for rows in batches:
+            writer.write_batch(_record_batch(pa, schema, rows))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return stream()
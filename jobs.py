@@ -0,0 +1,410 @@
+"""
+Background job queue for exports, imports and report generation.
+
+Jobs are rows in a small SQLite database (`primo_jobs.db` by default), so
+several app workers on one machine share the queue. Each process runs a pool
+of asyncio workers that claim queued jobs atomically, record progress as they
+go, and write results to files under `result_dir`. The files are served with
+HTTP range support (`range_file_response`).
+
+A claimed job is leased to the claiming process (its `owner` id). Each
+process records a heartbeat from a background thread, so a long job keeps
+its lease however busy the event loop is. A cleanup loop deletes expired jobs
+and their files, and requeues running jobs only when their owner's heartbeat
+has stopped (the process is gone); a requeued job's old owner can no longer
+record progress or results for it.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import secrets
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+logger = logging.getLogger("primo.jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+class JobContext:
+    """What a job handler gets: its parameters plus progress/result reporting"""
+
+    def __init__(self, queue: "JobQueue", row: Dict[str, Any]):
+        self.queue = queue
+        self.id = row["id"]
+        self.user_id = row["user_id"]
+        self.kind = row["kind"]
+        self.params = json.loads(row["params"] or "{}")
+        self.input_path = row["input_path"]
+        self.result_path: Optional[Path] = None
+
+    def progress(self, done: int, total: int, message: str = ""):
+        """Record progress (safe to call from a worker thread)"""
+        fraction = done / total if total else 1.0
+        self.queue._update_leased(self.id, progress=round(min(fraction, 1.0), 4), message=message, updated_at=time.time())
+
+    def result_file(self, filename: str, content_type: str) -> Path:
+        """Path to write the job's downloadable result to"""
+        self.result_path = self.queue.result_dir / f"{self.id}{Path(filename).suffix}"
+        self.queue._update_leased(self.id, result_name=filename, content_type=content_type)
+        return self.result_path
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[str]]]
+
+class JobQueue:
+    """
+    SQLite-backed job queue with an in-process worker pool.
+
+    Args:
+        db_path: Job database file
+        result_dir: Directory for uploaded inputs and result files
+        workers: Concurrent jobs per process
+        result_ttl: Seconds a finished job (and its file) is kept
+        stale_after: Seconds without a heartbeat from its owner before a running job is requeued
+        max_active_per_user: Queued/running jobs allowed per user
+        heartbeat_interval: Seconds between this process's heartbeats
+    """
+
+    def __init__(
+        self,
+        db_path: str = "primo_jobs.db",
+        result_dir: Optional[str] = None,
+        workers: int = 2,
+        result_ttl: float = 3600,
+        stale_after: float = 60,
+        max_active_per_user: int = 3,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        heartbeat_interval: float = 10.0
+    ):
+        self.db_path = db_path
+        self.result_dir = Path(result_dir or Path(tempfile.gettempdir()) / "primo-jobs")
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.stale_after = stale_after
+        self.max_active_per_user = max_active_per_user
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.heartbeat_interval = heartbeat_interval
+        # Lease holder id for the jobs this process claims
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Create the jobs table"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    params TEXT,
+                    input_path TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error TEXT,
+                    result_name TEXT,
+                    content_type TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            ''')
+            # Files created before leases existed get the owner column added
+            if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_workers (
+                    owner TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs(user_id, status)')
+            conn.commit()
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Register an async handler for a job kind; it may return a completion message"""
+        def register(func: JobHandler) -> JobHandler:
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def _update(self, job_id: str, **fields: Any):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+
+    def _update_leased(self, job_id: str, **fields: Any) -> bool:
+        """Update a running job only while this process holds its lease; False once it was requeued"""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            updated = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ? AND status = 'running'",
+                (*fields.values(), job_id, self.owner)
+            ).rowcount
+            conn.commit()
+        return updated > 0
+
+    def heartbeat(self, now: Optional[float] = None):
+        """Record that this process is alive, keeping the leases of the jobs it runs"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO job_workers (owner, heartbeat_at) VALUES (?, ?)',
+                (self.owner, now or time.time())
+            )
+            conn.commit()
+
+    def _heartbeat_loop(self):
+        while not self._heartbeat_stop.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    # Submitting and inspecting jobs
+    def submit(self, user_id: str, kind: str, params: Optional[Dict[str, Any]] = None,
+               input_path: Optional[str] = None) -> str:
+        """Queue a job; returns its id"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with self._connect() as conn:
+            active = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)',
+                (user_id, *ACTIVE_STATUSES)
+            ).fetchone()[0]
+            if active >= self.max_active_per_user:
+                raise JobLimitError(f"At most {self.max_active_per_user} jobs can run at once")
+            conn.execute(
+                '''INSERT INTO jobs (id, user_id, kind, params, input_path, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (job_id, user_id, kind, json.dumps(params or {}), input_path, now, now)
+            )
+            conn.commit()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """A user's job as a dict, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE id = ? AND user_id = ?',
+                (job_id, user_id)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def result_path(self, job: Dict[str, Any]) -> Optional[Path]:
+        """File holding a finished job's result, if it still exists"""
+        if job["status"] != DONE or not job["result_name"]:
+            return None
+        path = self.result_dir / f"{job['id']}{Path(job['result_name']).suffix}"
+        return path if path.exists() else None
+
+    def input_file(self, suffix: str = "") -> Path:
+        """Fresh path for an uploaded job input"""
+        return self.result_dir / f"input-{secrets.token_urlsafe(12)}{suffix}"
+
+    # Workers
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running, leased to this process"""
+        with self._connect() as conn:
+            row = conn.execute(
+                '''UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated_at = ?
+                   WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+                   RETURNING *''',
+                (self.owner, time.time())
+            ).fetchone()
+            conn.commit()
+        return dict(row) if row else None
+
+    async def _run(self, row: Dict[str, Any]):
+        job = JobContext(self, row)
+        started = time.perf_counter()
+        try:
+            handler = self.handlers[job.kind]
+            message = await handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: put the job back for the next worker
+            self._discard_result(job)
+            self._update_leased(job.id, status=QUEUED, owner=None, progress=0, updated_at=time.time())
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            self._discard_result(job)
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, message=message or "")
+            logger.info("Job %s (%s) finished in %.2fs", job.id, job.kind, time.perf_counter() - started)
+
+    def _finish(self, job: JobContext, status: str, **fields: Any):
+        now = time.time()
+        if not self._update_leased(job.id, status=status, progress=1.0 if status == DONE else 0,
+                                   finished_at=now, updated_at=now, **fields):
+            # Requeued while this process looked gone: the new run owns the job, its input and its result
+            logger.warning("Job %s (%s) lost its lease; dropping this run's result", job.id, job.kind)
+            return
+        if job.input_path:
+            Path(job.input_path).unlink(missing_ok=True)
+
+    def _discard_result(self, job: JobContext):
+        if job.result_path is not None:
+            job.result_path.unlink(missing_ok=True)
+
+    async def _worker(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(row)
+
+    async def _cleanup_loop(self, interval: float = 60.0):
+        while True:
+            try:
+                self.cleanup()
+            except Exception:
+                logger.exception("Job cleanup failed")
+            await asyncio.sleep(interval)
+
+    def cleanup(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Delete expired jobs and their files; requeue (or fail) running jobs whose owner is gone"""
+        now = now or time.time()
+        with self._connect() as conn:
+            expired = conn.execute(
+                'SELECT id, result_name, input_path FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                (now - self.result_ttl,)
+            ).fetchall()
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(row["id"],) for row in expired])
+            stale_before = now - self.stale_after
+            conn.execute('DELETE FROM job_workers WHERE heartbeat_at < ?', (stale_before,))
+            # Claimed more than stale_after ago by a process with no recent heartbeat
+            orphaned = '''status = 'running' AND updated_at < ?
+                   AND NOT EXISTS (SELECT 1 FROM job_workers WHERE job_workers.owner = jobs.owner)'''
+            failed = conn.execute(
+                f'''UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = ?
+                   WHERE {orphaned} AND attempts >= ?''',
+                (now, stale_before, self.max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                f'''UPDATE jobs SET status = 'queued', owner = NULL, progress = 0, updated_at = ?
+                   WHERE {orphaned}''',
+                (now, stale_before)
+            ).rowcount
+            conn.commit()
+
+        for row in expired:
+            if row["result_name"]:
+                (self.result_dir / f"{row['id']}{Path(row['result_name']).suffix}").unlink(missing_ok=True)
+            if row["input_path"]:
+                Path(row["input_path"]).unlink(missing_ok=True)
+        if requeued and self._wakeup is not None:
+            self._wakeup.set()
+        return {"deleted": len(expired), "requeued": requeued, "failed": failed}
+
+    async def start(self):
+        """Start the heartbeat thread, then the worker pool and cleanup loop in the running event loop"""
+        self.heartbeat()
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="primo-job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def stop(self):
+        """Stop workers; jobs they were running go back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._heartbeat_thread is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        with self._connect() as conn:
+            conn.execute('DELETE FROM job_workers WHERE owner = ?', (self.owner,))
+            conn.commit()
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range, or None if unsatisfiable"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if first == "":
+        if last == "":
+            return None
+        # Suffix range: the final N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+def _iter_file(path: Path, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def range_file_response(path: Path, filename: str, media_type: str, range_header: Optional[str]) -> Response:
+    """Serve a file as a download, honouring a single-range `Range` header (206/416)"""
+    size = os.path.getsize(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename={filename}",
+    }
+    start, end, status_code = 0, size - 1, 200
+    # Multi-range requests get the whole file, which RFC 9110 allows
+    if range_header and "," not in range_header:
+        satisfiable = _parse_range(range_header, size)
+        if satisfiable is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = satisfiable
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_iter_file(path, start, end), status_code=status_code, headers=headers, media_type=media_type)
@@ -0,0 +1,127 @@
+"""
+Helpers for the versioned JSON task API (/api/v1).
+
+List responses skip Pydantic: pages come from `Storage.get_task_page` as raw
+row tuples and are turned into plain dicts and serialized straight to bytes,
+with orjson when it is installed (`pip install orjson`) and the json module
+otherwise. Pages are keyset-paginated on (created_at, id), newest first; the
+cursor handed to clients is an opaque token for the last row of a page.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields a client can select (user_id is implied by the credentials)
+API_FIELDS = ("id", "title", "description", "due_date", "priority", "status", "created_at", "updated_at", "parent_id")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Largest create + update + delete count accepted by one bulk call
+MAX_BULK_OPERATIONS = 1000
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Serialize a response body (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class APIResponse(Response):
+    """JSON response rendered with `dumps`"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _timestamp(value: Any) -> Optional[str]:
+    # SQLite stores "YYYY-MM-DD HH:MM:SS"; other drivers return datetimes
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.replace(" ", "T", 1)
+    return value.isoformat()
+
+def _day(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {"due_date": _day, "created_at": _timestamp, "updated_at": _timestamp}
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Validate a comma-separated ?fields= list (all API_FIELDS when empty); raises ValueError"""
+    if not fields:
+        return API_FIELDS
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in API_FIELDS]
+    if unknown or not selected:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(API_FIELDS)})")
+    return selected
+
+def page_columns(fields: Sequence[str]) -> Tuple[str, ...]:
+    """Columns to read for a page: the selected fields plus the keyset the cursor needs"""
+    return tuple(fields) + tuple(name for name in ("created_at", "id") if name not in fields)
+
+def encode_cursor(created_at: Any, task_id: int) -> str:
+    """Opaque cursor for the row (created_at, id)"""
+    raw = json.dumps([str(created_at), task_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(created_at, id) from an encode_cursor token; raises ValueError if it was tampered with"""
+    try:
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(task_id, int):
+        raise ValueError("Invalid cursor")
+    # Storage backends bind the timestamp as a typed parameter, so it must parse
+    try:
+        datetime.fromisoformat(created_at)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return created_at, task_id
+
+def rows_to_dicts(rows: List[tuple], columns: Sequence[str], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Raw `columns`-ordered row tuples as dicts of the selected fields, dates in ISO format"""
+    plan = [(name, columns.index(name), _CONVERTERS.get(name)) for name in fields]
+    return [
+        {name: (convert(row[position]) if convert else row[position]) for name, position, convert in plan}
+        for row in rows
+    ]
+
+def task_to_dict(task, fields: Sequence[str] = API_FIELDS) -> Dict[str, Any]:
+    """One task (TaskRecord or row dict) as a dict of the selected fields"""
+    return {
+        name: (_CONVERTERS[name](task.get(name)) if name in _CONVERTERS else task.get(name))
+        for name in fields
+    }
+
+def page_body(rows: List[tuple], columns: Sequence[str], fields: Sequence[str], limit: int) -> Dict[str, Any]:
+    """
+    Response body for a page read with limit + 1 rows
+
+    The extra row only signals that there is a next page; next_cursor points
+    at the last row returned.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[columns.index("created_at")], last[columns.index("id")])
+    return {"data": rows_to_dicts(rows, columns, fields), "next_cursor": next_cursor}
@@ -0,0 +1,337 @@
+"""
+Live task updates pushed to open dashboards.
+
+Task writes publish small `TaskEvent`s (user, kind, task id). Each worker
+renders an event once, as a row-level HTML fragment, and fans it out to that
+user's connections (SSE for HTMX, or a WebSocket). Every connection has a
+bounded queue: a client that falls behind has its backlog collapsed into a
+single "reload" message instead of buffering without limit. Connections are
+capped per user and per process.
+
+With one worker, events stay in process. `SQLiteEventBackend` is a
+cross-worker stand-in for a pub/sub server: events are appended to a shared
+SQLite table that every worker polls. Publishing and polling run on the event
+loop, so they wait at most `busy_timeout` (50 ms) for the file's write lock;
+an event that can't be written then is dropped for the other workers (their
+dashboards catch up on the next reload) rather than stalling the request.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import sqlite3
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import metrics
+
+logger = logging.getLogger("primo.live")
+
+CREATED, UPDATED, DELETED, RELOAD = "created", "updated", "deleted", "reload"
+
+# Ends a connection's stream (sent to every connection when the worker shuts down)
+CLOSE = "close"
+
+class LiveLimitError(Exception):
+    """Raised when a user (or the process) already has the maximum number of live connections"""
+
+class TaskEvent:
+    """A change to one user's tasks; origin is the client that made it (it already has the result)"""
+
+    __slots__ = ("user_id", "kind", "task_id", "origin")
+
+    def __init__(self, user_id: str, kind: str, task_id: Optional[int] = None, origin: Optional[str] = None):
+        self.user_id = user_id
+        self.kind = kind
+        self.task_id = task_id
+        self.origin = origin
+
+    def to_json(self) -> Dict[str, object]:
+        return {"event": self.kind, "task_id": self.task_id}
+
+class Subscription:
+    """One connected client: a bounded queue of (event, rendered fragment) pairs"""
+
+    def __init__(self, user_id: str, client_id: Optional[str], max_queue: int):
+        self.user_id = user_id
+        self.client_id = client_id
+        self.queue: "asyncio.Queue[Tuple[TaskEvent, str]]" = asyncio.Queue(max_queue)
+        self.overflows = 0
+
+    def offer(self, event: TaskEvent, html: str):
+        """Queue a message without blocking the publisher"""
+        try:
+            self.queue.put_nowait((event, html))
+        except asyncio.QueueFull:
+            # The client fell behind: drop its backlog and have it refetch the list once
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((TaskEvent(self.user_id, RELOAD), ""))
+            self.overflows += 1
+            metrics.LIVE_OVERFLOWS.inc()
+
+    def close(self):
+        """End the stream once the messages already queued are sent"""
+        try:
+            self.queue.put_nowait((TaskEvent(self.user_id, CLOSE), ""))
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((TaskEvent(self.user_id, CLOSE), ""))
+
+    async def next(self, timeout: float) -> Optional[Tuple[TaskEvent, str]]:
+        """Next message, or None after `timeout` seconds (time for a heartbeat)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+def format_sse(event: str, data: str) -> bytes:
+    """One server-sent event; multi-line data becomes several data: lines"""
+    lines = "".join(f"data: {line}\n" for line in (data.splitlines() or [""]))
+    return f"event: {event}\n{lines}\n".encode()
+
+class LocalBackend:
+    """Events stay in this process (single worker)"""
+
+    def publish(self, event: TaskEvent):
+        pass
+
+    def fetch(self) -> List[TaskEvent]:
+        return []
+
+    def prune(self, now: float):
+        pass
+
+class SQLiteEventBackend:
+    """
+    Cross-worker event relay through a shared SQLite table.
+
+    Args:
+        db_path: Event database file shared by the workers on this machine
+        retention: Seconds events are kept before pruning
+        busy_timeout: Seconds a publish or poll waits for the write lock before giving up
+    """
+
+    def __init__(self, db_path: str, retention: float = 60.0, busy_timeout: float = 0.05):
+        self.db_path = db_path
+        self.retention = retention
+        self.worker_id = secrets.token_hex(8)
+        # One connection per process, used from the event loop thread; workers
+        # starting together may wait longer for the schema than requests do
+        self._conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.init_database()
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        self._last_id = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM live_events').fetchone()[0]
+
+    def init_database(self):
+        """Create the events table"""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS live_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                worker TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                task_id INTEGER,
+                origin TEXT,
+                created_at REAL NOT NULL
+            )
+        ''')
+
+    def publish(self, event: TaskEvent):
+        """Append an event for the other workers; raises sqlite3.OperationalError if the file stays busy"""
+        self._conn.execute(
+            'INSERT INTO live_events (worker, user_id, kind, task_id, origin, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (self.worker_id, event.user_id, event.kind, event.task_id, event.origin, time.time())
+        )
+
+    def fetch(self) -> List[TaskEvent]:
+        """Events published by other workers since the last fetch"""
+        rows = self._conn.execute(
+            'SELECT id, worker, user_id, kind, task_id, origin FROM live_events WHERE id > ? ORDER BY id',
+            (self._last_id,)
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return [TaskEvent(user_id, kind, task_id, origin)
+                for _, worker, user_id, kind, task_id, origin in rows if worker != self.worker_id]
+
+    def prune(self, now: float):
+        """Delete events older than the retention window"""
+        self._conn.execute('DELETE FROM live_events WHERE created_at < ?', (now - self.retention,))
+
+    def close(self):
+        self._conn.close()
+
+Renderer = Callable[[TaskEvent], Awaitable[Optional[str]]]
+
+class LiveUpdates:
+    """
+    Per-user change notifications with bounded fan-out.
+
+    Args:
+        render: Builds the HTML fragment for an event (None skips it)
+        backend: LocalBackend or SQLiteEventBackend
+        max_per_user: Open connections allowed per user
+        max_connections: Open connections allowed per process
+        queue_size: Messages buffered per connection before it is collapsed into a reload
+        heartbeat: Seconds of silence before a keep-alive is sent
+        poll_interval: Seconds between backend polls for other workers' events
+    """
+
+    def __init__(
+        self,
+        render: Renderer,
+        backend=None,
+        max_per_user: int = 5,
+        max_connections: int = 1000,
+        queue_size: int = 100,
+        heartbeat: float = 15.0,
+        poll_interval: float = 0.25
+    ):
+        self.render = render
+        self.backend = backend or LocalBackend()
+        self.max_per_user = max_per_user
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._inbox: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # Connections
+    def subscribe(self, user_id: str, client_id: Optional[str] = None) -> Subscription:
+        """Register a connection; raises LiveLimitError when over a limit"""
+        if len(self._subscribers.get(user_id, ())) >= self.max_per_user:
+            raise LiveLimitError(f"At most {self.max_per_user} live connections per user")
+        if self._connections >= self.max_connections:
+            raise LiveLimitError("Too many live connections")
+        subscription = Subscription(user_id, client_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        self._connections += 1
+        metrics.LIVE_CONNECTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self._connections -= 1
+        metrics.LIVE_CONNECTIONS.dec()
+
+    def close_all(self):
+        """End every open stream so a shutting-down worker isn't held up; clients reconnect elsewhere"""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Open connections and users with at least one"""
+        return {"connections": self._connections, "users": len(self._subscribers)}
+
+    # Publishing
+    def publish(self, user_id: str, kind: str, task_id: Optional[int] = None, origin: Optional[str] = None):
+        """Announce a task change; returns immediately (rendering and delivery happen in the background)"""
+        event = TaskEvent(user_id, kind, task_id, origin)
+        try:
+            self.backend.publish(event)
+        except sqlite3.OperationalError as e:
+            # Shared event file busy: this worker's connections still get the event
+            logger.warning("Live event not shared with other workers (%s)", e)
+        except Exception:
+            logger.exception("Publishing live event failed")
+        if self._inbox is not None:
+            self._inbox.put_nowait(event)
+
+    def notify(self, user_id: str, kind: str, task_id: Optional[int] = None):
+        """Deliver an event to this worker's connections only (each worker raises its own reminders)"""
+        if self._inbox is not None:
+            self._inbox.put_nowait(TaskEvent(user_id, kind, task_id))
+
+    async def _deliver(self, event: TaskEvent):
+        """Render an event once and queue it for each of the user's connections"""
+        subscribers = self._subscribers.get(event.user_id)
+        if not subscribers:
+            return
+        html = await self.render(event)
+        if html is None:
+            return
+        for subscription in list(subscribers):
+            if event.origin and subscription.client_id == event.origin:
+                continue
+            subscription.offer(event, html)
+
+    async def _dispatch_loop(self):
+        while True:
+            event = await self._inbox.get()
+            try:
+                await self._deliver(event)
+            except Exception:
+                logger.exception("Delivering live event failed")
+
+    async def _poll_loop(self, prune_every: float = 30.0):
+        last_prune = 0.0
+        while True:
+            try:
+                for event in self.backend.fetch():
+                    self._inbox.put_nowait(event)
+                now = time.time()
+                if now - last_prune >= prune_every:
+                    self.backend.prune(now)
+                    last_prune = now
+            except Exception:
+                logger.exception("Polling live events failed")
+            await asyncio.sleep(self.poll_interval)
+
+    # Streams
+    async def sse_stream(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """Server-sent events for a subscription: `task` fragments, `reload`, and keep-alive comments"""
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                message = await subscription.next(self.heartbeat)
+                if message is None:
+                    yield b": ping\n\n"
+                    continue
+                event, html = message
+                if event.kind == CLOSE:
+                    return
+                yield format_sse(RELOAD if event.kind == RELOAD else "task", html)
+        finally:
+            self.unsubscribe(subscription)
+
+    async def websocket_messages(self, subscription: Subscription) -> AsyncIterator[str]:
+        """JSON messages for a subscription: {"event", "task_id", "html"}, or {"event": "ping"}"""
+        try:
+            while True:
+                message = await subscription.next(self.heartbeat)
+                if message is None:
+                    yield json.dumps({"event": "ping"})
+                    continue
+                event, html = message
+                if event.kind == CLOSE:
+                    return
+                yield json.dumps({**event.to_json(), "html": html})
+        finally:
+            self.unsubscribe(subscription)
+
+    async def start(self):
+        """Start delivery (and backend polling) in the running event loop"""
+        self._inbox = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._dispatch_loop())]
+        if not isinstance(self.backend, LocalBackend):
+            self._tasks.append(asyncio.create_task(self._poll_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._inbox = None
@@ -0,0 +1,272 @@
+"""
+Lightweight request instrumentation with Prometheus text exposition.
+
+Counters, gauges and histograms live in process memory and are rendered at
+/metrics. Recording is a dict lookup plus a bisect, so it is cheap enough to
+run on every request and every database call.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+# Database seconds accumulated by the request currently being handled
+_request_db_time: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "request_db_time", default=None
+)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Tuple[str, ...] = ()):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+def render_latest() -> str:
+    """Render every registered metric in Prometheus text format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = Counter(
+    "primo_http_requests_total", "HTTP requests by method, route and status", ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "primo_http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge("primo_http_requests_in_flight", "HTTP requests currently being handled")
+HTTP_IN_FLIGHT.set(0)
+REQUEST_DB_TIME = Histogram(
+    "primo_http_request_db_seconds", "Time spent in database calls per HTTP request", ("route",)
+)
+DB_CALLS = Histogram("primo_db_call_duration_seconds", "SQLiteDatabase call latency by method", ("method",))
+TEMPLATE_RENDER = Histogram("primo_template_render_seconds", "Template render time by template", ("template",))
+AI_UPSTREAM = Histogram(
+    "primo_ai_upstream_duration_seconds", "AI completion request latency by outcome", ("outcome",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+CACHE_REQUESTS = Counter("primo_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+LIVE_CONNECTIONS = Gauge("primo_live_connections", "Open live-update connections (SSE and WebSocket)")
+LIVE_CONNECTIONS.set(0)
+LIVE_OVERFLOWS = Counter(
+    "primo_live_overflows_total", "Live-update connections whose backlog was collapsed into a reload"
+)
+RATE_LIMITED = Counter("primo_rate_limited_total", "Requests rejected by the rate limiter by route group", ("group",))
+REMINDERS = Counter("primo_reminders_total", "Due-date reminders emitted by kind (due or overdue)", ("kind",))
+SCHEDULER_HEAP = Gauge("primo_scheduler_heap_entries", "Pending entries in the due-date scheduler's heap")
+TASKS_ARCHIVED = Counter("primo_tasks_archived_total", "Completed tasks moved into the archive table")
+TASK_ROWS = Gauge("primo_task_rows", "Task rows by table (tasks or archive) as of the last archival run", ("table",))
+SCHEDULER_HEAP.set(0)
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+def _add_request_db_time(seconds: float):
+    holder = _request_db_time.get()
+    if holder is not None:
+        holder[0] += seconds
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status, in-flight requests and DB time"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = str(message["status"])
+            await send(message)
+
+        db_time = [0.0]
+        token = _request_db_time.set(db_time)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _request_db_time.reset(token)
+            # Label by route template (e.g. /tasks/{task_id}) to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc((method, route_path, status_holder[0]))
+            HTTP_LATENCY.observe(elapsed, (method, route_path))
+            REQUEST_DB_TIME.observe(db_time[0], (route_path,))
+
+def _timed(name: str, func: Callable) -> Callable:
+    """Wrap a database method so each call is recorded in DB_CALLS and the request's DB time"""
+    labels = (name,)
+    if inspect.isasyncgenfunction(func):
+        # Only time spent producing rows counts, not the caller's work between them
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args, **kwargs):
+            rows = func(*args, **kwargs)
+            spent = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = await rows.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        elapsed = time.perf_counter() - start
+                        spent += elapsed
+                        _add_request_db_time(elapsed)
+                    yield item
+            finally:
+                await rows.aclose()
+                DB_CALLS.observe(spent, labels)
+        return async_gen_wrapper
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                DB_CALLS.observe(elapsed, labels)
+                _add_request_db_time(elapsed)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_CALLS.observe(elapsed, labels)
+            _add_request_db_time(elapsed)
+    return wrapper
+
+def instrument_database(db):
+    """Time every public method of a database instance"""
+    for name in dir(type(db)):
+        if name.startswith("_"):
+            continue
+        attr = getattr(db, name)
+        if callable(attr):
+            setattr(db, name, _timed(name, attr))
+    return db
+
+def instrument_templates(templates):
+    """Time template rendering done through Jinja2Templates.TemplateResponse"""
+    template_response = templates.TemplateResponse
+
+    @functools.wraps(template_response)
+    def timed_template_response(name, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return template_response(name, *args, **kwargs)
+        finally:
+            TEMPLATE_RENDER.observe(time.perf_counter() - start, (str(name),))
+
+    templates.TemplateResponse = timed_template_response
+    return templates
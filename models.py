@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class TaskStatus(str, Enum):
@@ -28,6 +28,8 @@ class TaskCreate(BaseModel):
     due_date: Optional[date] = None
     priority: TaskPriority = TaskPriority.MEDIUM
     status: TaskStatus = TaskStatus.TODO
+    # Create as a subtask of this task
+    parent_id: Optional[int] = None
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
@@ -36,6 +38,15 @@ class TaskUpdate(BaseModel):
     priority: Optional[TaskPriority] = None
     status: Optional[TaskStatus] = None
 
+class BulkTaskUpdate(TaskUpdate):
+    id: int
+
+class BulkTaskRequest(BaseModel):
+    """Task writes applied by one /api/v1/tasks/bulk call; creates share one transaction"""
+    create: List[TaskCreate] = []
+    update: List[BulkTaskUpdate] = []
+    delete: List[int] = []
+
 class Task(BaseModel):
     id: int
     title: str
@@ -46,8 +57,44 @@ class Task(BaseModel):
     user_id: str
     created_at: datetime
     updated_at: datetime
+    parent_id: Optional[int] = None
+
+class TaskMove(BaseModel):
+    """New parent for a task and its subtree; None moves it to the top level"""
+    parent_id: Optional[int] = None
 
 class User(BaseModel):
     id: str
     email: str
     created_at: datetime
+
+class TaskFilter(BaseModel):
+    """Filters shared by the task list and exports; unset fields match everything"""
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    due_from: Optional[date] = None
+    due_to: Optional[date] = None
+    search: Optional[str] = Field(None, max_length=200)
+    # Also read archived tasks (completed tasks moved out of the hot table)
+    archived: bool = False
+
+    def is_empty(self) -> bool:
+        return not (self.status or self.priority or self.due_from or self.due_to or self.search or self.archived)
+
+    def matches(self, task) -> bool:
+        """Same semantics as the SQL filters, for tasks already in memory (dates inclusive, search case-insensitive)"""
+        if self.status is not None and task.get("status") != self.status.value:
+            return False
+        if self.priority is not None and task.get("priority") != self.priority.value:
+            return False
+        if self.due_from is not None or self.due_to is not None:
+            due_date = task.get("due_date")
+            if due_date is None:
+                return False
+            if self.due_from is not None and due_date < self.due_from:
+                return False
+            if self.due_to is not None and due_date > self.due_to:
+                return False
+        if self.search and self.search.lower() not in (task.get("title") or "").lower():
+            return False
+        return True
@@ -0,0 +1,191 @@
+"""
+Opt-in SQL profiler for SQLiteDatabase.
+
+When enabled, every statement is timed (execution up to the first row) and tagged with the SQLiteDatabase
+method that issued it. Statements slower than the threshold are logged with
+redacted parameters and their EXPLAIN QUERY PLAN, per-statement aggregates
+are kept for the admin endpoint, and full table scans on watched tables are
+recorded so tests can fail on them.
+
+Enable with PRIMO_SQL_PROFILE=1 (threshold: PRIMO_SLOW_QUERY_MS, default 100;
+watched tables: PRIMO_SQL_FAIL_ON_SCAN, e.g. "tasks").
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("primo.sql")
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((\?(, )?)+\)")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and variable-length IN lists so equivalent statements share stats"""
+    return _IN_LIST.sub("IN (?...)", _WHITESPACE.sub(" ", sql).strip())
+
+def redact_params(params: Any) -> Any:
+    """Replace string/bytes parameters with type and length placeholders"""
+    def redact(value):
+        if isinstance(value, str):
+            return f"<str:{len(value)}>"
+        if isinstance(value, (bytes, bytearray)):
+            return f"<bytes:{len(value)}>"
+        return value
+    if isinstance(params, dict):
+        return {key: redact(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact(value) for value in params]
+    return params
+
+class FullTableScanError(AssertionError):
+    """Raised by QueryProfiler.assert_no_full_scans when a watched table was scanned"""
+
+class QueryProfiler:
+    def __init__(self, slow_ms: float = 100.0, explain: bool = True, fail_on_scan: Iterable[str] = ()):
+        """
+        Collects per-statement timing for SQLiteDatabase
+
+        Args:
+            slow_ms: Statements at or above this many milliseconds are logged
+            explain: Capture EXPLAIN QUERY PLAN (once per distinct statement)
+            fail_on_scan: Tables on which a full scan counts as a violation
+        """
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.fail_on_scan = {table.lower() for table in fail_on_scan}
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._plans: Dict[str, List[str]] = {}
+        self._factory: Optional[type] = None
+        self._violation_keys: set = set()
+        self.violations: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_env(cls) -> Optional["QueryProfiler"]:
+        """Build a profiler from PRIMO_SQL_* environment variables, or None when disabled"""
+        if os.getenv("PRIMO_SQL_PROFILE", "").lower() not in ("1", "true", "yes"):
+            return None
+        tables = [t.strip() for t in os.getenv("PRIMO_SQL_FAIL_ON_SCAN", "").split(",") if t.strip()]
+        return cls(slow_ms=float(os.getenv("PRIMO_SLOW_QUERY_MS", "100")), fail_on_scan=tables)
+
+    def connection_factory(self) -> type:
+        """
+        sqlite3.connect factory whose connections report to this profiler
+
+        Statements are tagged with the connection's `method` attribute, which
+        the borrower sets each time a pooled connection is handed out.
+        """
+        if self._factory is None:
+            self._factory = self._make_factory()
+        return self._factory
+
+    def _make_factory(self) -> type:
+        profiler = self
+
+        class ProfilingConnection(sqlite3.Connection):
+            method = "unknown"
+
+            def execute(self, sql, parameters=()):
+                start = time.perf_counter()
+                try:
+                    return super().execute(sql, parameters)
+                finally:
+                    profiler.record(self, self.method, sql, parameters, time.perf_counter() - start)
+
+            def executemany(self, sql, seq_of_parameters):
+                seq_of_parameters = list(seq_of_parameters)
+                start = time.perf_counter()
+                try:
+                    return super().executemany(sql, seq_of_parameters)
+                finally:
+                    sample = seq_of_parameters[0] if seq_of_parameters else ()
+                    profiler.record(self, self.method, sql, sample, time.perf_counter() - start,
+                                    rows=len(seq_of_parameters))
+
+        return ProfilingConnection
+
+    def _plan(self, conn: sqlite3.Connection, sql: str, key: str, params: Sequence[Any]) -> List[str]:
+        plan = self._plans.get(key)
+        if plan is None:
+            try:
+                cursor = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"(plan unavailable: {e})"]
+            self._plans[key] = plan
+        return plan
+
+    def _full_scans(self, plan: List[str]) -> List[str]:
+        scanned = []
+        for detail in plan:
+            # "SCAN tasks" (or "SCAN TABLE tasks" on older SQLite) without an index is a full scan
+            match = re.match(r"SCAN (?:TABLE )?(\w+)(.*)", detail)
+            if match and "USING" not in match.group(2) and match.group(1).lower() in self.fail_on_scan:
+                scanned.append(match.group(1))
+        return scanned
+
+    def record(self, conn, method: str, sql: str, params: Any, elapsed: float, rows: int = 1):
+        key = normalize_sql(sql)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self._stats.get((method, key))
+            if stats is None:
+                stats = self._stats[(method, key)] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["rows"] += rows
+
+        if not key.upper().startswith(_EXPLAINABLE):
+            return
+        slow = elapsed_ms >= self.slow_ms
+        plan = self._plan(conn, sql, key, params) if self.explain and (slow or self.fail_on_scan) else None
+
+        if slow:
+            logger.warning(
+                "Slow query %.1fms in %s: %s params=%s plan=%s",
+                elapsed_ms, method, key, redact_params(params), plan
+            )
+        if plan:
+            for table in self._full_scans(plan):
+                with self._lock:
+                    if (method, key, table) in self._violation_keys:
+                        continue
+                    self._violation_keys.add((method, key, table))
+                    self.violations.append({"method": method, "table": table, "sql": key, "plan": plan})
+                logger.error("Full table scan on %s in %s: %s", table, method, key)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Aggregate per-statement stats, slowest total time first"""
+        with self._lock:
+            rows = [
+                {
+                    "method": method,
+                    "sql": sql,
+                    "count": s["count"],
+                    "total_ms": round(s["total_ms"], 3),
+                    "avg_ms": round(s["total_ms"] / s["count"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                    "rows": s["rows"],
+                    "plan": self._plans.get(sql),
+                }
+                for (method, sql), s in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._violation_keys.clear()
+            self.violations.clear()
+
+    def assert_no_full_scans(self):
+        """Raise FullTableScanError if any watched table was fully scanned"""
+        if self.violations:
+            details = "; ".join(f"{v['method']}: {v['sql']} ({v['table']})" for v in self.violations)
+            raise FullTableScanError(f"Full table scans detected: {details}")
@@ -0,0 +1,217 @@
+"""
+Token-bucket rate limiting per user (or client IP) and route group.
+
+Every request spends one token from the bucket for (route group, caller): the
+signed-in user's id, or the client address for anonymous requests. A bucket
+holds up to `requests` tokens and refills continuously at `requests / period`
+per second, so bursts up to the budget pass and sustained traffic is held to
+the rate. A request that finds its bucket empty gets 429 with `Retry-After`
+set to when the next token arrives.
+
+Buckets live in process memory by default (a dict lookup and a little
+arithmetic per request). `SQLiteRateBackend` shares them between the workers
+on one machine through a SQLite file, one UPSERT per request, so a budget
+holds across workers rather than per worker. That UPSERT runs on the event
+loop, so it waits at most `busy_timeout` (50 ms) for the file's write lock;
+when the file stays busy longer the request is let through (fail open).
+"""
+import logging
+import math
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("primo.ratelimit")
+
+# Route group -> "requests/seconds"; PRIMO_RATE_LIMITS overrides entries
+DEFAULT_LIMITS = {
+    "default": "300/60",
+    "api": "600/60",
+    "ai": "20/60",
+    "export": "10/60",
+    "auth": "10/60",
+}
+
+# Long-lived connections and infrastructure endpoints are never limited
+EXEMPT_PREFIXES = ("/static/", "/metrics", "/health", "/events", "/ws/")
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """Budget a request counts against, or None if it is exempt"""
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path.startswith("/ai/") and path != "/ai/status":
+        return "ai"
+    if path in ("/login", "/register", "/api/v1/auth/token") and method == "POST":
+        return "auth"
+    if path.startswith("/export/") or path == "/reports/export" or (path.startswith("/jobs/") and method == "POST"):
+        return "export"
+    if path.startswith("/api/"):
+        return "api"
+    return "default"
+
+class RateLimit:
+    """A budget of `requests` per `period` seconds (also the burst size)"""
+
+    __slots__ = ("requests", "period", "rate")
+
+    def __init__(self, requests: int, period: float):
+        if requests < 1 or period <= 0:
+            raise ValueError("A rate limit needs at least one request per positive period")
+        self.requests = requests
+        self.period = period
+        self.rate = requests / period
+
+    @classmethod
+    def parse(cls, text: str) -> "RateLimit":
+        """RateLimit from "requests/seconds", e.g. "20/60"; raises ValueError"""
+        requests, _, period = text.partition("/")
+        return cls(int(requests), float(period or 1))
+
+    def __repr__(self) -> str:
+        return f"RateLimit({self.requests}/{self.period:g}s)"
+
+class MemoryRateBackend:
+    """
+    Buckets in this process.
+
+    Args:
+        max_buckets: Buckets kept before full (idle) ones are dropped
+    """
+
+    def __init__(self, max_buckets: int = 100_000):
+        self.max_buckets = max_buckets
+        # key -> [tokens, updated, full_at]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Spend a token; returns 0.0 if one was available, else seconds until there is one"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            self._buckets[key] = [burst - 1.0, now, now + 1 / rate]
+            return 0.0
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            tokens -= 1
+            bucket[0] = tokens
+            bucket[2] = now + (burst - tokens) / rate
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled (a new bucket starts full anyway), then the oldest if still over"""
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        excess = len(self._buckets) - self.max_buckets * 9 // 10
+        for key in list(self._buckets)[:max(0, excess)]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# Tokens after refilling to `now` (SET expressions all see the row before the update)
+_REFILL = "MIN(:burst, tokens + MAX(0, :now - updated) * :rate)"
+
+class SQLiteRateBackend:
+    """
+    Buckets shared by the workers on this machine through a SQLite file.
+
+    Args:
+        db_path: Rate limit database file shared by the workers
+        retention: Seconds a bucket may sit idle before it is deleted (longer than any period)
+        busy_timeout: Seconds a request waits for the write lock before it is allowed unchecked
+    """
+
+    def __init__(self, db_path: str, retention: float = 3600.0, busy_timeout: float = 0.05):
+        self.db_path = db_path
+        self.retention = retention
+        self._last_prune = 0.0
+        # One connection per process, used from the event loop thread; workers
+        # starting together may wait longer for the schema than requests do
+        self._conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.init_database()
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def init_database(self):
+        """Create the buckets table"""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                granted INTEGER NOT NULL
+            )
+        ''')
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Spend a token in one atomic UPSERT; returns 0.0 if granted, else seconds until a token is available"""
+        tokens, granted = self._conn.execute(
+            f'''INSERT INTO rate_buckets (key, tokens, updated, granted) VALUES (:key, :burst - 1, :now, 1)
+                ON CONFLICT(key) DO UPDATE SET
+                    granted = {_REFILL} >= 1,
+                    tokens = {_REFILL} - ({_REFILL} >= 1),
+                    updated = MAX(updated, :now)
+                RETURNING tokens, granted''',
+            {"key": key, "rate": rate, "burst": burst, "now": now}
+        ).fetchone()
+        if now - self._last_prune >= 60:
+            self._last_prune = now
+            self._conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.retention,))
+        return 0.0 if granted else (1 - tokens) / rate
+
+    def close(self):
+        self._conn.close()
+
+class RateLimiter:
+    """
+    Per-caller token buckets for each route group.
+
+    Args:
+        limits: Route group -> RateLimit (groups without one are unlimited)
+        backend: MemoryRateBackend (default) or SQLiteRateBackend
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit], backend=None):
+        self.limits = limits
+        self.backend = backend or MemoryRateBackend()
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """Build a limiter from PRIMO_RATE_* environment variables, or None when disabled"""
+        if os.getenv("PRIMO_RATE_LIMIT", "1") == "0":
+            return None
+        specs = dict(DEFAULT_LIMITS)
+        for item in os.getenv("PRIMO_RATE_LIMITS", "").split(","):
+            group, _, spec = item.partition("=")
+            if group.strip() and spec.strip():
+                specs[group.strip()] = spec.strip()
+        db_path = os.getenv("PRIMO_RATE_LIMIT_DB")
+        return cls(
+            {group: RateLimit.parse(spec) for group, spec in specs.items()},
+            backend=SQLiteRateBackend(db_path) if db_path else None
+        )
+
+    def check(self, group: str, caller: str) -> float:
+        """Spend a token from the caller's bucket for `group`; 0.0 when allowed, else seconds to wait"""
+        limit = self.limits.get(group)
+        if limit is None:
+            return 0.0
+        try:
+            return self.backend.take(f"{group}:{caller}", limit.rate, limit.requests, time.time())
+        except sqlite3.OperationalError as e:
+            # Busy or locked past the short busy timeout: let the request through rather than stall the loop
+            logger.warning("Rate limit backend unavailable (%s); allowing request", e)
+            return 0.0
+        except sqlite3.Error:
+            logger.exception("Rate limit backend failed; allowing request")
+            return 0.0
+
+def retry_after(seconds: float) -> str:
+    """Retry-After header value (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(seconds)))
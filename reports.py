@@ -0,0 +1,220 @@
+"""
+Task report aggregation and CSV export helpers
+"""
+import csv
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+AGE_BUCKETS = ["0-7 days", "8-30 days", "31-90 days", "90+ days"]
+PRIORITY_NAMES = ["Low", "Medium", "High", "Urgent"]
+
+CSV_HEADERS = ['Title', 'Description', 'Due Date', 'Priority', 'Status', 'Created At', 'Updated At']
+
+def age_bucket(age_days: int) -> str:
+    """Bucket a task age in days"""
+    if age_days <= 7:
+        return "0-7 days"
+    elif age_days <= 30:
+        return "8-30 days"
+    elif age_days <= 90:
+        return "31-90 days"
+    return "90+ days"
+
+def _as_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return datetime.fromisoformat(value).date()
+    return None
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return None
+
+def summarize_tasks(
+    tasks: Iterable[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    overdue_count: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Aggregate tasks into the figures shown on the reports page
+
+    Returns total, status/priority counts, overdue count, completion rate and
+    aging buckets (overall and by priority). Pass `overdue_count` when it is
+    already known (from the due-date scheduler) to skip due-date parsing.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    status_counts = defaultdict(int)
+    priority_counts = defaultdict(int)
+    count_overdue = overdue_count is None
+    overdue_count = overdue_count or 0
+    total_tasks = 0
+    aging_buckets = {bucket: 0 for bucket in AGE_BUCKETS}
+    aging_by_priority = {name: {bucket: 0 for bucket in AGE_BUCKETS} for name in PRIORITY_NAMES}
+
+    for task in tasks:
+        total_tasks += 1
+
+        # Count by status
+        status_display = task.get('status', '').replace('_', ' ').title()
+        status_counts[status_display] += 1
+
+        # Count by priority
+        priority_display = task.get('priority', '').title()
+        priority_counts[priority_display] += 1
+
+        # Check for overdue tasks
+        if count_overdue and task.get('due_date') and task.get('status') != 'completed':
+            try:
+                due_date = _as_date(task.get('due_date'))
+                if due_date and due_date < today:
+                    overdue_count += 1
+            except (ValueError, AttributeError, TypeError):
+                pass
+
+        # Calculate task age
+        try:
+            created_at = _as_datetime(task.get('created_at'))
+            if created_at:
+                bucket = age_bucket((now - created_at).days)
+                aging_buckets[bucket] += 1
+                if priority_display in aging_by_priority:
+                    aging_by_priority[priority_display][bucket] += 1
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    completed_tasks = status_counts.get('Completed', 0)
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+
+    return {
+        "total_tasks": total_tasks,
+        "status_counts": dict(status_counts),
+        "priority_counts": dict(priority_counts),
+        "overdue_count": overdue_count,
+        "completion_rate": round(completion_rate, 1),
+        "aging_buckets": aging_buckets,
+        "aging_by_priority": aging_by_priority,
+    }
+
+def _points(values: List[int], top: int, width: int, height: int) -> str:
+    """SVG polyline points for a daily series, one point per day centred in its slot"""
+    slot = width / len(values)
+    return " ".join(
+        f"{slot * (position + 0.5):.1f},{height - value / top * height:.1f}"
+        for position, value in enumerate(values)
+    )
+
+def summarize_trend(days: List[Dict[str, Any]], width: int = 600, height: int = 160) -> Dict[str, Any]:
+    """
+    Totals and chart geometry for daily rollup rows (from Storage.get_daily_stats)
+
+    Returns created/completed totals, open and overdue counts at both ends of
+    the range, and an SVG-ready chart: created/completed bars per day plus
+    open and overdue lines, scaled to `width` x `height`.
+    """
+    if not days:
+        return {"days": [], "created": 0, "completed": 0, "open_start": 0, "open_end": 0,
+                "overdue_end": 0, "chart": None}
+    open_counts = [sum(day[f"open_{name.lower()}"] for name in PRIORITY_NAMES) for day in days]
+    overdue = [day["overdue"] for day in days]
+    created = [day["created"] for day in days]
+    completed = [day["completed"] for day in days]
+
+    flow_top = max(max(created), max(completed), 1)
+    stock_top = max(max(open_counts), 1)
+    slot = width / len(days)
+    bar_width = max(slot / 2 - 1, 0.5)
+    bars = []
+    for position, day in enumerate(days):
+        left = slot * position
+        for offset, value, kind in ((0, created[position], "created"), (bar_width, completed[position], "completed")):
+            bar_height = value / flow_top * height
+            bars.append({"x": round(left + offset, 1), "y": round(height - bar_height, 1),
+                         "width": round(bar_width, 1), "height": round(bar_height, 1),
+                         "kind": kind, "day": day["day"], "value": value})
+
+    return {
+        "days": days,
+        "created": sum(created),
+        "completed": sum(completed),
+        "open_start": open_counts[0],
+        "open_end": open_counts[-1],
+        "overdue_end": overdue[-1],
+        "chart": {
+            "width": width,
+            "height": height,
+            "bars": bars,
+            "open_points": _points(open_counts, stock_top, width, height),
+            "overdue_points": _points(overdue, stock_top, width, height),
+            "flow_top": flow_top,
+            "stock_top": stock_top,
+        },
+    }
+
+def write_report_csv(summary: Dict[str, Any], output: TextIO):
+    """Write a report summary (from summarize_tasks) as the report CSV layout"""
+    writer = csv.writer(output)
+
+    # Write report headers
+    writer.writerow(['Report Type', 'Metric', 'Value'])
+    writer.writerow([])  # Empty row
+
+    # Task Status Report
+    writer.writerow(['Task Status Report', '', ''])
+    for status, count in summary["status_counts"].items():
+        writer.writerow(['Status', status, count])
+    writer.writerow([])  # Empty row
+
+    # Priority Distribution
+    writer.writerow(['Priority Distribution', '', ''])
+    for priority, count in summary["priority_counts"].items():
+        writer.writerow(['Priority', priority, count])
+    writer.writerow([])  # Empty row
+
+    # Task Aging Report
+    writer.writerow(['Task Aging Report', '', ''])
+    for age_range, count in summary["aging_buckets"].items():
+        writer.writerow(['Age Range', age_range, count])
+    writer.writerow([])  # Empty row
+
+    # Overdue Tasks
+    writer.writerow(['Overdue Analysis', '', ''])
+    writer.writerow(['Overdue Tasks', 'Count', summary["overdue_count"]])
+
+    # Completion Rate
+    writer.writerow(['Completion Rate', 'Percentage', f"{summary['completion_rate']:.1f}%"])
+    writer.writerow([])  # Empty row
+
+    # Tasks by Age Grouped by Priority Report
+    writer.writerow(['Tasks by Age Grouped by Priority', '', ''])
+    for priority, age_data in summary["aging_by_priority"].items():
+        priority_total = sum(age_data.values())
+        if priority_total > 0:
+            writer.writerow(['Priority', priority, f'Total: {priority_total}'])
+            for age_range, count in age_data.items():
+                if count > 0:
+                    writer.writerow(['', age_range, count])
+            writer.writerow([])  # Empty row after each priority
+
+def write_tasks_csv(tasks: Iterable[Dict[str, Any]], output: TextIO, header: bool = True):
+    """Write tasks in the task export CSV layout (header=False to append a further chunk)"""
+    writer = csv.writer(output)
+    if header:
+        writer.writerow(CSV_HEADERS)
+    for task in tasks:
+        writer.writerow([
+            task.get('title', ''),
+            task.get('description', ''),
+            task.get('due_date', ''),
+            task.get('priority', '').title(),
+            task.get('status', '').replace('_', ' ').title(),
+            task.get('created_at', ''),
+            task.get('updated_at', '')
+        ])
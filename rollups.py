@@ -0,0 +1,268 @@
+"""
+Daily task rollups behind the trend reports.
+
+`task_daily_stats` holds one row per user per day: tasks created and
+completed that day, and open tasks by priority plus overdue tasks at the end
+of the day. Task writes update today's row in the same transaction. Days
+without writes are filled in by carrying the previous row forward the next
+time the user's rollups are touched (adding tasks that fell overdue in
+between). Users with tasks but no rollups yet are backfilled from their task
+rows, either lazily on first touch or ahead of time in batches:
+
+    python -m rollups backfill --db primo.db [--shards N --shard-dir DIR]
+
+The tasks table keeps no completion time, so backfilled history counts a
+completed task's last update as its completion, and tasks deleted before the
+backfill leave no trace. Archived tasks (see archive.py) are counted too.
+"""
+import argparse
+import sqlite3
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+PRIORITIES = ("low", "medium", "high", "urgent")
+STOCK_COLUMNS = ("open_low", "open_medium", "open_high", "open_urgent", "overdue")
+ROLLUP_COLUMNS = ("created", "completed") + STOCK_COLUMNS
+
+# Longest date range a trend report reads
+MAX_RANGE_DAYS = 366
+
+ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS task_daily_stats (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        created INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        open_low INTEGER NOT NULL DEFAULT 0,
+        open_medium INTEGER NOT NULL DEFAULT 0,
+        open_high INTEGER NOT NULL DEFAULT 0,
+        open_urgent INTEGER NOT NULL DEFAULT 0,
+        overdue INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
+'''
+
+# Task columns the rollups are computed from (STATE_COLUMNS are enough for write_delta)
+SOURCE_COLUMNS = ("created_at", "updated_at", "due_date", "priority", "status")
+STATE_COLUMNS = ("due_date", "priority", "status")
+
+DayRow = Tuple[date, Dict[str, int]]
+
+def as_day(value: Any) -> Optional[date]:
+    """Calendar day of a stored date/timestamp (ISO string or date/datetime)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+
+def _stocks(task: Optional[Mapping[str, Any]], day: date) -> Dict[str, int]:
+    """What one task adds to the stock columns at the end of `day`"""
+    if task is None or task["status"] == "completed":
+        return {}
+    stocks = {}
+    if task["priority"] in PRIORITIES:
+        stocks[f"open_{task['priority']}"] = 1
+    due_date = as_day(task["due_date"])
+    if due_date is not None and due_date < day:
+        stocks["overdue"] = 1
+    return stocks
+
+def write_delta(old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]], day: date) -> Dict[str, int]:
+    """
+    Change to a user's row for `day` caused by one task write
+
+    Args:
+        old: Task before the write (None when it is being created)
+        new: Task after the write (None when it is being deleted)
+    """
+    delta = Counter()
+    if old is None and new is not None:
+        delta["created"] += 1
+    if new is not None and new["status"] == "completed" and (old is None or old["status"] != "completed"):
+        delta["completed"] += 1
+    delta.subtract(_stocks(old, day))
+    delta.update(_stocks(new, day))
+    return {column: value for column, value in delta.items() if value}
+
+def backfill_days(tasks: Iterable[Mapping[str, Any]], until: date) -> List[DayRow]:
+    """
+    Rebuild one user's daily rows, from their first task's day through `until`
+
+    Flows and stock changes are bucketed per day, then swept once.
+    """
+    changes: Dict[date, Counter] = defaultdict(Counter)
+    first = until
+    for task in tasks:
+        created = min(as_day(task["created_at"]) or until, until)
+        first = min(first, created)
+        changes[created]["created"] += 1
+        completed = None
+        if task["status"] == "completed":
+            completed = max(as_day(task["updated_at"]) or created, created)
+            changes[completed]["completed"] += 1
+        if task["priority"] in PRIORITIES:
+            column = f"open_{task['priority']}"
+            changes[created][column] += 1
+            if completed is not None:
+                changes[completed][column] -= 1
+        due_date = as_day(task["due_date"])
+        if due_date is not None:
+            # Overdue from the day after it was due (once it exists) until completion
+            overdue_from = max(created, due_date + timedelta(days=1))
+            if completed is None or overdue_from < completed:
+                changes[overdue_from]["overdue"] += 1
+                if completed is not None:
+                    changes[completed]["overdue"] -= 1
+
+    rows = []
+    stocks = Counter()
+    day = first
+    while day <= until:
+        change = changes.get(day, Counter())
+        for column in STOCK_COLUMNS:
+            stocks[column] += change[column]
+        rows.append((day, {"created": change["created"], "completed": change["completed"],
+                           **{column: stocks[column] for column in STOCK_COLUMNS}}))
+        day += timedelta(days=1)
+    return rows
+
+def carry_forward(last_day: date, last_stocks: Mapping[str, int], until: date,
+                  due_counts: Mapping[date, int]) -> List[DayRow]:
+    """
+    Rows for the days after `last_day` through `until` in which nothing was written
+
+    Args:
+        due_counts: Open tasks per due date, for due dates from last_day to until - 1
+    """
+    rows = []
+    stocks = dict(last_stocks)
+    day = last_day + timedelta(days=1)
+    while day <= until:
+        stocks["overdue"] += due_counts.get(day - timedelta(days=1), 0)
+        rows.append((day, {"created": 0, "completed": 0, **stocks}))
+        day += timedelta(days=1)
+    return rows
+
+def fill_range(rows: Sequence[Mapping[str, Any]], start: date, end: date) -> List[Dict[str, Any]]:
+    """Stored rows for start..end with zero rows for days before the user's first one"""
+    by_day = {as_day(row["day"]): row for row in rows}
+    filled = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        filled.append({"day": day, **{column: int(row[column]) if row else 0 for column in ROLLUP_COLUMNS}})
+        day += timedelta(days=1)
+    return filled
+
+# SQLite maintenance, called inside the task-writing transaction (see database.py)
+_INSERT_SQL = (
+    f'INSERT OR IGNORE INTO task_daily_stats (user_id, day, {", ".join(ROLLUP_COLUMNS)}) '
+    f'VALUES (?, ?, {", ".join("?" for _ in ROLLUP_COLUMNS)})'
+)
+
+def _insert_rows(conn: sqlite3.Connection, user_id: str, rows: List[DayRow]):
+    conn.executemany(
+        _INSERT_SQL,
+        [(user_id, day.isoformat(), *(values[column] for column in ROLLUP_COLUMNS)) for day, values in rows]
+    )
+
+def backfill_user(conn: sqlite3.Connection, user_id: str, until: date):
+    """Build a user's rows from their tasks, archived ones included (rows that already exist are kept)"""
+    select = ", ".join(SOURCE_COLUMNS)
+    cursor = conn.execute(
+        f'SELECT {select} FROM tasks WHERE user_id = ? UNION ALL SELECT {select} FROM tasks_archive WHERE user_id = ?',
+        (user_id, user_id)
+    )
+    tasks = (dict(zip(SOURCE_COLUMNS, row)) for row in cursor)
+    _insert_rows(conn, user_id, backfill_days(tasks, until))
+
+def ensure_rollups(conn: sqlite3.Connection, user_id: str, day: date):
+    """Make sure the user has rows through `day`: backfill, or carry the last row forward"""
+    last = conn.execute(
+        f'SELECT day, {", ".join(STOCK_COLUMNS)} FROM task_daily_stats WHERE user_id = ? ORDER BY day DESC LIMIT 1',
+        (user_id,)
+    ).fetchone()
+    if last is None:
+        backfill_user(conn, user_id, day)
+        return
+    last_day = date.fromisoformat(last[0])
+    if last_day >= day:
+        return
+    due_counts = {
+        date.fromisoformat(due_date): count
+        for due_date, count in conn.execute(
+            '''SELECT due_date, COUNT(*) FROM tasks
+               WHERE user_id = ? AND status != 'completed' AND due_date >= ? AND due_date < ?
+               GROUP BY due_date''',
+            (user_id, last_day.isoformat(), day.isoformat())
+        )
+    }
+    _insert_rows(conn, user_id, carry_forward(last_day, dict(zip(STOCK_COLUMNS, last[1:])), day, due_counts))
+
+def apply_delta(conn: sqlite3.Connection, user_id: str, day: date, delta: Mapping[str, int]):
+    """Add a write_delta to the user's row for `day` (ensure_rollups must have run first)"""
+    if not delta:
+        return
+    assignments = ", ".join(f"{column} = {column} + ?" for column in delta)
+    conn.execute(
+        f'UPDATE task_daily_stats SET {assignments} WHERE user_id = ? AND day = ?',
+        (*delta.values(), user_id, day.isoformat())
+    )
+
+def read_rollups(conn: sqlite3.Connection, user_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """Stored rows for a date range, oldest first"""
+    cursor = conn.execute(
+        f'''SELECT day, {", ".join(ROLLUP_COLUMNS)} FROM task_daily_stats
+            WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day''',
+        (user_id, start.isoformat(), end.isoformat())
+    )
+    return [dict(zip(("day",) + ROLLUP_COLUMNS, row)) for row in cursor]
+
+def backfill(db, batch_size: int = 100) -> int:
+    """
+    Backfill every user who has tasks but no rollups, `batch_size` users per transaction
+
+    Returns:
+        Number of users backfilled
+    """
+    today = date.today()
+    done = 0
+    for path in db.task_db_paths():
+        with db._connect(path) as conn:
+            pending = [row[0] for row in conn.execute(
+                '''SELECT user_id FROM tasks UNION SELECT user_id FROM tasks_archive
+                   EXCEPT SELECT user_id FROM task_daily_stats'''
+            )]
+            for start in range(0, len(pending), batch_size):
+                for user_id in pending[start:start + batch_size]:
+                    ensure_rollups(conn, user_id, today)
+                conn.commit()
+                done += len(pending[start:start + batch_size])
+    return done
+
+def main():
+    from database import SQLiteDatabase
+    from sharding import ShardedSQLiteDatabase
+
+    parser = argparse.ArgumentParser(description="Maintain the daily task rollups behind trend reports")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--db", default="primo.db", help="main database file")
+    parser.add_argument("--shards", type=int, default=1, help="shard count, if tasks are sharded")
+    parser.add_argument("--shard-dir", help="directory for shard files (default: next to --db)")
+    parser.add_argument("--batch-size", type=int, default=100, help="users backfilled per transaction")
+    args = parser.parse_args()
+
+    if args.shards > 1:
+        db = ShardedSQLiteDatabase(args.db, shard_count=args.shards, shard_dir=args.shard_dir)
+    else:
+        db = SQLiteDatabase(args.db)
+    if args.command == "backfill":
+        print(f"📈 Backfilled daily rollups for {backfill(db, args.batch_size)} users")
+    db.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Due-date scheduler: overdue counts and reminders without scanning tasks.
+
+For every user, `DueDateScheduler` keeps the open tasks that have a due date
+and how many of them are overdue, plus one min-heap of upcoming events across
+all users: a task due on day D gets a "due" reminder when D starts and turns
+overdue when D + 1 starts. A background loop pops the heap as the date
+changes, so overdue counts are a dictionary lookup at request time.
+
+State is rebuilt on startup from the partial index idx_tasks_open_due
+(`Storage.iter_open_due_tasks`). Task writes made through the storage object
+the scheduler observes update it in place; like the task cache, each user's
+state records the task version it reflects, so writes made by other workers
+are picked up by reloading that one user from the index.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from database import _parse_date
+
+logger = logging.getLogger("primo.scheduler")
+
+DUE, OVERDUE = "due", "overdue"
+
+Reminder = Callable[[str, str, int], None]
+
+class _UserDue:
+    """One user's open tasks with a due date (task id -> token) and the task version they reflect"""
+
+    __slots__ = ("version", "tasks", "overdue")
+
+    def __init__(self, version: int):
+        self.version = version
+        # The token is a fresh (due_date,) tuple per change, so heap entries
+        # for an older due date are recognised as stale by identity
+        self.tasks: Dict[int, Tuple[date]] = {}
+        self.overdue = 0
+
+class DueDateScheduler:
+    """
+    Incremental overdue tracking and due-date reminders.
+
+    Args:
+        db: Storage to read open due tasks and task versions from
+        on_reminder: Called with (user_id, DUE or OVERDUE, task_id) as tasks reach their due date
+        interval: Seconds between checks for a date change
+        today: Returns the current date
+    """
+
+    def __init__(
+        self,
+        db,
+        on_reminder: Optional[Reminder] = None,
+        interval: float = 60.0,
+        today: Callable[[], date] = date.today
+    ):
+        self.db = db
+        self.on_reminder = on_reminder
+        self.interval = interval
+        self._clock = today
+        self.today = today()
+        self.ready = False
+        self._users: Dict[str, _UserDue] = {}
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    # State
+    def _push(self, day: date, kind: str, user_id: str, task_id: int, token: Tuple[date]):
+        heapq.heappush(self._heap, (day, next(self._sequence), kind, user_id, task_id, token))
+
+    def _track(self, user_id: str, state: _UserDue, task_id: int, due_date: Optional[date], is_open: bool):
+        """Replace what a user's state holds for one task"""
+        old = state.tasks.pop(task_id, None)
+        if old is not None and old[0] < self.today:
+            state.overdue -= 1
+        if not is_open or due_date is None:
+            return
+        token = (due_date,)
+        state.tasks[task_id] = token
+        if due_date < self.today:
+            state.overdue += 1
+            return
+        if due_date > self.today:
+            self._push(due_date, DUE, user_id, task_id, token)
+        self._push(due_date + timedelta(days=1), OVERDUE, user_id, task_id, token)
+
+    def _replace_user(self, user_id: str, version: int, rows: List[Tuple[int, Any]]) -> _UserDue:
+        state = _UserDue(version)
+        self._users[user_id] = state
+        for task_id, due_date in rows:
+            self._track(user_id, state, task_id, _parse_date(due_date), True)
+        return state
+
+    async def _load_user(self, user_id: str, version: int) -> _UserDue:
+        """Read one user's open due tasks from the index (version read first, so a racing write reads as stale)"""
+        rows = [(task_id, due_date) async for batch in self.db.iter_open_due_tasks(user_id)
+                for _, task_id, due_date, _ in batch]
+        return self._replace_user(user_id, version, rows)
+
+    async def rebuild(self):
+        """Load every user's open due tasks (users loaded on demand meanwhile keep their state)"""
+        loaded: Dict[str, Tuple[int, List[Tuple[int, Any]]]] = {}
+        async for batch in self.db.iter_open_due_tasks():
+            for user_id, task_id, due_date, version in batch:
+                loaded.setdefault(user_id, (version, []))[1].append((task_id, due_date))
+        for user_id, (version, rows) in loaded.items():
+            if user_id not in self._users:
+                self._replace_user(user_id, version, rows)
+        self.ready = True
+        metrics.SCHEDULER_HEAP.set(len(self._heap))
+        logger.info("Due-date scheduler tracking %d tasks for %d users",
+                    sum(len(rows) for _, rows in loaded.values()), len(loaded))
+
+    # Reads
+    async def overdue_count(self, user_id: str) -> int:
+        """Open tasks past their due date; one version lookup unless another worker changed the user's tasks"""
+        version = await self.db.get_task_version(user_id)
+        state = self._users.get(user_id)
+        if state is None or state.version != version:
+            state = await self._load_user(user_id, version)
+        return state.overdue
+
+    def next_due(self, user_id: str) -> Optional[date]:
+        """Earliest due date among a user's open tasks that are not overdue yet (from the last known state)"""
+        state = self._users.get(user_id)
+        if state is None:
+            return None
+        return min((token[0] for token in state.tasks.values() if token[0] >= self.today), default=None)
+
+    # Writes
+    def _written(self, user_id: str, task: Optional[Dict[str, Any]], task_id: int):
+        """Apply a successful write made through the observed storage"""
+        state = self._users.get(user_id)
+        if state is None:
+            return
+        state.version += 1
+        if task is None:
+            self._track(user_id, state, task_id, None, False)
+        else:
+            due_date = _parse_date(task["due_date"]) if task.get("due_date") else None
+            self._track(user_id, state, task_id, due_date, task.get("status") != "completed")
+
+    def observe(self, db):
+        """Wrap a storage instance's task writes so they update this scheduler in place; returns db"""
+        create_task, create_tasks = db.create_task, db.create_tasks
+        update_task, delete_task, move_task = db.update_task, db.delete_task, db.move_task
+
+        @functools.wraps(create_task)
+        async def observed_create_task(task_data, user_id):
+            result = await create_task(task_data, user_id)
+            if result["success"]:
+                self._written(user_id, result["data"], result["data"]["id"])
+            return result
+
+        @functools.wraps(create_tasks)
+        async def observed_create_tasks(tasks, user_id):
+            result = await create_tasks(tasks, user_id)
+            # Reloaded from the index on the next read
+            self._users.pop(user_id, None)
+            return result
+
+        @functools.wraps(update_task)
+        async def observed_update_task(task_id, task_data, user_id):
+            result = await update_task(task_id, task_data, user_id)
+            if result["success"]:
+                self._written(user_id, result["data"], task_id)
+            return result
+
+        @functools.wraps(delete_task)
+        async def observed_delete_task(task_id, user_id):
+            result = await delete_task(task_id, user_id)
+            if result["success"]:
+                self._written(user_id, None, task_id)
+                # Subtasks are deleted along with their parent, in the same write
+                state = self._users.get(user_id)
+                for subtask_id in result["data"].get("subtasks", ()) if state is not None else ():
+                    self._track(user_id, state, subtask_id, None, False)
+            return result
+
+        @functools.wraps(move_task)
+        async def observed_move_task(task_id, parent_id, user_id):
+            result = await move_task(task_id, parent_id, user_id)
+            if result["success"]:
+                self._written(user_id, result["data"], task_id)
+            return result
+
+        db.create_task, db.create_tasks = observed_create_task, observed_create_tasks
+        db.update_task, db.delete_task, db.move_task = observed_update_task, observed_delete_task, observed_move_task
+        return db
+
+    # Clock
+    def _remind(self, user_id: str, kind: str, task_id: int):
+        metrics.REMINDERS.inc((kind,))
+        if self.on_reminder is None:
+            return
+        try:
+            self.on_reminder(user_id, kind, task_id)
+        except Exception:
+            logger.exception("Reminder callback failed")
+
+    def advance(self, today: date) -> int:
+        """Move to a new date: fire due reminders and count newly overdue tasks; returns reminders sent"""
+        self.today = today
+        sent = 0
+        while self._heap and self._heap[0][0] <= today:
+            day, _, kind, user_id, task_id, token = heapq.heappop(self._heap)
+            state = self._users.get(user_id)
+            if state is None or state.tasks.get(task_id) is not token:
+                continue
+            if kind == OVERDUE:
+                state.overdue += 1
+            elif day < today:
+                # Its due day passed while the loop wasn't running; the overdue event covers it
+                continue
+            self._remind(user_id, kind, task_id)
+            sent += 1
+        self._compact()
+        return sent
+
+    def _compact(self):
+        """Drop stale heap entries once they outnumber the live ones"""
+        # A live task has at most two entries (due and overdue)
+        live = sum(len(state.tasks) for state in self._users.values())
+        if len(self._heap) > 4 * live + 1024:
+            self._heap = [
+                entry for entry in self._heap
+                if (state := self._users.get(entry[3])) is not None and state.tasks.get(entry[4]) is entry[5]
+            ]
+            heapq.heapify(self._heap)
+        metrics.SCHEDULER_HEAP.set(len(self._heap))
+
+    async def _run(self):
+        if not self.ready:
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Rebuilding the due-date scheduler failed")
+        while True:
+            await asyncio.sleep(self.interval)
+            today = self._clock()
+            if today != self.today:
+                self.advance(today)
+            else:
+                self._compact()
+
+    async def start(self):
+        """Rebuild from the index in the background (unless already rebuilt), then follow the date"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,77 @@
+"""
+Production launcher: one uvicorn worker per CPU core.
+
+    python server.py                          # all cores, port 8000
+    python server.py --workers 4 --port 8080
+
+Picks uvloop and httptools when they are installed (`pip install
+"uvicorn[standard]"`) and falls back to asyncio and h11 otherwise. Each worker
+warms up (storage connections, templates, in-memory state) before
+`GET /health/ready` answers 200, so a load balancer only sends traffic to
+warm workers. On SIGTERM or SIGINT a worker reports 503 on the readiness
+check, ends live-update streams (clients reconnect to another worker), stops
+accepting connections and waits up to `--graceful-timeout` seconds for
+in-flight requests before shutting down (see app.drain). `main.py` remains the
+single-process development server with auto-reload.
+
+With several workers, live updates and rate-limit buckets are shared
+through SQLite files next to the database unless PRIMO_LIVE_EVENTS_DB /
+PRIMO_RATE_LIMIT_DB already point elsewhere.
+"""
+import argparse
+import importlib.util
+import os
+from pathlib import Path
+
+import uvicorn
+
+def default_workers() -> int:
+    """CPU cores this process may run on (respects affinity and container CPU sets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+def fastest(module: str, preferred: str, fallback: str) -> str:
+    """`preferred` when `module` is importable, else `fallback`"""
+    return preferred if importlib.util.find_spec(module) is not None else fallback
+
+def share_between_workers():
+    """Point cross-worker state at shared files unless configured already"""
+    data_dir = Path(os.getenv("PRIMO_DB_PATH", "primo.db")).resolve().parent
+    os.environ.setdefault("PRIMO_LIVE_EVENTS_DB", str(data_dir / "primo_live.db"))
+    os.environ.setdefault("PRIMO_RATE_LIMIT_DB", str(data_dir / "primo_ratelimit.db"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Primo Task Manager with one worker per CPU core")
+    parser.add_argument("--host", default=os.getenv("PRIMO_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PRIMO_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PRIMO_WORKERS", "0")),
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--backlog", type=int, default=2048, help="listen socket backlog")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = args.workers or default_workers()
+    loop = fastest("uvloop", "uvloop", "asyncio")
+    http = fastest("httptools", "httptools", "h11")
+    if workers > 1:
+        share_between_workers()
+
+    print(f"🚀 Primo Task Manager on http://{args.host}:{args.port} ({workers} workers, {loop} loop, {http} parser)")
+    uvicorn.run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        log_level=args.log_level,
+    )
+
+if __name__ == "__main__":
+    main()
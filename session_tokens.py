@@ -0,0 +1,185 @@
+"""
+Stateless signed session tokens.
+
+With PRIMO_SESSION_KEYS set, logins issue tokens that carry the user's id and
+email and are verified with HMAC-SHA256 instead of a sessions-table lookup:
+
+    v1.<key id>.<base64url payload>.<base64url signature>
+
+The payload holds the user, an expiry and a random token id. Verifying costs
+a few microseconds and touches no storage, so any number of workers can
+accept a token issued by any other. The first configured key signs and every
+listed key verifies, so keys rotate by putting a new key first and dropping
+the old one once its tokens have expired.
+
+Logging out revokes the token id until the token would have expired anyway.
+Revocations are written to storage and every worker pulls new ones into an
+in-memory set in the background, so a logged-out token stops working
+everywhere within a refresh interval (immediately on the worker that
+handled the logout). Session ids from the sessions table keep working
+alongside signed tokens.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("primo.sessions")
+
+TOKEN_PREFIX = "v1."
+
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def is_signed_token(token: str) -> bool:
+    """Signed tokens vs session ids (token_urlsafe ids never contain a dot)"""
+    return token.startswith(TOKEN_PREFIX)
+
+def parse_keys(spec: str) -> List[Tuple[str, bytes]]:
+    """Keys from "id:secret,id:secret" (first one signs); raises ValueError"""
+    keys = []
+    for item in spec.split(","):
+        key_id, _, secret = item.strip().partition(":")
+        if not key_id or not secret or "." in key_id:
+            raise ValueError("PRIMO_SESSION_KEYS entries look like <key id>:<secret>")
+        if len(secret) < 16:
+            raise ValueError(f"Session key {key_id!r} is too short (use at least 16 characters)")
+        keys.append((key_id, secret.encode()))
+    return keys
+
+class RevocationList:
+    """
+    Token ids revoked before they expire, mirrored from storage.
+
+    Args:
+        db: Storage with revoke_session_token / get_revoked_session_tokens
+        refresh: Seconds between pulls of other workers' revocations
+    """
+
+    def __init__(self, db, refresh: float = 5.0):
+        self.db = db
+        self.refresh = refresh
+        self._revoked: Dict[str, float] = {}
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, token_id: str) -> bool:
+        return token_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    async def revoke(self, token_id: str, expires_at: float):
+        """Revoke a token id here right away and in storage for the other workers"""
+        self._revoked[token_id] = expires_at
+        await self.db.revoke_session_token(token_id, expires_at)
+
+    async def sync(self):
+        """Pull revocations added since the last sync and forget expired ones"""
+        for row_id, token_id, expires_at in await self.db.get_revoked_session_tokens(self._last_id):
+            self._revoked[token_id] = expires_at
+            self._last_id = max(self._last_id, row_id)
+        now = time.time()
+        for token_id in [token_id for token_id, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[token_id]
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Syncing session revocations failed")
+            await asyncio.sleep(self.refresh)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+class SessionSigner:
+    """
+    Issues and verifies signed session tokens.
+
+    Args:
+        keys: (key id, secret) pairs; the first signs, all verify
+        revocations: RevocationList consulted on every verify
+        max_age: Seconds a token stays valid
+    """
+
+    def __init__(self, keys: List[Tuple[str, bytes]], revocations: RevocationList, max_age: int = DEFAULT_MAX_AGE):
+        if not keys:
+            raise ValueError("At least one session key is needed")
+        self.keys = dict(keys)
+        self.signing_key_id = keys[0][0]
+        self.revocations = revocations
+        self.max_age = max_age
+
+    @classmethod
+    def from_env(cls, db) -> Optional["SessionSigner"]:
+        """Build a signer from PRIMO_SESSION_* environment variables, or None when signed sessions are off"""
+        spec = os.getenv("PRIMO_SESSION_KEYS")
+        if not spec:
+            return None
+        return cls(
+            parse_keys(spec),
+            RevocationList(db, refresh=float(os.getenv("PRIMO_SESSION_REVOCATION_REFRESH", "5"))),
+            max_age=int(os.getenv("PRIMO_SESSION_MAX_AGE", str(DEFAULT_MAX_AGE)))
+        )
+
+    def _signature(self, key: bytes, signed: str) -> str:
+        return _b64encode(hmac.new(key, signed.encode(), hashlib.sha256).digest())
+
+    def issue(self, user: Dict[str, Any]) -> str:
+        """Token for a user dict with id and email"""
+        claims = {
+            "sub": user["id"],
+            "email": user["email"],
+            "exp": int(time.time()) + self.max_age,
+            "jti": _b64encode(secrets.token_bytes(12)),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signed = f"{TOKEN_PREFIX}{self.signing_key_id}.{payload}"
+        return f"{signed}.{self._signature(self.keys[self.signing_key_id], signed)}"
+
+    def claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a valid, unexpired, unrevoked token, else None"""
+        try:
+            signed, _, signature = token.rpartition(".")
+            key_id, _, payload = signed[len(TOKEN_PREFIX):].partition(".")
+            key = self.keys.get(key_id)
+            if key is None or not hmac.compare_digest(signature, self._signature(key, signed)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(claims, dict) or claims.get("exp", 0) <= time.time() or claims.get("jti") in self.revocations:
+            return None
+        return claims
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """The user (id, email) a token was issued to, or None"""
+        claims = self.claims(token)
+        if claims is None:
+            return None
+        return {"id": claims["sub"], "email": claims["email"]}
+
+    async def revoke(self, token: str):
+        """Revoke a valid token until its expiry (logout); invalid tokens are ignored"""
+        claims = self.claims(token)
+        if claims is not None:
+            await self.revocations.revoke(claims["jti"], claims["exp"])
@@ -0,0 +1,275 @@
+"""
+Per-user database sharding.
+
+Users, and the `user_shards` directory that maps each user to a shard, stay
+in the main database file. Each user's tasks live in one of N shard files
+(`primo.shard0.db`, `primo.shard1.db`, ...) picked by a stable hash of the user
+id, so writers for different users mostly take different SQLite write locks.
+
+Every shard hands out task ids from its own range (shard k starts above
+(k + 1) * SHARD_ID_SPAN), so ids stay unique when users move between shards.
+
+Maintenance (run while the app is stopped; workers cache the directory):
+
+    python -m sharding status   --db primo.db --shards 4
+    python -m sharding migrate  --db primo.db --shards 4   # move tasks out of the unsharded file
+    python -m sharding rebalance --db primo.db --shards 8  # after changing the shard count
+"""
+import argparse
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from database import ConnectionPool, SQLiteDatabase, create_task_schema
+from query_profiler import QueryProfiler
+from rollups import ROLLUP_COLUMNS
+
+SHARD_ID_SPAN = 10 ** 12
+MOVE_BATCH_SIZE = 5000
+
+# Explicit column list so copies between files don't depend on column order
+_COPY_COLUMNS = "id, title, description, due_date, priority, status, user_id, created_at, updated_at, parent_id"
+_COPY_VALUES = ", ".join("?" for _ in _COPY_COLUMNS.split(", "))
+_ROLLUP_COPY_COLUMNS = ", ".join(("user_id", "day") + ROLLUP_COLUMNS)
+
+def shard_for(user_id: str, shard_count: int) -> int:
+    """Home shard of a user id (stable across processes, unlike hash())"""
+    digest = hashlib.sha1(user_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+class ShardedSQLiteDatabase(SQLiteDatabase):
+    """
+    SQLiteDatabase that keeps each user's tasks in one of `shard_count` files.
+
+    Placement is recorded in the `user_shards` directory table on first use
+    and cached in memory; the pool keeps idle connections per shard file.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "primo.db",
+        shard_count: int = 4,
+        shard_dir: Optional[str] = None,
+        profiler: Optional[QueryProfiler] = None,
+        pool: Optional[ConnectionPool] = None
+    ):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.shard_count = shard_count
+        self.shard_dir = Path(shard_dir) if shard_dir else Path(db_path).parent
+        self._directory: Dict[str, int] = {}
+        self._directory_lock = threading.Lock()
+        super().__init__(db_path, profiler=profiler, pool=pool)
+
+    def shard_path(self, shard: int) -> str:
+        """File name of a shard"""
+        return str(self.shard_dir / f"{Path(self.db_path).stem}.shard{shard}.db")
+
+    def init_database(self):
+        """Initialize the main file, the shard directory and every shard file"""
+        super().init_database()
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_shards (
+                    user_id TEXT PRIMARY KEY,
+                    shard INTEGER NOT NULL
+                )
+            ''')
+            conn.commit()
+
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        for shard in range(self.shard_count):
+            self._init_shard(shard)
+
+        print(f"✅ {self.shard_count} task shards ready in {self.shard_dir}")
+
+    def _init_shard(self, shard: int):
+        with self._connect(self.shard_path(shard)) as conn:
+            create_task_schema(conn)
+            # Start this shard's AUTOINCREMENT counter at the bottom of its id range
+            conn.execute(
+                '''INSERT INTO sqlite_sequence (name, seq)
+                   SELECT 'tasks', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')''',
+                ((shard + 1) * SHARD_ID_SPAN,)
+            )
+            conn.commit()
+
+    def shard_of(self, user_id: str) -> int:
+        """Shard holding a user's tasks, placing new users by hash"""
+        return self._shard_of(user_id)
+
+    # Task methods route through the private lookup so instrumented timings aren't counted twice
+    def _shard_of(self, user_id: str) -> int:
+        shard = self._directory.get(user_id)
+        if shard is not None:
+            return shard
+
+        with self._directory_lock:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR IGNORE INTO user_shards (user_id, shard) VALUES (?, ?)',
+                    (user_id, shard_for(user_id, self.shard_count))
+                )
+                shard = conn.execute(
+                    'SELECT shard FROM user_shards WHERE user_id = ?',
+                    (user_id,)
+                ).fetchone()[0]
+                conn.commit()
+            self._directory[user_id] = shard
+        return shard
+
+    def _task_db_path(self, user_id: str) -> str:
+        return self.shard_path(self._shard_of(user_id))
+
+    def move_user(self, user_id: str, source_path: str, target: int) -> int:
+        """
+        Move a user's tasks from `source_path` into shard `target`
+
+        Rows (archived ones too) are copied with their ids, the directory is
+        switched, then the source rows are deleted, so an interrupted move can
+        simply be re-run.
+
+        Returns:
+            Number of tasks moved (not counting archived ones)
+        """
+        moved = 0
+        with self._connect(source_path) as source, self._connect(self.shard_path(target)) as destination:
+            cursor = source.execute(
+                f'SELECT {_COPY_COLUMNS} FROM tasks WHERE user_id = ?',
+                (user_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(MOVE_BATCH_SIZE)
+                if not rows:
+                    break
+                destination.executemany(
+                    f'INSERT OR REPLACE INTO tasks ({_COPY_COLUMNS}) VALUES ({_COPY_VALUES})',
+                    rows
+                )
+                moved += len(rows)
+            archived = source.execute(
+                f'SELECT {_COPY_COLUMNS}, archived_at FROM tasks_archive WHERE user_id = ?',
+                (user_id,)
+            ).fetchall()
+            destination.executemany(
+                f'INSERT OR REPLACE INTO tasks_archive ({_COPY_COLUMNS}, archived_at) '
+                f'VALUES ({_COPY_VALUES}, ?)',
+                archived
+            )
+            # Subtask closure rows and progress counts refer to the same (kept) ids
+            destination.executemany(
+                'INSERT OR REPLACE INTO task_tree (user_id, ancestor_id, descendant_id, depth) VALUES (?, ?, ?, ?)',
+                source.execute(
+                    'SELECT user_id, ancestor_id, descendant_id, depth FROM task_tree WHERE user_id = ?',
+                    (user_id,)
+                ).fetchall()
+            )
+            destination.executemany(
+                'INSERT OR REPLACE INTO task_progress (task_id, user_id, total, completed) VALUES (?, ?, ?, ?)',
+                source.execute(
+                    'SELECT task_id, user_id, total, completed FROM task_progress WHERE user_id = ?',
+                    (user_id,)
+                ).fetchall()
+            )
+            # Keep the task version increasing so cached copies of the user's tasks are refreshed
+            version = source.execute(
+                'SELECT version FROM task_versions WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+            destination.execute(
+                'INSERT OR REPLACE INTO task_versions (user_id, version) VALUES (?, ?)',
+                (user_id, (version[0] if version else 0) + 1)
+            )
+            rollups = source.execute(
+                f'SELECT {_ROLLUP_COPY_COLUMNS} FROM task_daily_stats WHERE user_id = ?',
+                (user_id,)
+            ).fetchall()
+            destination.executemany(
+                f'INSERT OR REPLACE INTO task_daily_stats ({_ROLLUP_COPY_COLUMNS}) '
+                f'VALUES ({", ".join("?" for _ in _ROLLUP_COPY_COLUMNS.split(", "))})',
+                rollups
+            )
+            destination.commit()
+
+        with self._directory_lock:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO user_shards (user_id, shard) VALUES (?, ?)',
+                    (user_id, target)
+                )
+                conn.commit()
+            self._directory[user_id] = target
+
+        with self._connect(source_path) as source:
+            source.execute('DELETE FROM tasks WHERE user_id = ?', (user_id,))
+            source.execute('DELETE FROM tasks_archive WHERE user_id = ?', (user_id,))
+            source.execute('DELETE FROM task_tree WHERE user_id = ?', (user_id,))
+            source.execute('DELETE FROM task_progress WHERE user_id = ?', (user_id,))
+            source.execute('DELETE FROM task_daily_stats WHERE user_id = ?', (user_id,))
+            source.commit()
+        return moved
+
+    def task_db_paths(self) -> List[str]:
+        """Every shard file"""
+        return [self.shard_path(shard) for shard in range(self.shard_count)]
+
+    def shard_stats(self) -> List[Dict[str, int]]:
+        """Users, tasks and archived tasks per shard"""
+        with self._connect() as conn:
+            users = dict(conn.execute('SELECT shard, COUNT(*) FROM user_shards GROUP BY shard').fetchall())
+        stats = []
+        for shard in range(self.shard_count):
+            with self._connect(self.shard_path(shard)) as conn:
+                tasks = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+                archived = conn.execute('SELECT COUNT(*) FROM tasks_archive').fetchone()[0]
+            stats.append({"shard": shard, "users": users.get(shard, 0), "tasks": tasks, "archived": archived})
+        return stats
+
+def migrate(db: ShardedSQLiteDatabase) -> Dict[str, int]:
+    """Move tasks still stored in the main (unsharded) file into their users' shards"""
+    with db._connect() as conn:
+        user_ids = [row[0] for row in conn.execute('SELECT user_id FROM tasks UNION SELECT user_id FROM tasks_archive')]
+
+    summary = {"users": 0, "tasks": 0}
+    for user_id in user_ids:
+        summary["tasks"] += db.move_user(user_id, db.db_path, db.shard_of(user_id))
+        summary["users"] += 1
+    return summary
+
+def rebalance(db: ShardedSQLiteDatabase) -> Dict[str, int]:
+    """Move users whose recorded shard differs from their hash placement under the current shard count"""
+    with db._connect() as conn:
+        placements = conn.execute('SELECT user_id, shard FROM user_shards').fetchall()
+
+    summary = {"users": 0, "tasks": 0}
+    for user_id, shard in placements:
+        target = shard_for(user_id, db.shard_count)
+        if target == shard:
+            continue
+        summary["tasks"] += db.move_user(user_id, db.shard_path(shard), target)
+        summary["users"] += 1
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, migrate and rebalance task shards")
+    parser.add_argument("command", choices=["status", "migrate", "rebalance"])
+    parser.add_argument("--db", default="primo.db", help="main database file (users and shard directory)")
+    parser.add_argument("--shards", type=int, required=True, help="shard count")
+    parser.add_argument("--shard-dir", help="directory for shard files (default: next to --db)")
+    args = parser.parse_args()
+
+    db = ShardedSQLiteDatabase(args.db, shard_count=args.shards, shard_dir=args.shard_dir)
+    if args.command == "migrate":
+        summary = migrate(db)
+        print(f"📦 Moved {summary['tasks']} tasks for {summary['users']} users into shards")
+    elif args.command == "rebalance":
+        summary = rebalance(db)
+        print(f"🔀 Moved {summary['tasks']} tasks for {summary['users']} users")
+
+    for row in db.shard_stats():
+        print(f"  shard {row['shard']}: {row['users']} users, {row['tasks']} tasks, {row['archived']} archived ({db.shard_path(row['shard'])})")
+    db.pool.close()
+
+if __name__ == "__main__":
+    main()
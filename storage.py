@@ -0,0 +1,178 @@
+"""
+Storage interface used by the routes.
+
+`SQLiteDatabase` (database.py, optionally sharded) and `AsyncSQLStorage`
+(sql_storage.py, any SQLAlchemy async URL such as PostgreSQL) implement it.
+Route code only calls these methods, so the backend is picked at startup.
+"""
+import hashlib
+import secrets
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from models import TaskCreate, TaskFilter, TaskUpdate, UserCreate, UserLogin
+
+class Storage(ABC):
+    """
+    Interface for users, sessions and tasks.
+
+    Writes return `{"success": bool, "data" | "error": ...}`. Task reads return
+    TaskRecord rows (see database.py); reports read the REPORT_COLUMNS
+    projection through `get_tasks`. Every method without a default is
+    abstract, so a backend missing one fails when it is constructed.
+    """
+
+    profiler = None
+
+    def _hash_password(self, password: str) -> str:
+        """Hash a password with salt"""
+        salt = secrets.token_hex(16)
+        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
+        return salt + password_hash.hex()
+
+    def _verify_password(self, password: str, password_hash: str) -> bool:
+        """Verify a password against its hash"""
+        salt = password_hash[:32]  # First 32 chars are salt
+        stored_hash = password_hash[32:]  # Rest is the hash
+        password_hash_check = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
+        return password_hash_check.hex() == stored_hash
+
+    def _generate_user_id(self) -> str:
+        """Generate a unique user ID"""
+        return secrets.token_urlsafe(16)
+
+    # Users
+    @abstractmethod
+    async def sign_up(self, user_data: UserCreate) -> Dict[str, Any]:
+        """Register a new user"""
+
+    @abstractmethod
+    async def sign_in(self, user_data: UserLogin) -> Dict[str, Any]:
+        """Check credentials; data holds the user on success"""
+
+    @abstractmethod
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user (id, email, created_at) by ID"""
+
+    # Sessions
+    @abstractmethod
+    async def create_session(self, user_id: str) -> str:
+        """Start a session for a user; returns the session id"""
+
+    @abstractmethod
+    async def get_session_user(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """User owning a session, or None if the session doesn't exist"""
+
+    @abstractmethod
+    async def delete_session(self, session_id: str):
+        """End a session"""
+
+    @abstractmethod
+    async def revoke_session_token(self, token_id: str, expires_at: float):
+        """Record that a signed session token (by its token id) is revoked until expires_at"""
+
+    @abstractmethod
+    async def get_revoked_session_tokens(self, after_id: int = 0) -> List[Tuple[int, str, float]]:
+        """Unexpired revocations recorded after `after_id`, as (id, token_id, expires_at)"""
+
+    # Tasks
+    @abstractmethod
+    async def create_task(self, task_data: TaskCreate, user_id: str) -> Dict[str, Any]:
+        """Create a task; data holds the new row"""
+
+    @abstractmethod
+    async def create_tasks(self, tasks: List[TaskCreate], user_id: str) -> Dict[str, Any]:
+        """Create several tasks in one transaction"""
+
+    @abstractmethod
+    async def get_tasks(
+        self,
+        user_id: str,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[TaskFilter] = None
+    ) -> list:
+        """Get a user's tasks newest first, optionally only some columns and matching filters"""
+
+    @abstractmethod
+    def iter_tasks(
+        self,
+        user_id: str,
+        columns: Sequence[str],
+        filters: Optional[TaskFilter] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[tuple]]:
+        """Async iterator over batches of raw row tuples (in `columns` order), streamed from the database"""
+
+    @abstractmethod
+    async def get_task_page(
+        self,
+        user_id: str,
+        columns: Sequence[str],
+        filters: Optional[TaskFilter] = None,
+        limit: int = 100,
+        after: Optional[Tuple[Any, int]] = None
+    ) -> List[tuple]:
+        """Up to `limit` raw row tuples newest first, after the (created_at, id) of the previous page's last row"""
+
+    @abstractmethod
+    async def get_recent_task_summaries(self, user_id: str, limit: int) -> List[Tuple[str, str]]:
+        """Get (title, priority) of a user's most recent tasks"""
+
+    @abstractmethod
+    async def get_task(self, task_id: int, user_id: str):
+        """Get one task, or None"""
+
+    @abstractmethod
+    async def get_tasks_by_ids(self, task_ids: List[int], user_id: str) -> List[Dict[str, Any]]:
+        """Get several tasks in the order requested"""
+
+    @abstractmethod
+    async def update_task(self, task_id: int, task_data: TaskUpdate, user_id: str) -> Dict[str, Any]:
+        """Update the fields set on task_data"""
+
+    @abstractmethod
+    async def delete_task(self, task_id: int, user_id: str) -> Dict[str, Any]:
+        """Delete a task and its subtasks ({"deleted": id, "subtasks": [ids]})"""
+
+    @abstractmethod
+    async def move_task(self, task_id: int, parent_id: Optional[int], user_id: str) -> Dict[str, Any]:
+        """Move a task and its subtree under parent_id (None: top level) in one transaction"""
+
+    @abstractmethod
+    async def get_subtree(self, task_id: int, user_id: str, columns: Optional[Sequence[str]] = None):
+        """A task and all its descendants, ordered by depth then creation (empty if the task doesn't exist)"""
+
+    @abstractmethod
+    async def get_task_progress(self, user_id: str) -> Dict[int, Tuple[int, int]]:
+        """(completed, total) descendant counts for each task with subtasks"""
+
+    @abstractmethod
+    async def get_task_version(self, user_id: str) -> int:
+        """Counter bumped by every task write for the user (0 if never written)"""
+
+    @abstractmethod
+    def iter_open_due_tasks(
+        self,
+        user_id: Optional[str] = None,
+        batch_size: int = 5000
+    ) -> AsyncIterator[List[Tuple[str, int, Any, int]]]:
+        """Batches of (user_id, task id, due_date, task version) for open tasks with a due date, all users if none given"""
+
+    @abstractmethod
+    async def archive_completed_tasks(self, before: datetime, limit: int = 500) -> int:
+        """Move up to `limit` completed tasks last updated before `before` (UTC) into the archive; returns how many moved"""
+
+    @abstractmethod
+    async def get_task_table_sizes(self) -> Dict[str, int]:
+        """Row counts of the hot tasks table and the archive ({"tasks": n, "archive": n})"""
+
+    @abstractmethod
+    async def get_daily_stats(self, user_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """Daily rollup rows (see rollups.py) for start..end, one per day up to today"""
+
+    async def warm_up(self):
+        """Open connections and load the schema ahead of the first request"""
+
+    async def close(self):
+        """Release connections held by the backend"""
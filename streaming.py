@@ -0,0 +1,109 @@
+"""
+Streamed HTML rendering for task lists.
+
+`TemplateStreamer` renders a page with Jinja's async `generate_async()`
+while its rows are still being read: they come from `Storage.iter_tasks` in
+cursor batches, and each batch is rendered (synchronously, through the row
+partial) into one chunk as it arrives. The response starts as soon as the
+first batch is in, so the browser paints the page header and first tasks
+while later rows are still being fetched, and neither the row list nor the
+rendered page is ever held in memory whole.
+
+Streamed templates get `task_rows` (an async iterator of rendered row
+batches) and `has_tasks` instead of `tasks`.
+"""
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+import metrics
+from database import TaskRecord, _projection
+
+# Rows per cursor batch; the first batch is what the first byte waits for
+STREAM_BATCH_SIZE = 200
+
+# Rendered output is sent in chunks of at least this many characters
+STREAM_CHUNK_SIZE = 16 * 1024
+
+async def task_records(batches: AsyncIterator[List[tuple]], columns: Sequence[str]) -> AsyncIterator[List[TaskRecord]]:
+    """Wrap iter_tasks row batches as TaskRecords"""
+    _, index = _projection(columns)
+    async for rows in batches:
+        yield [TaskRecord(row, index) for row in rows]
+
+class TemplateStreamer:
+    """
+    Renders templates from the app's Jinja environment as streamed responses.
+
+    Args:
+        templates: The app's Jinja2Templates; its loader, globals and filters are shared
+        row_template: Partial rendering one `task`
+        chunk_size: Characters of output buffered before each send
+    """
+
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        row_template: str = "partials/task_row.html",
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ):
+        self.env = templates.env.overlay(enable_async=True)
+        # Rows render synchronously a batch at a time: going through the async
+        # renderer fragment by fragment costs more than the rows themselves
+        self.rows = templates.env.from_string(
+            f'{{% for task in tasks %}}{{% include "{row_template}" %}}\n{{% endfor %}}'
+        )
+        self.chunk_size = chunk_size
+
+    async def _rendered_rows(
+        self,
+        first: Optional[List[TaskRecord]],
+        batches: AsyncIterator[List[TaskRecord]],
+        context: Dict[str, Any]
+    ) -> AsyncIterator[Markup]:
+        if first is None:
+            return
+        yield Markup(self.rows.render(context, tasks=first))
+        async for batch in batches:
+            yield Markup(self.rows.render(context, tasks=batch))
+
+    async def _chunks(self, name: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        buffer: List[str] = []
+        size = 0
+        try:
+            async for text in self.env.get_template(name).generate_async(context):
+                buffer.append(text)
+                size += len(text)
+                if size >= self.chunk_size:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+            if buffer:
+                yield "".join(buffer)
+        finally:
+            # Includes time spent waiting on the row cursor
+            metrics.TEMPLATE_RENDER.observe(time.perf_counter() - start, (f"{name} (streamed)",))
+
+    async def response(
+        self,
+        name: str,
+        context: Dict[str, Any],
+        batches: AsyncIterator[List[TaskRecord]]
+    ) -> StreamingResponse:
+        """
+        Stream `name` rendered with `context` plus `task_rows`/`has_tasks`
+
+        Waits for the first batch only, so `has_tasks` is known before the
+        header (which shows or hides list actions) is rendered.
+        """
+        first = await anext(batches, None)
+        context = {
+            **context,
+            "task_rows": self._rendered_rows(first, batches, context),
+            "has_tasks": first is not None,
+        }
+        return StreamingResponse(self._chunks(name, context), media_type="text/html")
@@ -0,0 +1,306 @@
+"""
+Write-through per-user task cache.
+
+`CachedTaskStorage` wraps a Storage backend and keeps each active user's
+full task list in memory. Writes made through this worker update the cached
+list in place; reads compare the cached version with the user's version
+counter in the database (bumped by every task write, in any worker) and
+reload when they differ. That check runs at most once per `check_interval`
+per user, so writes from other workers show up within that interval. A
+`get_task` for a user without a current list is a single-row read. Memory is
+bounded by an estimate of the cached rows' size, evicting the least recently
+used users first.
+"""
+import sys
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import metrics
+from database import TASK_COLUMNS, TaskRecord, _TASK_INDEX, _projection
+from models import TaskCreate, TaskFilter, TaskUpdate, UserCreate, UserLogin
+from storage import Storage
+
+# Per-row overhead beyond the values themselves: the TaskRecord object and its list slot
+_RECORD_OVERHEAD = sys.getsizeof(TaskRecord((), _TASK_INDEX)) + 8
+
+def _record_size(record: TaskRecord) -> int:
+    """Approximate bytes held by a cached task row"""
+    values = record._values
+    return _RECORD_OVERHEAD + sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+def _record_from_row(row: Dict[str, Any]) -> TaskRecord:
+    return TaskRecord(tuple(row[name] for name in TASK_COLUMNS), _TASK_INDEX)
+
+class _CachedTasks:
+    """One user's tasks, newest first, the version they reflect and when that was last confirmed"""
+
+    __slots__ = ("version", "records", "size", "checked_at")
+
+    def __init__(self, version: int, records: List[TaskRecord]):
+        self.version = version
+        self.records = records
+        self.size = sum(_record_size(record) for record in records)
+        self.checked_at = time.monotonic()
+
+class CachedTaskStorage(Storage):
+    """
+    Storage wrapper serving get_tasks/get_task/iter_tasks from memory for active users.
+
+    Args:
+        inner: Backend that owns the data (and the version counters)
+        max_bytes: Approximate memory budget for cached rows across all users
+        check_interval: Seconds a confirmed version is trusted before the database is asked again
+    """
+
+    def __init__(self, inner: Storage, max_bytes: int = 64 * 1024 * 1024, check_interval: float = 0.1):
+        self.inner = inner
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.profiler = inner.profiler
+        self._entries: "OrderedDict[str, _CachedTasks]" = OrderedDict()
+        self._size = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # Backend extras (pool, shard_of, test_connection, ...)
+        return getattr(self.inner, name)
+
+    def stats(self) -> Dict[str, int]:
+        """Cached users and approximate bytes held"""
+        return {"users": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
+
+    def _store(self, user_id: str, entry: _CachedTasks):
+        self._discard(user_id)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[user_id] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def _discard(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def _resize(self, entry: _CachedTasks, delta: int):
+        entry.size += delta
+        self._size += delta
+
+    async def _fresh(self, user_id: str) -> Optional[_CachedTasks]:
+        """The user's cached entry if it is still current (a stale one is dropped), counted as a hit or miss"""
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry.checked_at >= self.check_interval:
+            if entry.version == await self.inner.get_task_version(user_id):
+                entry.checked_at = time.monotonic()
+            else:
+                self._discard(user_id)
+                entry = None
+        metrics.record_cache("tasks", entry is not None)
+        if entry is not None:
+            self._entries.move_to_end(user_id)
+        return entry
+
+    async def _current(self, user_id: str) -> List[TaskRecord]:
+        """The user's tasks, from memory when the cached version is still current"""
+        entry = await self._fresh(user_id)
+        if entry is not None:
+            return entry.records
+
+        # Version is read before the rows: a write landing in between leaves
+        # the entry looking stale, never the other way round
+        version = await self.inner.get_task_version(user_id)
+        records = await self.inner.get_tasks(user_id)
+        self._store(user_id, _CachedTasks(version, records))
+        return records
+
+    # Users and sessions pass straight through
+    async def sign_up(self, user_data: UserCreate) -> Dict[str, Any]:
+        return await self.inner.sign_up(user_data)
+
+    async def sign_in(self, user_data: UserLogin) -> Dict[str, Any]:
+        return await self.inner.sign_in(user_data)
+
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.inner.get_user_by_id(user_id)
+
+    async def create_session(self, user_id: str) -> str:
+        return await self.inner.create_session(user_id)
+
+    async def get_session_user(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self.inner.get_session_user(session_id)
+
+    async def delete_session(self, session_id: str):
+        await self.inner.delete_session(session_id)
+
+    async def revoke_session_token(self, token_id: str, expires_at: float):
+        await self.inner.revoke_session_token(token_id, expires_at)
+
+    async def get_revoked_session_tokens(self, after_id: int = 0) -> List[Tuple[int, str, float]]:
+        return await self.inner.get_revoked_session_tokens(after_id)
+
+    # Tasks
+    async def get_tasks(
+        self,
+        user_id: str,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[TaskFilter] = None
+    ) -> List[TaskRecord]:
+        """Get all tasks for a user; cached rows carry every column, a superset of any projection"""
+        _projection(columns)
+        if filters is not None and filters.archived:
+            # Only hot rows are cached
+            return await self.inner.get_tasks(user_id, columns, filters)
+        records = await self._current(user_id)
+        if filters is None or filters.is_empty():
+            return list(records)
+        return [record for record in records if filters.matches(record)]
+
+    async def iter_tasks(
+        self,
+        user_id: str,
+        columns: Sequence[str] = TASK_COLUMNS,
+        filters: Optional[TaskFilter] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[tuple]]:
+        """Batches from the cached list when it is current, otherwise straight from the backend's cursor (without caching)"""
+        _, index = _projection(columns)
+        if filters is not None and filters.archived:
+            async for rows in self.inner.iter_tasks(user_id, columns, filters, batch_size):
+                yield rows
+            return
+        entry = await self._fresh(user_id)
+        if entry is None:
+            async for rows in self.inner.iter_tasks(user_id, columns, filters, batch_size):
+                yield rows
+            return
+
+        # Snapshot: writes made while the stream is consumed edit entry.records in place
+        records = list(entry.records)
+        if filters is not None and not filters.is_empty():
+            records = [record for record in records if filters.matches(record)]
+        positions = [_TASK_INDEX[name] for name in index]
+        for start in range(0, len(records), batch_size):
+            yield [tuple(record._values[position] for position in positions)
+                   for record in records[start:start + batch_size]]
+
+    async def get_task_page(
+        self,
+        user_id: str,
+        columns: Sequence[str],
+        filters: Optional[TaskFilter] = None,
+        limit: int = 100,
+        after: Optional[Tuple[Any, int]] = None
+    ) -> List[tuple]:
+        """Pages are index range reads; they go straight to the backend"""
+        return await self.inner.get_task_page(user_id, columns, filters, limit, after)
+
+    async def get_task(self, task_id: int, user_id: str) -> Optional[TaskRecord]:
+        """Get a specific task from the cached list when it is current, otherwise (or when archived) with a single-row read"""
+        entry = await self._fresh(user_id)
+        if entry is not None:
+            for record in entry.records:
+                if record.id == task_id:
+                    return record
+        return await self.inner.get_task(task_id, user_id)
+
+    async def get_recent_task_summaries(self, user_id: str, limit: int) -> List[Tuple[str, str]]:
+        return await self.inner.get_recent_task_summaries(user_id, limit)
+
+    async def get_tasks_by_ids(self, task_ids: List[int], user_id: str) -> List[Dict[str, Any]]:
+        return await self.inner.get_tasks_by_ids(task_ids, user_id)
+
+    async def get_task_version(self, user_id: str) -> int:
+        return await self.inner.get_task_version(user_id)
+
+    async def get_daily_stats(self, user_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+        return await self.inner.get_daily_stats(user_id, start, end)
+
+    def iter_open_due_tasks(self, user_id: Optional[str] = None, batch_size: int = 5000) -> AsyncIterator[list]:
+        return self.inner.iter_open_due_tasks(user_id, batch_size)
+
+    async def archive_completed_tasks(self, before: datetime, limit: int = 500) -> int:
+        """Archive in the backend; it bumps the owners' versions, so their cached lists reload"""
+        return await self.inner.archive_completed_tasks(before, limit)
+
+    async def get_task_table_sizes(self) -> Dict[str, int]:
+        return await self.inner.get_task_table_sizes()
+
+    async def create_task(self, task_data: TaskCreate, user_id: str) -> Dict[str, Any]:
+        """Create a task and prepend it to the cached list"""
+        result = await self.inner.create_task(task_data, user_id)
+        entry = self._entries.get(user_id)
+        if result["success"] and entry is not None:
+            record = _record_from_row(result["data"])
+            entry.records.insert(0, record)
+            entry.version += 1
+            self._resize(entry, _record_size(record))
+        return result
+
+    async def create_tasks(self, tasks: List[TaskCreate], user_id: str) -> Dict[str, Any]:
+        """Create several tasks; the next read reloads the list"""
+        result = await self.inner.create_tasks(tasks, user_id)
+        self._discard(user_id)
+        return result
+
+    def _replace(self, user_id: str, task_id: int, row: Dict[str, Any]):
+        """Swap a written task's cached row for the new one (or drop the list if it isn't there)"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        record = _record_from_row(row)
+        for position, cached in enumerate(entry.records):
+            if cached.id == task_id:
+                entry.records[position] = record
+                self._resize(entry, _record_size(record) - _record_size(cached))
+                entry.version += 1
+                break
+        else:
+            self._discard(user_id)
+
+    async def update_task(self, task_id: int, task_data: TaskUpdate, user_id: str) -> Dict[str, Any]:
+        """Update a task and replace its cached row"""
+        result = await self.inner.update_task(task_id, task_data, user_id)
+        if result["success"]:
+            self._replace(user_id, task_id, result["data"])
+        return result
+
+    async def move_task(self, task_id: int, parent_id: Optional[int], user_id: str) -> Dict[str, Any]:
+        """Move a task's subtree; only the moved task's own row (its parent_id) changes"""
+        result = await self.inner.move_task(task_id, parent_id, user_id)
+        if result["success"]:
+            self._replace(user_id, task_id, result["data"])
+        return result
+
+    async def get_subtree(self, task_id: int, user_id: str, columns: Optional[Sequence[str]] = None) -> List[TaskRecord]:
+        return await self.inner.get_subtree(task_id, user_id, columns)
+
+    async def get_task_progress(self, user_id: str) -> Dict[int, Tuple[int, int]]:
+        return await self.inner.get_task_progress(user_id)
+
+    async def delete_task(self, task_id: int, user_id: str) -> Dict[str, Any]:
+        """Delete a task and drop its cached row (the whole list when subtasks went with it)"""
+        result = await self.inner.delete_task(task_id, user_id)
+        entry = self._entries.get(user_id)
+        if result["success"] and result["data"].get("subtasks"):
+            self._discard(user_id)
+        elif result["success"] and entry is not None:
+            for position, cached in enumerate(entry.records):
+                if cached.id == task_id:
+                    del entry.records[position]
+                    self._resize(entry, -_record_size(cached))
+                    entry.version += 1
+                    break
+            else:
+                self._discard(user_id)
+        return result
+
+    async def warm_up(self):
+        await self.inner.warm_up()
+
+    async def close(self):
+        self._entries.clear()
+        self._size = 0
+        await self.inner.close()
@@ -0,0 +1,68 @@
+"""
+Tests for the per-user AI context: incremental updates against a reload,
+and invalidation, expiry and eviction of cached users.
+"""
+import random
+
+import pytest
+
+from ai_context import AIContextStore
+
+pytestmark = pytest.mark.anyio
+
+class History:
+    """Storage stand-in holding each user's (title, priority) pairs, newest first"""
+
+    def __init__(self):
+        self.tasks = {}
+        self.loads = 0
+
+    async def get_recent_task_summaries(self, user_id: str, limit: int):
+        self.loads += 1
+        return self.tasks.get(user_id, [])[:limit]
+
+    def add(self, user_id: str, title: str, priority: str):
+        self.tasks.setdefault(user_id, []).insert(0, (title, priority))
+
+async def test_incremental_context_matches_a_reload():
+    rng = random.Random(3)
+    history = History()
+    store = AIContextStore(history, window=20, recent_size=5)
+    await store.get_context("u")
+    for n in range(100):
+        title, priority = f"title {rng.randint(1, 8)}", rng.choice(["low", "medium", "high"])
+        history.add("u", title, priority)
+        store.record_created("u", title, priority)
+        reloaded = AIContextStore(history, window=20, recent_size=5)
+        context, expected = await store.get_context("u"), await reloaded.get_context("u")
+        # frequent_tasks breaks count ties by insertion order, so compare the counts behind it
+        assert store._contexts["u"].title_counts == reloaded._contexts["u"].title_counts
+        assert {**context, "frequent_tasks": None} == {**expected, "frequent_tasks": None}
+    context = await store.get_context("u")
+    assert len(context["existing_tasks"]) == 5 and sum(context["priority_mix"].values()) == 20
+
+async def test_invalidate_expire_and_evict():
+    history = History()
+    history.add("a", "write report", "high")
+    store = AIContextStore(history, max_users=2, ttl=300)
+    await store.get_context("a")
+    await store.get_context("a")
+    assert history.loads == 1
+
+    # Updates and deletes can't be applied incrementally: drop and reload
+    history.tasks["a"] = [("write summary", "low")]
+    store.invalidate("a")
+    assert (await store.get_context("a"))["existing_tasks"] == ["write summary"]
+    assert history.loads == 2
+
+    # Users not cached aren't touched by creates
+    store.record_created("b", "ignored", "low")
+    await store.get_context("b")
+    await store.get_context("c")
+    assert history.loads == 4
+    await store.get_context("a")
+    assert history.loads == 5, "least recently used user was evicted"
+
+    store.ttl = 0
+    await store.get_context("a")
+    assert history.loads == 6
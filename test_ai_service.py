@@ -0,0 +1,56 @@
+"""
+Tests for batched AI breakdowns: batching, bounded upstream concurrency and
+the per-request task cap.
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+from ai_service import (
+    MAX_BREAKDOWN_BATCH, MAX_BREAKDOWN_TASKS, MAX_CONCURRENT_BATCHES, AITaskAssistant, CompletionBackend,
+)
+
+class SlowBackend(CompletionBackend):
+    """Answers batch breakdowns after a short delay, tracking requests in flight"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def complete(self, messages, model, max_tokens, temperature=0.7, timeout=10.0, json_mode=False):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            titles = re.findall(r'^(\d+)\. Title: "([^"]*)"', messages[1]["content"], re.MULTILINE)
+            return json.dumps({"results": [{"id": int(i), "subtasks": [f"{title} step"]} for i, title in titles]})
+        finally:
+            self.in_flight -= 1
+
+@pytest.mark.anyio
+async def test_batch_breakdown_bounds_concurrent_batches():
+    backend = SlowBackend()
+    assistant = AITaskAssistant(backend=backend)
+    tasks = [{"title": f"task {n}"} for n in range(MAX_BREAKDOWN_BATCH * (MAX_CONCURRENT_BATCHES + 3))]
+    results = await assistant.suggest_batch_breakdown(tasks)
+    assert results == [[f"task {n} step"] for n in range(len(tasks))]
+    assert backend.calls == MAX_CONCURRENT_BATCHES + 3
+    assert backend.peak == MAX_CONCURRENT_BATCHES
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_batch_slots():
+    backend = SlowBackend()
+    assistant = AITaskAssistant(backend=backend)
+    calls = [assistant.suggest_batch_breakdown([{"title": f"call {c}"}]) for c in range(MAX_CONCURRENT_BATCHES * 2)]
+    results = await asyncio.gather(*calls)
+    assert results == [[[f"call {c} step"]] for c in range(MAX_CONCURRENT_BATCHES * 2)]
+    assert backend.peak == MAX_CONCURRENT_BATCHES
+
+def test_breakdown_tasks_rejects_too_many_ids(client):
+    response = client.post("/ai/breakdown-tasks", data={"task_ids": list(range(1, MAX_BREAKDOWN_TASKS + 2))})
+    assert response.status_code == 422
+    assert str(MAX_BREAKDOWN_TASKS) in response.json()["detail"]
@@ -0,0 +1,92 @@
+"""
+Tests for archiving completed tasks: batches move only old, completed,
+top-level tasks; `archived=true` lists read both tables; single archived
+tasks stay readable but refuse writes.
+"""
+import sqlite3
+
+import pytest
+
+from archive import TaskArchiver
+from conftest import make_user
+from database import ARCHIVED_READ_ONLY
+from models import TaskCreate, TaskFilter, TaskStatus, TaskUpdate
+
+pytestmark = pytest.mark.anyio
+
+def backdate(db_path: str, task_ids):
+    """Make tasks look last updated long ago"""
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("UPDATE tasks SET updated_at = '2000-01-01 00:00:00' WHERE id = ?", [(i,) for i in task_ids])
+
+async def create(db, user_id: str, title: str, **fields) -> int:
+    return (await db.create_task(TaskCreate(title=title, **fields), user_id))["data"]["id"]
+
+async def test_archiver_moves_old_completed_tasks_in_batches(db):
+    user_id = await make_user(db)
+    old_done = [await create(db, user_id, f"done {n}", status=TaskStatus.COMPLETED) for n in range(5)]
+    recent_done = await create(db, user_id, "recent", status=TaskStatus.COMPLETED)
+    old_open = await create(db, user_id, "open")
+    parent = await create(db, user_id, "parent", status=TaskStatus.COMPLETED)
+    child = await create(db, user_id, "child", status=TaskStatus.COMPLETED, parent_id=parent)
+    backdate(db.db_path, [*old_done, old_open, parent, child])
+    version = await db.get_task_version(user_id)
+
+    archiver = TaskArchiver(db, after_days=30, batch_size=2, pause=0)
+    assert await archiver.run_once() == 5
+    assert await archiver.run_once() == 0
+    assert await db.get_task_table_sizes() == {"tasks": 4, "archive": 5}
+    assert await db.get_task_version(user_id) > version
+
+    hot = {task.id for task in await db.get_tasks(user_id)}
+    assert hot == {recent_done, old_open, parent, child}
+    everything = {task.id for task in await db.get_tasks(user_id, filters=TaskFilter(archived=True))}
+    assert everything == hot | set(old_done)
+    searched = await db.get_tasks(user_id, filters=TaskFilter(archived=True, search="done 3"))
+    assert [task.id for task in searched] == [old_done[3]]
+
+async def test_archived_tasks_are_readable_but_read_only(db):
+    user_id = await make_user(db)
+    task_id = await create(db, user_id, "archived", status=TaskStatus.COMPLETED)
+    live_id = await create(db, user_id, "live")
+    backdate(db.db_path, [task_id])
+    await TaskArchiver(db, after_days=30, pause=0).run_once()
+
+    task = await db.get_task(task_id, user_id)
+    assert task.title == "archived" and task.status == "completed"
+    assert task.get("archived_at") is not None
+    assert (await db.get_task(live_id, user_id)).get("archived_at") is None
+    assert await db.get_task(task_id, await make_user(db)) is None
+
+    update = await db.update_task(task_id, TaskUpdate(status=TaskStatus.TODO), user_id)
+    assert update == {"success": False, "error": ARCHIVED_READ_ONLY}
+    assert await db.delete_task(task_id, user_id) == {"success": False, "error": ARCHIVED_READ_ONLY}
+    assert (await db.delete_task(10_000, user_id))["error"] == "Task not found"
+    assert await db.get_task_table_sizes() == {"tasks": 1, "archive": 1}
+
+def test_archived_tasks_through_the_app(app_module, client):
+    created = [
+        client.post("/api/v1/tasks", json={"title": title, "status": "completed"}).json()["id"]
+        for title in ("Archive me", "Keep me")
+    ]
+    archived_id, kept_id = created
+    backdate(app_module.db.db_path, [archived_id])
+    assert client.portal.call(TaskArchiver(app_module.db, after_days=30, pause=0).run_once) >= 1
+
+    listed = {task["id"] for task in client.get("/api/v1/tasks").json()["data"]}
+    assert kept_id in listed and archived_id not in listed
+    listed = {task["id"] for task in client.get("/api/v1/tasks", params={"archived": "true"}).json()["data"]}
+    assert {archived_id, kept_id} <= listed
+    assert "Archive me" not in client.get("/tasks").text
+    assert "Archive me" in client.get("/tasks", params={"archived": "true"}).text
+
+    response = client.get(f"/api/v1/tasks/{archived_id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "Archive me" and response.json()["archived"] is True
+    assert client.get(f"/api/v1/tasks/{kept_id}").json()["archived"] is False
+
+    assert client.patch(f"/api/v1/tasks/{archived_id}", json={"status": "todo"}).status_code == 409
+    assert client.delete(f"/api/v1/tasks/{archived_id}").status_code == 409
+    assert client.get(f"/tasks/{archived_id}/edit").status_code == 409
+    assert client.delete(f"/tasks/{archived_id}").status_code == 409
+    assert client.delete("/api/v1/tasks/999999").status_code == 404
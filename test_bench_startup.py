@@ -0,0 +1,25 @@
+"""
+Tests for the `-X importtime` parser behind benchmarks/bench_startup.
+"""
+from benchmarks.bench_startup import ImportRow, parse_importtime, slowest
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       239 |        239 | _io
+import time:      1258 |       2246 |   _decimal
+import time:       260 |       2505 | decimal
+import time:     19578 |      24038 |     pydantic_core.core_schema
+import time:      1113 |      31025 |   pydantic_core
+import time:       500 |      31525 | pydantic
+✅ SQLite database initialized successfully
+"""
+
+def test_parse_importtime_keeps_nested_rows_and_depth():
+    rows = parse_importtime(IMPORTTIME)
+    assert rows[1] == ImportRow("_decimal", 1, 1258, 2246)
+    assert rows[3] == ImportRow("pydantic_core.core_schema", 2, 19578, 24038)
+    assert [row.name for row in rows if row.depth == 0] == ["_io", "decimal", "pydantic"]
+
+def test_slowest_ranks_medians_across_runs():
+    samples = {"a": [1000, 9000, 2000], "b": [3000, 3000, 3000], "c": [500]}
+    assert slowest(samples, count=2) == {"b": 3.0, "a": 2.0}
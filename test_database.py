@@ -0,0 +1,54 @@
+"""
+Tests for compact task rows: lazy date parsing, dict-style access, and
+column projections (including the covering index behind report reads).
+"""
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from conftest import make_user
+from database import LIST_COLUMNS, REPORT_COLUMNS, TASK_COLUMNS, TaskRecord, _projection
+from models import TaskCreate, TaskPriority
+
+pytestmark = pytest.mark.anyio
+
+def test_task_record_parses_dates_once():
+    _, index = _projection(("id", "due_date", "created_at"))
+    record = TaskRecord((1, "2024-05-06", "2024-05-01 09:30:00"), index)
+    assert record.due_date == date(2024, 5, 6)
+    assert record["created_at"] == datetime(2024, 5, 1, 9, 30)
+    assert record.due_date is record.due_date
+    assert record.get("title", "none") == "none" and "title" not in record
+    with pytest.raises(AttributeError):
+        record.title
+    with pytest.raises(KeyError):
+        record["title"]
+    assert record.to_dict() == {"id": 1, "due_date": date(2024, 5, 6), "created_at": datetime(2024, 5, 1, 9, 30)}
+    # Native values from other drivers pass through
+    assert TaskRecord((None, datetime(2024, 1, 2, 3), None), index).due_date == date(2024, 1, 2)
+
+def test_projection_rejects_unknown_columns():
+    assert _projection(None)[0] == ", ".join(TASK_COLUMNS)
+    assert _projection(LIST_COLUMNS)[1] is _projection(list(LIST_COLUMNS))[1]
+    for columns in [("id", "password_hash"), ()]:
+        with pytest.raises(ValueError):
+            _projection(columns)
+
+async def test_projected_reads(db):
+    user_id = await make_user(db)
+    await db.create_task(TaskCreate(title="Due soon", due_date=date(2030, 1, 2), priority=TaskPriority.HIGH), user_id)
+
+    (task,) = await db.get_tasks(user_id, columns=REPORT_COLUMNS)
+    assert list(task.keys()) == list(REPORT_COLUMNS)
+    assert (task.title, task.due_date, task.priority) == ("Due soon", date(2030, 1, 2), "high")
+    assert "description" not in task
+    with pytest.raises(ValueError):
+        await db.get_tasks(user_id, columns=("id", "nope"))
+
+    with sqlite3.connect(db.db_path) as conn:
+        plan = conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT {', '.join(REPORT_COLUMNS)} FROM tasks WHERE user_id = ? ORDER BY created_at DESC",
+            (user_id,)
+        ).fetchall()
+    assert "COVERING INDEX idx_tasks_user_created_cover" in " ".join(row[-1] for row in plan)
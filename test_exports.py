@@ -0,0 +1,75 @@
+"""
+Tests for streamed JSON Lines, Parquet and Arrow exports.
+"""
+import io
+import json
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from exports import EXPORT_COLUMNS, columnar_stream, jsonl_stream
+
+ROWS = [
+    (3, "Ship release", "notes", "2024-06-01", "high", "todo", "2024-05-01 09:00:00", "2024-05-02 10:30:00"),
+    (2, "Écrire la doc", None, None, "low", "completed", "2024-04-30 08:00:00", "2024-04-30 08:00:00"),
+    (1, "Triage", "", "2024-05-20", "urgent", "in_progress", "2024-04-29 07:00:00", None),
+]
+
+async def batches(rows, size=2):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+@pytest.mark.anyio
+async def test_jsonl_has_one_object_per_row():
+    lines = (await collect(jsonl_stream(batches(ROWS)))).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [dict(zip(EXPORT_COLUMNS, row)) for row in ROWS]
+
+@pytest.mark.anyio
+async def test_parquet_is_typed_with_a_row_group_per_batch():
+    table_file = pq.ParquetFile(io.BytesIO(await collect(columnar_stream(batches(ROWS), "parquet"))))
+    assert table_file.metadata.num_row_groups == 2
+    table = table_file.read()
+    assert table.schema.field("due_date").type == pa.date32()
+    assert table.schema.field("created_at").type == pa.timestamp("us")
+    assert pa.types.is_dictionary(table.schema.field("priority").type)
+    rows = table.to_pylist()
+    assert [row["id"] for row in rows] == [3, 2, 1]
+    assert rows[0]["due_date"] == date(2024, 6, 1) and rows[1]["due_date"] is None
+    assert rows[0]["updated_at"] == datetime(2024, 5, 2, 10, 30) and rows[2]["updated_at"] is None
+    assert [row["status"] for row in rows] == ["todo", "completed", "in_progress"]
+    assert rows[1]["title"] == "Écrire la doc"
+
+@pytest.mark.anyio
+async def test_arrow_stream_round_trips():
+    reader = pa.ipc.open_stream(await collect(columnar_stream(batches(ROWS), "arrow")))
+    table = reader.read_all()
+    assert table.num_rows == 3
+    assert table.column("title").to_pylist() == [row[1] for row in ROWS]
+
+@pytest.mark.anyio
+async def test_empty_exports_are_valid():
+    assert await collect(jsonl_stream(batches([]))) == b""
+    table = pq.read_table(io.BytesIO(await collect(columnar_stream(batches([]), "parquet"))))
+    assert table.num_rows == 0 and table.column_names == list(EXPORT_COLUMNS)
+
+def test_export_endpoints_return_the_users_filtered_tasks(client):
+    for n in range(6):
+        client.post("/api/v1/tasks", json={
+            "title": f"export {n}", "status": ["todo", "completed"][n % 2], "due_date": f"2024-07-0{n + 1}",
+        })
+
+    response = client.get("/export/jsonl?status=completed")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(task["title"] for task in exported) == ["export 1", "export 3", "export 5"]
+    assert {task["status"] for task in exported} == {"completed"}
+
+    response = client.get("/export/parquet")
+    assert response.headers["content-disposition"].endswith(".parquet")
+    table = pq.read_table(io.BytesIO(response.content))
+    assert sorted(table.column("due_date").to_pylist()) == [date(2024, 7, n + 1) for n in range(6)]
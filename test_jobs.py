@@ -0,0 +1,106 @@
+"""
+Tests for the job queue: claims, owner leases and heartbeats, requeueing
+and the streamed CSV export job.
+"""
+import asyncio
+import csv
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobContext, JobQueue
+
+@pytest.fixture
+def queues(tmp_path):
+    """Two processes' queues sharing one job database"""
+    def make():
+        queue = JobQueue(str(tmp_path / "jobs.db"), result_dir=str(tmp_path / "results"), stale_after=60)
+
+        @queue.handler("noop")
+        async def noop(job):
+            return "ok"
+        return queue
+    return make(), make()
+
+def test_claim_leases_the_oldest_job_once(queues):
+    one, two = queues
+    first = one.submit("user", "noop")
+    second = one.submit("user", "noop")
+    claimed = one._claim()
+    assert claimed["id"] == first and claimed["owner"] == one.owner and claimed["attempts"] == 1
+    assert two._claim()["id"] == second
+    assert one._claim() is None
+
+def test_running_job_of_a_live_owner_is_not_requeued(queues):
+    one, two = queues
+    job_id = one.submit("user", "noop")
+    one._claim()
+    one.heartbeat(time.time() + 1000)
+    # Long after the claim, without any progress, but its owner is still beating
+    assert two.cleanup(now=time.time() + 1000)["requeued"] == 0
+    assert one.get(job_id, "user")["status"] == RUNNING
+    assert one._update_leased(job_id, progress=0.5)
+
+def test_job_of_a_gone_owner_is_requeued_and_fenced(queues):
+    one, two = queues
+    job_id = one.submit("user", "noop")
+    row = one._claim()
+    one.heartbeat()
+    # A fresh claim is left alone even before its owner's first heartbeat lands
+    assert two.cleanup()["requeued"] == 0
+
+    assert two.cleanup(now=time.time() + 61)["requeued"] == 1
+    job = two.get(job_id, "user")
+    assert job["status"] == QUEUED and job["owner"] is None
+
+    # The old owner can no longer report for it, and another worker picks it up
+    context = JobContext(one, row)
+    context.progress(1, 2)
+    one._finish(context, DONE, message="late")
+    assert two.get(job_id, "user")["status"] == QUEUED
+    assert two._claim()["owner"] == two.owner
+
+def test_job_past_max_attempts_fails(queues):
+    one, two = queues
+    job_id = one.submit("user", "noop")
+    for _ in range(one.max_attempts):
+        assert one._claim()["id"] == job_id
+        two.cleanup(now=time.time() + 61)
+    job = two.get(job_id, "user")
+    assert job["status"] == FAILED and job["error"] == "Worker stopped responding"
+
+@pytest.mark.anyio
+async def test_stop_requeues_running_jobs_and_removes_the_heartbeat(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), result_dir=str(tmp_path / "results"), poll_interval=0.01)
+    started = []
+
+    @queue.handler("slow")
+    async def slow(job):
+        started.append(job.id)
+        await asyncio.sleep(60)
+
+    await queue.start()
+    job_id = queue.submit("user", "slow")
+    while not started:
+        await asyncio.sleep(0.01)
+    await queue.stop()
+    assert queue.get(job_id, "user")["status"] == QUEUED
+    with queue._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM job_workers").fetchone()[0] == 0
+
+def test_export_csv_job_streams_every_task(app_module, client):
+    for n in range(7):
+        client.post("/api/v1/tasks", json={"title": f"exported {n}", "priority": "high"})
+    job_id = app_module.jobs.submit(client.user_id, "export_csv")
+    deadline = time.time() + 10
+    while (job := app_module.jobs.get(job_id, client.user_id))["status"] != DONE:
+        assert job["status"] != FAILED, job["error"]
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    assert job["progress"] == 1.0 and job["message"] == "Exported 7 tasks"
+    with open(app_module.jobs.result_path(job), newline="") as handle:
+        rows = list(csv.reader(handle))
+    assert rows[0][0] == "Title"
+    assert sorted(row[0] for row in rows[1:]) == [f"exported {n}" for n in range(7)]
+    assert {row[3] for row in rows[1:]} == {"High"}
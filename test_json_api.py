@@ -0,0 +1,82 @@
+"""
+Tests for the JSON task API: keyset cursors, field selection and bulk writes.
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import PASSWORD
+from json_api import MAX_BULK_OPERATIONS, decode_cursor, encode_cursor, page_body, parse_fields
+
+def token(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor("2024-05-01 10:30:00", 42)) == ("2024-05-01 10:30:00", 42)
+    # Timestamps from drivers that return datetimes come back in str() form
+    assert decode_cursor(encode_cursor(datetime(2024, 5, 1, 10, 30, 0, 250000), 7)) == ("2024-05-01 10:30:00.250000", 7)
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    token({"created_at": "2024-05-01", "id": 1}),
+    token(["2024-05-01 10:30:00"]),
+    token([1714559400, 42]),
+    token(["2024-05-01 10:30:00", "42"]),
+    token(["tomorrow", 42]),
+    token(["2024-05-01'; DROP TABLE tasks; --", 42]),
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+def test_page_body_points_the_cursor_at_the_last_returned_row():
+    columns = ("title", "created_at", "id")
+    rows = [("c", "2024-05-03 00:00:00", 3), ("b", "2024-05-02 00:00:00", 2), ("a", "2024-05-01 00:00:00", 1)]
+    body = page_body(rows, columns, ("title",), limit=2)
+    assert body["data"] == [{"title": "c"}, {"title": "b"}]
+    assert decode_cursor(body["next_cursor"]) == ("2024-05-02 00:00:00", 2)
+    assert page_body(rows, columns, ("title",), limit=3)["next_cursor"] is None
+
+def test_parse_fields():
+    assert parse_fields("title, id,title") == ("title", "id")
+    with pytest.raises(ValueError):
+        parse_fields("title,password")
+
+def test_pages_walk_every_task_once_with_field_selection(client):
+    client.post("/api/v1/tasks/bulk", json={"create": [{"title": f"bulk {n}"} for n in range(23)]})
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, "fields": "title"}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/v1/tasks", params=params).json()
+        assert all(set(task) == {"title"} for task in body["data"])
+        seen += [task["title"] for task in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f"bulk {n}" for n in range(23))
+
+def test_bad_cursor_and_fields_are_400(client):
+    assert client.get("/api/v1/tasks", params={"cursor": token(["nope", 1])}).status_code == 400
+    assert client.get("/api/v1/tasks", params={"fields": "secret"}).status_code == 400
+
+def test_bearer_token_and_bulk_updates(app_module, client):
+    created = client.post("/api/v1/tasks", json={"title": "via api"}).json()
+    response = client.post("/api/v1/auth/token", json={"email": client.email, "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    client.cookies.clear()
+    assert client.get("/api/v1/tasks").status_code == 401
+
+    body = client.post("/api/v1/tasks/bulk", headers=headers, json={
+        "update": [{"id": created["id"], "status": "completed"}, {"id": 10 ** 9, "title": "missing"}],
+        "delete": [10 ** 9 + 1],
+    }).json()
+    assert body["updated"] == [created["id"]]
+    assert [error["op"] for error in body["errors"]] == ["update", "delete"]
+    assert client.get(f"/api/v1/tasks/{created['id']}", headers=headers).json()["status"] == "completed"
+
+    too_many = {"delete": list(range(MAX_BULK_OPERATIONS + 1))}
+    assert client.post("/api/v1/tasks/bulk", headers=headers, json=too_many).status_code == 400
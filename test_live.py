@@ -0,0 +1,134 @@
+"""
+Tests for live task updates: fan-out skips the origin client, slow clients
+collapse into one reload, connection limits, the SQLite relay between
+workers and the SSE framing.
+"""
+import asyncio
+import sqlite3
+import time
+
+import anyio
+import pytest
+
+from live import (
+    CREATED, DELETED, RELOAD, UPDATED, LiveLimitError, LiveUpdates, SQLiteEventBackend, TaskEvent, format_sse,
+)
+
+pytestmark = pytest.mark.anyio
+
+async def render(event: TaskEvent):
+    return None if event.kind == DELETED and event.task_id is None else f"<li>{event.kind} {event.task_id}</li>"
+
+@pytest.fixture
+async def live():
+    live = LiveUpdates(render, max_per_user=2, max_connections=3, queue_size=3, heartbeat=0.05)
+    await live.start()
+    yield live
+    await live.stop()
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def test_events_reach_the_users_other_connections(live):
+    tab_a, tab_b = live.subscribe("u", "a"), live.subscribe("u", "b")
+    other_user = live.subscribe("v", "c")
+    live.publish("u", CREATED, 1, origin="a")
+    await settle()
+    assert tab_a.queue.empty() and other_user.queue.empty()
+    event, html = await tab_b.next(1)
+    assert (event.kind, event.task_id, html) == (CREATED, 1, "<li>created 1</li>")
+
+async def test_slow_client_collapses_into_one_reload(live):
+    slow = live.subscribe("u")
+    for task_id in range(5):
+        live.publish("u", UPDATED, task_id)
+    await settle()
+    # Three queued updates overflowed into a reload; the last update follows it
+    messages = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+    assert [(event.kind, event.task_id) for event, _ in messages] == [(RELOAD, None), (UPDATED, 4)]
+    assert slow.overflows == 1
+
+async def test_connection_limits(live):
+    first = live.subscribe("u")
+    live.subscribe("u")
+    with pytest.raises(LiveLimitError):
+        live.subscribe("u")
+    live.subscribe("v")
+    with pytest.raises(LiveLimitError):
+        live.subscribe("w")
+    live.unsubscribe(first)
+    live.unsubscribe(first)
+    assert live.stats() == {"connections": 2, "users": 2}
+
+async def test_sse_stream_heartbeats_and_closes(live):
+    subscription = live.subscribe("u")
+    stream = live.sse_stream(subscription)
+    assert await stream.__anext__() == b"retry: 5000\n\n"
+    assert await stream.__anext__() == b": ping\n\n"
+    live.publish("u", UPDATED, 9)
+    assert await stream.__anext__() == b"event: task\ndata: <li>updated 9</li>\n\n"
+    live.close_all()
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert live.stats()["connections"] == 0
+    assert format_sse("task", "a\nb") == b"event: task\ndata: a\ndata: b\n\n"
+
+def test_sqlite_relay_skips_own_events(tmp_path):
+    path = str(tmp_path / "live.db")
+    one, two = SQLiteEventBackend(path, retention=10), SQLiteEventBackend(path, retention=10)
+    one.publish(TaskEvent("u", CREATED, 1, "tab"))
+    two.publish(TaskEvent("u", DELETED, 2))
+    assert one.fetch()[0].kind == DELETED and one.fetch() == []
+    (event,) = two.fetch()
+    assert (event.user_id, event.kind, event.task_id, event.origin) == ("u", CREATED, 1, "tab")
+    one.prune(10 ** 12)
+    assert SQLiteEventBackend(path).fetch() == []
+
+async def test_sse_slot_is_released_when_the_client_leaves_before_the_first_message(app_module, monkeypatch):
+    live = LiveUpdates(render, max_per_user=1)
+    monkeypatch.setattr(app_module, "live", live)
+    response = await app_module.task_events(client=None, user={"id": "u"})
+    assert live.stats() == {"connections": 1, "users": 1}
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # The client is gone before anything reaches it
+        await anyio.sleep_forever()
+
+    await response({"type": "http"}, receive, send)
+    assert live.stats() == {"connections": 0, "users": 0}
+    live.subscribe("u")
+
+def test_websocket_slot_is_released_on_disconnect(app_module, client, monkeypatch):
+    live = LiveUpdates(render, max_per_user=1)
+    monkeypatch.setattr(app_module, "live", live)
+    for _ in range(3):
+        with client.websocket_connect("/ws/tasks"):
+            pass
+    deadline = time.monotonic() + 2
+    while live.stats()["connections"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live.stats() == {"connections": 0, "users": 0}
+
+def test_busy_event_file_does_not_stall_publishing(tmp_path, caplog):
+    path = str(tmp_path / "live.db")
+    backend, other = SQLiteEventBackend(path), SQLiteEventBackend(path)
+    live = LiveUpdates(render, backend=backend)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        live.publish("u", CREATED, 1)
+        assert time.perf_counter() - start < 0.5
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert "not shared with other workers" in caplog.text
+    # The event published while the file was busy is only lost to other workers
+    live.publish("u", CREATED, 2)
+    assert [event.task_id for event in other.fetch()] == [2]
+    backend.close()
+    other.close()
@@ -0,0 +1,124 @@
+"""
+Tests for the SQL profiler: slow-query log, full-scan detection, and the
+app's task reads running without full scans of `tasks`.
+"""
+import logging
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import ADMIN_TOKEN, make_user
+from database import LIST_COLUMNS, SQLiteDatabase
+from models import TaskCreate, TaskFilter, TaskPriority, TaskStatus
+from query_profiler import FullTableScanError, QueryProfiler, normalize_sql, redact_params
+
+def test_redact_params_hides_text_and_bytes():
+    assert redact_params(("secret@example.com", 42, b"\x00\x01", None)) == ["<str:18>", 42, "<bytes:2>", None]
+    assert redact_params({"email": "a@b.c", "limit": 10}) == {"email": "<str:5>", "limit": 10}
+
+def test_normalize_sql_collapses_in_lists():
+    assert normalize_sql("SELECT *\n  FROM tasks WHERE id IN (?, ?, ?)") == "SELECT * FROM tasks WHERE id IN (?...)"
+
+@pytest.mark.anyio
+async def test_slow_query_log_redacts_parameters(tmp_path, caplog):
+    profiler = QueryProfiler(slow_ms=0)
+    db = SQLiteDatabase(str(tmp_path / "primo.db"), profiler=profiler)
+    user_id = await make_user(db, "private.person@example.com")
+    with caplog.at_level(logging.WARNING, logger="primo.sql"):
+        await db.create_task(TaskCreate(title="Confidential merger plan"), user_id)
+    logged = "\n".join(record.getMessage() for record in caplog.records)
+    assert "Slow query" in logged and "in create_task" in logged
+    assert "Confidential merger plan" not in logged
+    assert user_id not in logged
+    assert f"<str:{len('Confidential merger plan')}>" in logged
+    db.pool.close()
+
+@pytest.mark.anyio
+async def test_full_scan_is_recorded_and_fails(tmp_path):
+    profiler = QueryProfiler(fail_on_scan=["tasks"])
+    db = SQLiteDatabase(str(tmp_path / "primo.db"), profiler=profiler)
+    with db._connect() as conn:
+        conn.execute("SELECT COUNT(*) FROM tasks WHERE description = ?", ("x",)).fetchone()
+    assert [violation["table"] for violation in profiler.violations] == ["tasks"]
+    with pytest.raises(FullTableScanError):
+        profiler.assert_no_full_scans()
+    profiler.reset()
+    profiler.assert_no_full_scans()
+    db.pool.close()
+
+@pytest.mark.anyio
+async def test_profiled_statements_reuse_pooled_connections(db, profiler):
+    user_id = await make_user(db)
+    await db.create_task(TaskCreate(title="one"), user_id)
+    await db.get_tasks(user_id)
+    assert db.pool.idle_count() == 1
+    assert {"sign_up", "create_task", "get_tasks"} <= {row["method"] for row in profiler.stats()}
+
+@pytest.mark.anyio
+async def test_task_reads_use_indexes(db):
+    user_id = await make_user(db)
+    today = date.today()
+    await db.create_tasks([
+        TaskCreate(
+            title=f"task {n}", priority=list(TaskPriority)[n % 4], status=list(TaskStatus)[n % 3],
+            due_date=today + timedelta(days=n - 5)
+        )
+        for n in range(20)
+    ], user_id)
+    filters = [
+        None,
+        TaskFilter(status=TaskStatus.TODO),
+        TaskFilter(priority=TaskPriority.HIGH, due_from=today, due_to=today + timedelta(days=7)),
+        TaskFilter(search="task 1"),
+        TaskFilter(archived=True, search="task"),
+    ]
+    for task_filter in filters:
+        await db.get_tasks(user_id, columns=LIST_COLUMNS, filters=task_filter)
+        await db.get_task_page(user_id, LIST_COLUMNS, task_filter, limit=5)
+        async for _ in db.iter_tasks(user_id, LIST_COLUMNS, task_filter, batch_size=7):
+            pass
+
+def add_tasks(client, count: int = 12):
+    for n in range(count):
+        client.post("/api/v1/tasks", json={
+            "title": f"report {n}", "priority": ["low", "high"][n % 2], "status": ["todo", "completed"][n % 2],
+            "due_date": (date.today() + timedelta(days=n)).isoformat(),
+        })
+
+def test_dashboard_without_full_scans(client, no_full_scans):
+    add_tasks(client)
+    response = client.get("/dashboard")
+    assert response.status_code == 200
+    assert response.text.count("report ") >= 12
+
+def test_task_filters_without_full_scans(client, no_full_scans):
+    add_tasks(client)
+    for query in ("status=todo", "priority=high", f"due_from={date.today()}&due_to={date.today() + timedelta(days=3)}",
+                  "search=report+1", "archived=true"):
+        response = client.get(f"/tasks?{query}")
+        assert response.status_code == 200, query
+    assert client.get("/tasks?status=completed").text.count("report ") == 6
+
+def test_api_paging_without_full_scans(client, no_full_scans):
+    add_tasks(client)
+    seen, cursor = [], None
+    while True:
+        body = client.get("/api/v1/tasks", params={"limit": 5, "cursor": cursor} if cursor else {"limit": 5}).json()
+        seen += [task["id"] for task in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 12
+
+def test_exports_without_full_scans(client, no_full_scans):
+    add_tasks(client)
+    assert client.get("/export/csv").text.count("report ") == 12
+    assert client.get("/export/jsonl?status=completed").text.count("\n") == 6
+    assert client.get("/export/parquet").status_code == 200
+
+def test_query_stats_requires_admin_token(client):
+    assert client.get("/admin/query-stats").status_code == 403
+    assert client.get("/admin/query-stats", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/admin/query-stats", headers={"X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200
+    assert response.json()["statements"]
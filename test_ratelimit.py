@@ -0,0 +1,78 @@
+"""
+Tests for token-bucket rate limiting: refill, shared SQLite buckets, failing
+open when the shared file is busy, and 429 responses with Retry-After.
+"""
+import sqlite3
+import time
+
+import pytest
+
+from ratelimit import MemoryRateBackend, RateLimit, RateLimiter, SQLiteRateBackend, retry_after, route_group
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRateBackend()
+        return
+    backend = SQLiteRateBackend(str(tmp_path / "ratelimit.db"))
+    yield backend
+    backend.close()
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(backend):
+    # 3 requests per 6 s: one token every 2 s
+    assert [backend.take("k", 0.5, 3, 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take("k", 0.5, 3, 100.0) == pytest.approx(2.0)
+    assert backend.take("k", 0.5, 3, 101.0) == pytest.approx(1.0)
+    assert backend.take("k", 0.5, 3, 102.0) == 0.0
+    assert backend.take("k", 0.5, 3, 102.0) == pytest.approx(2.0)
+    # A long pause refills no further than the burst
+    assert [backend.take("k", 0.5, 3, 1000.0) for _ in range(4)][-1] == pytest.approx(2.0)
+    # Other keys have their own buckets
+    assert backend.take("other", 0.5, 3, 102.0) == 0.0
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    one, two = SQLiteRateBackend(path), SQLiteRateBackend(path)
+    assert one.take("k", 1.0, 2, 50.0) == 0.0
+    assert two.take("k", 1.0, 2, 50.0) == 0.0
+    assert one.take("k", 1.0, 2, 50.0) == pytest.approx(1.0)
+    one.close()
+    two.close()
+
+def test_busy_shared_file_fails_open_quickly(tmp_path, caplog):
+    path = str(tmp_path / "ratelimit.db")
+    limiter = RateLimiter({"api": RateLimit(1, 60)}, backend=SQLiteRateBackend(path))
+    assert limiter.check("api", "user:1") == 0.0
+    assert limiter.check("api", "user:1") > 0
+
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        assert limiter.check("api", "user:1") == 0.0
+        assert time.perf_counter() - start < 0.5
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert "allowing request" in caplog.text
+    assert limiter.check("api", "user:1") > 0
+    limiter.backend.close()
+
+def test_route_groups_and_retry_after():
+    assert route_group("GET", "/static/app.css") is None
+    assert route_group("GET", "/ai/status") == "default"
+    assert route_group("POST", "/ai/breakdown-task") == "ai"
+    assert route_group("POST", "/login") == "auth"
+    assert route_group("GET", "/login") == "default"
+    assert route_group("POST", "/jobs/export-csv") == "export"
+    assert route_group("GET", "/api/v1/tasks") == "api"
+    assert retry_after(0.01) == "1" and retry_after(2.2) == "3"
+
+def test_empty_bucket_gets_429_with_retry_after(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "rate_limiter", RateLimiter({"api": RateLimit(2, 60)}))
+    assert [client.get("/api/v1/tasks").status_code for _ in range(2)] == [200, 200]
+    response = client.get("/api/v1/tasks")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    # Other groups keep their own budget
+    assert client.get("/dashboard").status_code == 200
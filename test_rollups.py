@@ -0,0 +1,106 @@
+"""
+Tests for daily rollups: incremental deltas against a recount of the tasks,
+and carried-forward days against a backfill.
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import make_user
+from models import TaskCreate, TaskPriority, TaskStatus, TaskUpdate
+from rollups import PRIORITIES, STOCK_COLUMNS, backfill_days, carry_forward
+from sql_storage import AsyncSQLStorage
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(params=["sqlite", "sql"])
+async def storage(request, db, tmp_path):
+    if request.param == "sqlite":
+        yield db
+        return
+    storage = AsyncSQLStorage(f"sqlite+aiosqlite:///{tmp_path / 'primo_async.db'}")
+    await storage.init_database()
+    yield storage
+    await storage.engine.dispose()
+
+def recount(tasks, today: date) -> dict:
+    """Stock columns for today computed from scratch"""
+    stocks = dict.fromkeys(STOCK_COLUMNS, 0)
+    for task in tasks:
+        if task.status == "completed":
+            continue
+        stocks[f"open_{task.priority}"] += 1
+        if task.due_date is not None and task.due_date < today:
+            stocks["overdue"] += 1
+    return stocks
+
+def random_task(rng: random.Random, today: date) -> TaskCreate:
+    return TaskCreate(
+        title=f"task {rng.randint(1, 10 ** 6)}",
+        priority=rng.choice(list(TaskPriority)),
+        status=rng.choice(list(TaskStatus)),
+        due_date=rng.choice([None, today - timedelta(days=rng.randint(1, 30)), today + timedelta(days=rng.randint(0, 30))]),
+    )
+
+async def test_write_deltas_match_a_recount(storage):
+    rng = random.Random(7)
+    today = date.today()
+    user_id = await make_user(storage)
+    created = completed = 0
+    ids = []
+    for step in range(120):
+        action = rng.random()
+        if action < 0.35 or not ids:
+            task = random_task(rng, today)
+            ids.append((await storage.create_task(task, user_id))["data"]["id"])
+            created += 1
+            completed += task.status == TaskStatus.COMPLETED
+        elif action < 0.45:
+            batch = [random_task(rng, today) for _ in range(rng.randint(1, 5))]
+            assert (await storage.create_tasks(batch, user_id))["data"]["created"] == len(batch)
+            ids = [task.id for task in await storage.get_tasks(user_id)]
+            created += len(batch)
+            completed += sum(task.status == TaskStatus.COMPLETED for task in batch)
+        elif action < 0.85:
+            task_id = rng.choice(ids)
+            before = await storage.get_task(task_id, user_id)
+            update = TaskUpdate(
+                status=rng.choice(list(TaskStatus)),
+                priority=rng.choice([None, *TaskPriority]),
+                due_date=rng.choice([None, today - timedelta(days=3), today + timedelta(days=3)]),
+            )
+            await storage.update_task(task_id, update, user_id)
+            completed += update.status == TaskStatus.COMPLETED and before.status != "completed"
+        else:
+            await storage.delete_task(ids.pop(rng.randrange(len(ids))), user_id)
+
+    (row,) = await storage.get_daily_stats(user_id, today, today)
+    assert {column: row[column] for column in STOCK_COLUMNS} == recount(await storage.get_tasks(user_id), today)
+    assert (row["created"], row["completed"]) == (created, completed)
+
+def test_carried_forward_days_match_a_backfill():
+    rng = random.Random(3)
+    start = date(2024, 3, 1)
+    tasks = []
+    for _ in range(200):
+        created = start + timedelta(days=rng.randint(0, 20))
+        status = rng.choice(["todo", "in_progress", "completed"])
+        tasks.append({
+            "created_at": f"{created} 09:00:00",
+            # Nothing is written after day 20, so completions happen by then
+            "updated_at": f"{created + timedelta(days=rng.randint(0, 20 - (created - start).days))} 10:00:00",
+            "due_date": rng.choice([None, (created + timedelta(days=rng.randint(-5, 30))).isoformat()]),
+            "priority": rng.choice(PRIORITIES),
+            "status": status,
+        })
+
+    last_day, until = start + timedelta(days=20), start + timedelta(days=35)
+    stored = backfill_days(tasks, last_day)
+    due_counts = Counter(
+        date.fromisoformat(task["due_date"]) for task in tasks
+        if task["status"] != "completed" and task["due_date"] and last_day <= date.fromisoformat(task["due_date"]) < until
+    )
+    carried = carry_forward(last_day, {column: stored[-1][1][column] for column in STOCK_COLUMNS}, until, due_counts)
+    assert stored + carried == backfill_days(tasks, until)
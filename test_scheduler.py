@@ -0,0 +1,85 @@
+"""
+Tests for the due-date scheduler: overdue counts kept in step with writes,
+date changes and reminders, and writes from other workers.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import make_user
+from database import SQLiteDatabase
+from models import TaskCreate, TaskStatus, TaskUpdate
+from scheduler import DUE, OVERDUE, DueDateScheduler
+
+pytestmark = pytest.mark.anyio
+
+TODAY = date(2024, 6, 10)
+
+def days(n: int) -> date:
+    return TODAY + timedelta(days=n)
+
+async def recount(db, user_id: str, today: date) -> int:
+    return sum(
+        1 for task in await db.get_tasks(user_id)
+        if task.status != "completed" and task.due_date is not None and task.due_date < today
+    )
+
+@pytest.fixture
+def scheduled(db):
+    reminders = []
+    scheduler = DueDateScheduler(db, on_reminder=lambda *event: reminders.append(event), today=lambda: TODAY)
+    scheduler.observe(db)
+    scheduler.reminders = reminders
+    return scheduler
+
+async def test_overdue_count_follows_writes(db, scheduled):
+    user_id = await make_user(db)
+    await scheduled.rebuild()
+    assert await scheduled.overdue_count(user_id) == 0
+
+    late = (await db.create_task(TaskCreate(title="late", due_date=days(-2)), user_id))["data"]["id"]
+    await db.create_task(TaskCreate(title="today", due_date=TODAY), user_id)
+    await db.create_task(TaskCreate(title="done late", due_date=days(-5), status=TaskStatus.COMPLETED), user_id)
+    assert await scheduled.overdue_count(user_id) == 1
+
+    moved = (await db.create_task(TaskCreate(title="soon", due_date=days(3)), user_id))["data"]["id"]
+    await db.update_task(moved, TaskUpdate(due_date=days(-1)), user_id)
+    assert await scheduled.overdue_count(user_id) == 2
+    await db.update_task(late, TaskUpdate(status=TaskStatus.COMPLETED), user_id)
+    assert await scheduled.overdue_count(user_id) == 1
+    await db.delete_task(moved, user_id)
+    assert await scheduled.overdue_count(user_id) == 0 == await recount(db, user_id, TODAY)
+
+    await db.create_tasks([TaskCreate(title=f"bulk {n}", due_date=days(n - 3)) for n in range(6)], user_id)
+    assert await scheduled.overdue_count(user_id) == 3 == await recount(db, user_id, TODAY)
+
+async def test_date_change_counts_newly_overdue_tasks_and_reminds(db, scheduled):
+    user_id = await make_user(db)
+    today = (await db.create_task(TaskCreate(title="today", due_date=TODAY), user_id))["data"]["id"]
+    tomorrow = (await db.create_task(TaskCreate(title="tomorrow", due_date=days(1)), user_id))["data"]["id"]
+    await db.create_task(TaskCreate(title="later", due_date=days(10)), user_id)
+    await scheduled.rebuild()
+    assert await scheduled.overdue_count(user_id) == 0
+    assert scheduled.next_due(user_id) == TODAY
+
+    assert scheduled.advance(days(1)) == 2
+    assert sorted(scheduled.reminders) == [(user_id, DUE, tomorrow), (user_id, OVERDUE, today)]
+    assert await scheduled.overdue_count(user_id) == 1 == await recount(db, user_id, days(1))
+
+    # Completing a task before its due day cancels its reminders
+    await db.update_task(tomorrow, TaskUpdate(status=TaskStatus.COMPLETED), user_id)
+    scheduled.reminders.clear()
+    assert scheduled.advance(days(5)) == 0
+    assert await scheduled.overdue_count(user_id) == 1 == await recount(db, user_id, days(5))
+
+async def test_writes_from_another_worker_are_picked_up(db, scheduled):
+    user_id = await make_user(db)
+    await scheduled.rebuild()
+    assert await scheduled.overdue_count(user_id) == 0
+
+    other = SQLiteDatabase(db.db_path)
+    task_id = (await other.create_task(TaskCreate(title="elsewhere", due_date=days(-1)), user_id))["data"]["id"]
+    assert await scheduled.overdue_count(user_id) == 1
+    await other.update_task(task_id, TaskUpdate(status=TaskStatus.COMPLETED), user_id)
+    assert await scheduled.overdue_count(user_id) == 0
+    other.pool.close()
@@ -0,0 +1,31 @@
+"""
+Tests for the production launcher's helpers and the health checks it relies on.
+"""
+import os
+
+import server
+
+def test_health_checks(app_module, app_client):
+    assert app_client.get("/health").json() == {"status": "ok"}
+    response = app_client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["pid"] == os.getpid()
+
+    app_module.drain()
+    try:
+        assert app_client.get("/health/ready").status_code == 503
+        assert app_client.get("/health").status_code == 200
+    finally:
+        app_module.app.state.ready = True
+
+def test_workers_share_live_events_and_rate_limits(monkeypatch, tmp_path):
+    monkeypatch.setenv("PRIMO_DB_PATH", str(tmp_path / "primo.db"))
+    monkeypatch.delenv("PRIMO_LIVE_EVENTS_DB", raising=False)
+    monkeypatch.setenv("PRIMO_RATE_LIMIT_DB", "/elsewhere/limits.db")
+    server.share_between_workers()
+    assert os.environ["PRIMO_LIVE_EVENTS_DB"] == str(tmp_path / "primo_live.db")
+    assert os.environ["PRIMO_RATE_LIMIT_DB"] == "/elsewhere/limits.db"
+
+def test_fastest_falls_back_when_missing():
+    assert server.fastest("json", "fast", "slow") == "fast"
+    assert server.fastest("no_such_module_here", "fast", "slow") == "slow"
+    assert server.default_workers() >= 1
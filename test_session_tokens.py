@@ -0,0 +1,102 @@
+"""
+Tests for signed session tokens: HMAC verification, key rotation, expiry and
+revocation shared between workers through storage.
+"""
+import time
+
+import pytest
+
+import session_tokens
+from session_tokens import RevocationList, SessionSigner, is_signed_token, parse_keys
+
+pytestmark = pytest.mark.anyio
+
+USER = {"id": 7, "email": "signed@example.com"}
+
+def signer_for(db, spec: str, **kwargs) -> SessionSigner:
+    return SessionSigner(parse_keys(spec), RevocationList(db), **kwargs)
+
+async def test_signed_tokens_verify_without_storage(db):
+    signer = signer_for(db, "k1:0123456789abcdef")
+    token = signer.issue(USER)
+    assert is_signed_token(token) and not is_signed_token("plain-session-id")
+    assert signer.verify(token) == USER
+
+    signed, _, signature = token.rpartition(".")
+    _, key_id, payload = signed.split(".")
+    forged_payload = session_tokens._b64encode(b'{"sub":1,"email":"x@example.com","exp":9999999999,"jti":"x"}')
+    assert signer.verify(f"v1.{key_id}.{forged_payload}.{signature}") is None
+    assert signer.verify(f"{signed}.{signature[:-2]}AA") is None
+    assert signer.verify("v1.garbage") is None
+    assert signer_for(db, "k1:fedcba9876543210").verify(token) is None
+
+async def test_key_rotation(db):
+    old = signer_for(db, "k1:0123456789abcdef")
+    old_token = old.issue(USER)
+
+    rotated = signer_for(db, "k2:abcdefghijklmnop,k1:0123456789abcdef")
+    new_token = rotated.issue(USER)
+    assert new_token.split(".")[1] == "k2"
+    assert rotated.verify(old_token) == USER
+    assert rotated.verify(new_token) == USER
+    assert old.verify(new_token) is None
+
+    retired = signer_for(db, "k2:abcdefghijklmnop")
+    assert retired.verify(old_token) is None
+    assert retired.verify(new_token) == USER
+
+async def test_tokens_expire(db, monkeypatch):
+    signer = signer_for(db, "k1:0123456789abcdef", max_age=60)
+    token = signer.issue(USER)
+    now = time.time()
+    monkeypatch.setattr(session_tokens.time, "time", lambda: now + 59)
+    assert signer.verify(token) == USER
+    monkeypatch.setattr(session_tokens.time, "time", lambda: now + 61)
+    assert signer.verify(token) is None
+
+async def test_revocation_reaches_other_workers_after_sync(db):
+    one = signer_for(db, "k1:0123456789abcdef")
+    two = signer_for(db, "k1:0123456789abcdef")
+    token, other = one.issue(USER), one.issue(USER)
+
+    await one.revoke(token)
+    assert one.verify(token) is None
+    assert two.verify(token) == USER
+    await two.revocations.sync()
+    assert two.verify(token) is None
+    assert two.verify(other) == USER
+    assert len(two.revocations) == 1
+
+    # Revoking garbage is a no-op
+    await one.revoke("v1.k1.bad.bad")
+    assert len(one.revocations) == 1
+
+async def test_sync_forgets_expired_revocations(db, monkeypatch):
+    signer = signer_for(db, "k1:0123456789abcdef", max_age=60)
+    await signer.revoke(signer.issue(USER))
+    assert len(signer.revocations) == 1
+    now = time.time()
+    monkeypatch.setattr(session_tokens.time, "time", lambda: now + 120)
+    await signer.revocations.sync()
+    assert len(signer.revocations) == 0
+
+def test_parse_keys_rejects_bad_specs():
+    assert parse_keys(" a:0123456789abcdef , b:fedcba9876543210") == [
+        ("a", b"0123456789abcdef"), ("b", b"fedcba9876543210")]
+    for spec in ["nokey", "a:short", "a.b:0123456789abcdef", ":0123456789abcdef"]:
+        with pytest.raises(ValueError):
+            parse_keys(spec)
+    with pytest.raises(ValueError):
+        SessionSigner([], None)
+
+def test_logout_revokes_signed_cookie(app_module, client, monkeypatch):
+    signer = signer_for(app_module.db, "k1:0123456789abcdef")
+    monkeypatch.setattr(app_module, "signer", signer)
+    token = signer.issue({"id": client.user_id, "email": client.email})
+    client.cookies.set("session_id", token)
+    assert client.get("/dashboard").status_code == 200
+
+    client.post("/logout", follow_redirects=False)
+    assert signer.verify(token) is None
+    client.cookies.set("session_id", token)
+    assert client.get("/dashboard", follow_redirects=False).status_code in (302, 303, 307)
@@ -0,0 +1,88 @@
+"""
+Tests for per-user task sharding: routing, id ranges, move_user, migrate and rebalance.
+"""
+import sqlite3
+
+import pytest
+
+from conftest import make_user
+from database import SQLiteDatabase
+from models import TaskCreate, TaskStatus, TaskUpdate
+from sharding import SHARD_ID_SPAN, ShardedSQLiteDatabase, migrate, rebalance, shard_for
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def sharded(tmp_path):
+    db = ShardedSQLiteDatabase(str(tmp_path / "primo.db"), shard_count=4)
+    yield db
+    db.pool.close()
+
+def stored_ids(path: str, user_id: str):
+    with sqlite3.connect(path) as conn:
+        return sorted(row[0] for row in conn.execute("SELECT id FROM tasks WHERE user_id = ?", (user_id,)))
+
+def test_shard_for_is_stable_and_in_range():
+    assert shard_for("user-1", 4) == shard_for("user-1", 4)
+    assert {shard_for(f"user-{n}", 4) for n in range(200)} == {0, 1, 2, 3}
+
+async def test_tasks_are_written_to_and_read_from_the_users_shard(sharded):
+    user_ids = [await make_user(sharded) for _ in range(8)]
+    for user_id in user_ids:
+        await sharded.create_tasks([TaskCreate(title=f"{user_id} {n}") for n in range(3)], user_id)
+
+    for user_id in user_ids:
+        shard = sharded.shard_of(user_id)
+        assert shard == shard_for(user_id, 4)
+        ids = stored_ids(sharded.shard_path(shard), user_id)
+        assert len(ids) == 3
+        # Each shard hands out ids from its own range, so ids stay unique across shards
+        assert all((shard + 1) * SHARD_ID_SPAN < task_id < (shard + 2) * SHARD_ID_SPAN for task_id in ids)
+        assert sorted(task.id for task in await sharded.get_tasks(user_id)) == ids
+        for other in set(range(4)) - {shard}:
+            assert stored_ids(sharded.shard_path(other), user_id) == []
+    assert stored_ids(sharded.db_path, user_ids[0]) == []
+    assert sum(row["tasks"] for row in sharded.shard_stats()) == 24
+
+async def test_move_user_keeps_ids_subtasks_and_counts(sharded):
+    user_id = await make_user(sharded)
+    root = (await sharded.create_task(TaskCreate(title="root"), user_id))["data"]["id"]
+    child = (await sharded.create_task(TaskCreate(title="child", parent_id=root), user_id))["data"]["id"]
+    await sharded.update_task(child, TaskUpdate(status=TaskStatus.COMPLETED), user_id)
+    source = sharded.shard_of(user_id)
+    target = (source + 1) % 4
+
+    assert sharded.move_user(user_id, sharded.shard_path(source), target) == 2
+    assert sharded.shard_of(user_id) == target
+    assert stored_ids(sharded.shard_path(source), user_id) == []
+    assert stored_ids(sharded.shard_path(target), user_id) == [root, child]
+    assert [task.id for task in await sharded.get_subtree(root, user_id)] == [root, child]
+    assert (await sharded.get_task_progress(user_id))[root] == (1, 1)
+
+    # The directory survives a restart
+    reopened = ShardedSQLiteDatabase(sharded.db_path, shard_count=4)
+    assert reopened.shard_of(user_id) == target
+    reopened.pool.close()
+
+async def test_migrate_and_rebalance(tmp_path):
+    db_path = str(tmp_path / "primo.db")
+    plain = SQLiteDatabase(db_path)
+    user_ids = [await make_user(plain) for _ in range(6)]
+    for user_id in user_ids:
+        await plain.create_task(TaskCreate(title="before sharding"), user_id)
+    plain.pool.close()
+
+    sharded = ShardedSQLiteDatabase(db_path, shard_count=2)
+    assert migrate(sharded) == {"users": 6, "tasks": 6}
+    for user_id in user_ids:
+        assert stored_ids(db_path, user_id) == []
+        assert [task.title for task in await sharded.get_tasks(user_id)] == ["before sharding"]
+    sharded.pool.close()
+
+    grown = ShardedSQLiteDatabase(db_path, shard_count=4)
+    moved = [user_id for user_id in user_ids if shard_for(user_id, 4) != shard_for(user_id, 2)]
+    assert rebalance(grown) == {"users": len(moved), "tasks": len(moved)}
+    for user_id in user_ids:
+        assert grown.shard_of(user_id) == shard_for(user_id, 4)
+        assert len(await grown.get_tasks(user_id)) == 1
+    grown.pool.close()
@@ -0,0 +1,76 @@
+"""
+Tests for the async SQLAlchemy backend, run on aiosqlite.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database import ARCHIVED_READ_ONLY, LIST_COLUMNS
+from json_api import decode_cursor, encode_cursor
+from models import TaskCreate, TaskFilter, TaskStatus, TaskUpdate, UserCreate
+from sql_storage import AsyncSQLStorage, _after_conditions, tasks
+from storage import Storage
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def storage(tmp_path):
+    storage = AsyncSQLStorage(f"sqlite+aiosqlite:///{tmp_path / 'primo_async.db'}")
+    await storage.init_database()
+    yield storage
+    await storage.engine.dispose()
+
+async def make_sql_user(storage) -> str:
+    result = await storage.sign_up(UserCreate(email="sql@example.com", password="password123"))
+    return result["data"]["user"]["id"]
+
+async def walk(storage, user_id, task_filter=None, limit=5):
+    created_at, task_id = LIST_COLUMNS.index("created_at"), LIST_COLUMNS.index("id")
+    seen, after = [], None
+    while True:
+        rows = await storage.get_task_page(user_id, LIST_COLUMNS, task_filter, limit, after)
+        seen += [row[task_id] for row in rows]
+        if len(rows) < limit:
+            return seen
+        # Through the API's cursor token, as a client would page
+        after = decode_cursor(encode_cursor(rows[-1][created_at], rows[-1][task_id]))
+
+async def test_keyset_pages_cover_rows_sharing_a_timestamp(storage):
+    user_id = await make_sql_user(storage)
+    # One statement: every row gets the same created_at second
+    await storage.create_tasks([
+        TaskCreate(title=f"task {n}", status=TaskStatus.COMPLETED if n % 2 else TaskStatus.TODO) for n in range(17)
+    ], user_id)
+    seen = await walk(storage, user_id)
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 17
+    assert len(await walk(storage, user_id, TaskFilter(status=TaskStatus.TODO), limit=3)) == 9
+
+def test_cursor_binds_a_typed_timestamp_off_sqlite():
+    statement = tasks.select().where(*_after_conditions(tasks, ("2024-05-01 10:30:00.250000", 42), "postgresql"))
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert params["after_created_at"] == datetime(2024, 5, 1, 10, 30, 0, 250000)
+
+    aware = tasks.select().where(*_after_conditions(tasks, ("2024-05-01T12:30:00+02:00", 42), "postgresql"))
+    assert aware.compile(dialect=postgresql.dialect()).params["after_created_at"] == datetime(2024, 5, 1, 10, 30)
+
+async def test_archived_tasks_are_readable_but_read_only(storage):
+    user_id = await make_sql_user(storage)
+    archived = (await storage.create_task(TaskCreate(title="old", status=TaskStatus.COMPLETED), user_id))["data"]["id"]
+    await storage.create_task(TaskCreate(title="open"), user_id)
+    assert await storage.archive_completed_tasks(datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)) == 1
+
+    task = await storage.get_task(archived, user_id)
+    assert task.title == "old" and task.get("archived_at") is not None
+    update = await storage.update_task(archived, TaskUpdate(status=TaskStatus.TODO), user_id)
+    assert update == {"success": False, "error": ARCHIVED_READ_ONLY}
+    assert await storage.delete_task(archived, user_id) == {"success": False, "error": ARCHIVED_READ_ONLY}
+    assert (await storage.update_task(10_000, TaskUpdate(title="x"), user_id))["error"] == "Task not found"
+
+def test_incomplete_backends_fail_at_construction():
+    class Incomplete(AsyncSQLStorage):
+        get_task_version = Storage.get_task_version
+
+    with pytest.raises(TypeError, match="get_task_version"):
+        Incomplete("sqlite+aiosqlite://")
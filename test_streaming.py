@@ -0,0 +1,33 @@
+"""
+Tests for streamed task list rendering: the streamed page lists the same
+rows, in the same order, as the page rendered in one piece.
+"""
+import re
+
+def titles(html: str):
+    return re.findall(r"Streamed task \d+", html)
+
+def test_streamed_list_matches_the_buffered_one(app_module, client, monkeypatch):
+    count = app_module.STREAM_BATCH_SIZE * 2 + 7
+    client.portal.call(app_module.db.create_tasks, [
+        app_module.TaskCreate(title=f"Streamed task {n}") for n in range(count)
+    ], client.user_id)
+
+    monkeypatch.setattr(app_module, "STREAM_HTML", True)
+    streamed = client.get("/tasks")
+    dashboard = client.get("/dashboard")
+    monkeypatch.setattr(app_module, "STREAM_HTML", False)
+    buffered = client.get("/tasks")
+
+    assert streamed.status_code == dashboard.status_code == 200
+    assert len(titles(streamed.text)) == count
+    assert titles(streamed.text) == titles(buffered.text)
+    assert titles(dashboard.text) == titles(buffered.text)
+
+def test_streamed_empty_list_shows_the_empty_state(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_HTML", False)
+    buffered = client.get("/tasks")
+    monkeypatch.setattr(app_module, "STREAM_HTML", True)
+    streamed = client.get("/tasks")
+    assert streamed.status_code == 200
+    assert " ".join(streamed.text.split()) == " ".join(buffered.text.split())
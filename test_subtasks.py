@@ -0,0 +1,101 @@
+"""
+Tests for the subtask closure table: after every create, move, status change
+and delete, the closure rows, the progress counts and subtree reads agree
+with a recount from the tasks' parent_id links.
+"""
+import random
+import sqlite3
+
+import pytest
+
+from conftest import make_user
+from models import TaskCreate, TaskStatus, TaskUpdate
+from sql_storage import AsyncSQLStorage
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(params=["sqlite", "sql"])
+async def storage(request, db, tmp_path):
+    if request.param == "sqlite":
+        yield db
+        return
+    storage = AsyncSQLStorage(f"sqlite+aiosqlite:///{tmp_path / 'primo_async.db'}")
+    await storage.init_database()
+    yield storage
+    await storage.engine.dispose()
+
+def db_file(storage) -> str:
+    return storage.db_path if hasattr(storage, "db_path") else storage.engine.url.database
+
+def recount(tasks):
+    """Closure rows {(ancestor, descendant): depth} and {task: (completed, total)} from parent_id links"""
+    parents = {task.id: task.parent_id for task in tasks}
+    done = {task.id for task in tasks if task.status == "completed"}
+    closure, progress = {}, {}
+    for task_id in parents:
+        ancestor, depth = parents[task_id], 1
+        while ancestor is not None:
+            closure[(ancestor, task_id)] = depth
+            completed, total = progress.get(ancestor, (0, 0))
+            progress[ancestor] = (completed + (task_id in done), total + 1)
+            ancestor, depth = parents[ancestor], depth + 1
+    return closure, progress
+
+async def check_invariants(storage, user_id: str):
+    tasks = await storage.get_tasks(user_id)
+    closure, progress = recount(tasks)
+    with sqlite3.connect(db_file(storage)) as conn:
+        rows = conn.execute(
+            "SELECT ancestor_id, descendant_id, depth FROM task_tree WHERE user_id = ?", (user_id,)
+        ).fetchall()
+    assert {(ancestor, descendant): depth for ancestor, descendant, depth in rows} == closure
+    assert len(rows) == len(closure)
+    assert await storage.get_task_progress(user_id) == progress
+
+    for task in tasks:
+        below = {descendant for ancestor, descendant in closure if ancestor == task.id}
+        subtree = await storage.get_subtree(task.id, user_id)
+        assert subtree[0].id == task.id
+        assert {row.id for row in subtree} == below | {task.id}
+
+async def test_closure_and_progress_match_a_recount(storage):
+    rng = random.Random(11)
+    user_id = await make_user(storage)
+    ids = []
+    for step in range(150):
+        action = rng.random()
+        if action < 0.4 or not ids:
+            task = TaskCreate(
+                title=f"task {step}",
+                status=rng.choice(list(TaskStatus)),
+                parent_id=rng.choice([None, *ids]),
+            )
+            result = await storage.create_task(task, user_id)
+            assert result["success"], result
+            ids.append(result["data"]["id"])
+        elif action < 0.6:
+            update = TaskUpdate(status=rng.choice(list(TaskStatus)))
+            assert (await storage.update_task(rng.choice(ids), update, user_id))["success"]
+        elif action < 0.9:
+            task_id, parent_id = rng.choice(ids), rng.choice([None, *ids])
+            inside = {row.id for row in await storage.get_subtree(task_id, user_id)}
+            result = await storage.move_task(task_id, parent_id, user_id)
+            if parent_id in inside:
+                assert result == {"success": False, "error": "A task can't be moved under its own subtree"}
+            else:
+                assert result["success"] and result["data"]["parent_id"] == parent_id
+        else:
+            task_id = rng.choice(ids)
+            inside = {row.id for row in await storage.get_subtree(task_id, user_id)}
+            result = await storage.delete_task(task_id, user_id)
+            assert result["success"] and set(result["data"]["subtasks"]) == inside - {task_id}
+            ids = [other for other in ids if other not in inside]
+        await check_invariants(storage, user_id)
+
+async def test_missing_tasks_and_parents(storage):
+    user_id, other_id = await make_user(storage), await make_user(storage)
+    parent = (await storage.create_task(TaskCreate(title="parent"), user_id))["data"]["id"]
+    assert not (await storage.create_task(TaskCreate(title="orphan", parent_id=parent), other_id))["success"]
+    assert (await storage.move_task(10_000, None, user_id))["error"] == "Task not found"
+    assert await storage.get_subtree(parent, other_id) == []
+    await check_invariants(storage, user_id)
@@ -0,0 +1,92 @@
+"""
+Tests for the write-through task cache: cross-worker invalidation, the
+debounced version check and single-row misses.
+"""
+import pytest
+
+from conftest import make_user
+from database import SQLiteDatabase
+from models import TaskCreate, TaskStatus, TaskUpdate
+from task_cache import CachedTaskStorage
+
+pytestmark = pytest.mark.anyio
+
+class Calls:
+    """Counts calls to some of a backend's methods"""
+
+    def __init__(self, inner, *names):
+        self.counts = dict.fromkeys(names, 0)
+        for name in names:
+            setattr(inner, name, self._counted(name, getattr(inner, name)))
+
+    def _counted(self, name, method):
+        async def counted(*args, **kwargs):
+            self.counts[name] += 1
+            return await method(*args, **kwargs)
+        return counted
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two cached workers sharing one database file"""
+    path = str(tmp_path / "primo.db")
+    first, second = SQLiteDatabase(path), SQLiteDatabase(path)
+    yield CachedTaskStorage(first, check_interval=0), CachedTaskStorage(second, check_interval=0)
+    first.pool.close()
+    second.pool.close()
+
+async def test_writes_from_another_worker_invalidate_the_cache(workers):
+    one, two = workers
+    user_id = await make_user(one)
+    task_id = (await one.create_task(TaskCreate(title="draft"), user_id))["data"]["id"]
+    assert [task.title for task in await one.get_tasks(user_id)] == ["draft"]
+    assert [task.title for task in await two.get_tasks(user_id)] == ["draft"]
+
+    await two.update_task(task_id, TaskUpdate(status=TaskStatus.COMPLETED), user_id)
+    await two.create_task(TaskCreate(title="second"), user_id)
+    assert sorted((task.title, task.status) for task in await one.get_tasks(user_id)) == [
+        ("draft", "completed"), ("second", "todo")
+    ]
+    assert (await one.get_task(task_id, user_id)).status == "completed"
+
+    await two.delete_task(task_id, user_id)
+    assert await one.get_task(task_id, user_id) is None
+    assert [task.title for task in await one.get_tasks(user_id)] == ["second"]
+
+async def test_own_writes_keep_the_cached_list_current(workers):
+    one, _ = workers
+    user_id = await make_user(one)
+    await one.get_tasks(user_id)
+    calls = Calls(one.inner, "get_tasks")
+    task_id = (await one.create_task(TaskCreate(title="mine"), user_id))["data"]["id"]
+    await one.update_task(task_id, TaskUpdate(title="renamed"), user_id)
+    assert [task.title for task in await one.get_tasks(user_id)] == ["renamed"]
+    assert calls.counts["get_tasks"] == 0
+
+async def test_version_check_is_debounced(tmp_path):
+    path = str(tmp_path / "primo.db")
+    cached, other = CachedTaskStorage(SQLiteDatabase(path), check_interval=60), SQLiteDatabase(path)
+    user_id = await make_user(cached)
+    await cached.create_task(TaskCreate(title="first"), user_id)
+    await cached.get_tasks(user_id)
+    calls = Calls(cached.inner, "get_task_version", "get_tasks")
+
+    await other.create_task(TaskCreate(title="elsewhere"), user_id)
+    for _ in range(5):
+        assert [task.title for task in await cached.get_tasks(user_id)] == ["first"]
+    assert calls.counts == {"get_task_version": 0, "get_tasks": 0}
+
+    # Once the interval has passed the version is checked and the list reloads
+    cached.check_interval = 0
+    assert sorted(task.title for task in await cached.get_tasks(user_id)) == ["elsewhere", "first"]
+    assert calls.counts["get_tasks"] == 1
+    cached.inner.pool.close()
+    other.pool.close()
+
+async def test_get_task_miss_reads_one_row(workers):
+    one, two = workers
+    user_id = await make_user(one)
+    task_id = (await two.create_task(TaskCreate(title="uncached"), user_id))["data"]["id"]
+    calls = Calls(one.inner, "get_task", "get_tasks")
+    assert (await one.get_task(task_id, user_id)).title == "uncached"
+    assert calls.counts == {"get_task": 1, "get_tasks": 0}
+    assert one.stats()["users"] == 0